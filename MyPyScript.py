@@ -1,21 +1,68 @@
 import streamlit as st
 import pandas as pd
-import joblib
 import numpy as np
+import os
+import tempfile
 from datetime import datetime
 
-# Load trained models and transformers (with error handling)
+import metrics
+from artifacts import FEATURE_COLUMNS, artifact_fingerprint
+from batch_scoring import DEFAULT_CHUNK_SIZE, score_csv
+from drift import DriftMonitor
+from model_registry import ModelRegistry
+from prediction_grid import GRID_FILE, load_or_build_grid
+from sweeps import SWEEPABLE, sweep
+
+# Load trained models and transformers (with error handling). The registry
+# serves the active bundle version (or the .pkl files) and swaps in newly
+# published versions from a background thread.
 @st.cache_resource
-def load_models():
+def load_registry():
     try:
-        regressor = joblib.load("best_regressor.pkl")
-        classifier = joblib.load("best_classifier.pkl")
-        scaler = joblib.load("scaler.pkl")
-        encoders = joblib.load("encoders.pkl")
-        return regressor, classifier, scaler, encoders
+        with metrics.timed("load_models"):
+            return ModelRegistry().start()
     except FileNotFoundError:
+        metrics.MODEL_LOADS.inc(source="missing")
         st.error("⚠️ Model files not found. Using mock predictions for demo.")
-        return None, None, None, None
+        return None
+
+def load_models():
+    # Take the active version once per run, so a swap mid-run can't mix versions
+    registry = load_registry()
+    return registry.current() if registry is not None else None
+
+# Drift of the app's inputs and predictions from the training data (None
+# without drift_baseline.json); scores show up in the salary_drift_* metrics.
+# App traffic is light, so the buffer is flushed more often than the default.
+@st.cache_resource
+def load_drift_monitor():
+    return DriftMonitor.from_directory(buffer_rows=64)
+
+# Metrics exposure, configured through the environment:
+#   SALARY_METRICS_PORT - serve Prometheus text on http://127.0.0.1:<port>/metrics
+#   SALARY_METRICS_FILE - rewrite this file after every prediction
+@st.cache_resource
+def start_metrics_endpoint():
+    port = os.environ.get("SALARY_METRICS_PORT")
+    return metrics.start_metrics_server(int(port)) if port else None
+
+def publish_metrics():
+    path = os.environ.get("SALARY_METRICS_FILE")
+    if path:
+        metrics.write_metrics_file(path)
+
+# Precomputed prediction grid (optional; built with `python prediction_grid.py`).
+# Only used when it was built from the artifacts the active version came from.
+@st.cache_resource
+def load_prediction_grid(version, _pipeline):
+    if not os.path.exists(GRID_FILE) or _pipeline is None:
+        return None
+    try:
+        if artifact_fingerprint()[:12] != version:
+            return None
+        return load_or_build_grid(GRID_FILE, pipeline=_pipeline)
+    except Exception:
+        return None
 
 # Mock prediction functions
 def mock_predict_salary(age, gender, education, job_title, experience):
@@ -64,6 +111,10 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Append ?profile=1 to the URL to cProfile one full rerun (written to profiles/)
+profiler = metrics.start_profile() if st.query_params.get("profile") == "1" else None
+start_metrics_endpoint()
+
 # Custom CSS matching the Next.js version exactly
 st.markdown("""
 <style>
@@ -419,7 +470,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load models
-regressor, classifier, scaler, encoders = load_models()
+pipeline = load_models()
 
 # Main container
 st.markdown('<div class="main-container">', unsafe_allow_html=True)
@@ -427,7 +478,11 @@ st.markdown('<div class="main-container">', unsafe_allow_html=True)
 # Create two columns
 col1, col2 = st.columns([1, 1], gap="large")
 
-with col1:
+# Input widgets and results live in fragments, so changing a widget or
+# clicking a button re-runs only that section instead of the whole page
+# (the CSS and header above are sent once per session).
+@st.fragment
+def employee_details():
     st.markdown("""
     <div class="card">
         <div class="section-header">
@@ -481,7 +536,45 @@ with col1:
     
     st.markdown('</div>', unsafe_allow_html=True)  # Close card
 
-with col2:
+def show_contributions(pipeline, input_scaled, mode, class_pred=None):
+    # Per-input breakdown under the result. Versions without the needed
+    # model data (e.g. older bundles) just skip it.
+    try:
+        if mode == 'salary':
+            base, values = pipeline.explain_salary(input_scaled)
+        else:
+            base, values = pipeline.explain_level(input_scaled, [class_pred])
+            base = base if np.ndim(base) == 0 else base[0]
+    except ValueError:
+        return
+    import altair as alt
+    in_dollars = mode == 'salary' or pipeline.level_mode == "regressor"
+    breakdown = pd.DataFrame({"Input": FEATURE_COLUMNS, "Contribution": values[0]})
+    chart = alt.Chart(breakdown).mark_bar().encode(
+        x=alt.X("Contribution:Q", title="Contribution ($)" if in_dollars else "Contribution (class score)"),
+        y=alt.Y("Input:N", sort="-x", title=None),
+        color=alt.condition(alt.datum.Contribution > 0, alt.value("#059669"), alt.value("#dc2626")),
+        tooltip=["Input", alt.Tooltip("Contribution:Q", format=",.2f")],
+    )
+    st.altair_chart(chart, use_container_width=True)
+    if in_dollars:
+        st.caption(f"What drove this prediction: starting from the average prediction of ${base:,.0f}, "
+                   "each bar shows how much that input moved it.")
+    else:
+        st.caption(f"What drove this level: each bar is that input's share of the level's classifier score "
+                   f"(intercept {base:+.2f}).")
+
+@st.fragment
+def prediction_results():
+    pipeline = load_models()
+    model_version = getattr(pipeline, "version", None)
+    prediction_grid = load_prediction_grid(model_version, pipeline)
+    age = st.session_state.get("age_slider", 30)
+    gender = st.session_state.get("gender_select", "Select gender")
+    education = st.session_state.get("education_select", "Select education level")
+    job_title = st.session_state.get("job_select", "Select job title")
+    experience = st.session_state.get("experience_slider", 5)
+    
     st.markdown("""
     <div class="card">
         <div class="section-header">
@@ -525,62 +618,77 @@ with col2:
     
     # Handle prediction results
     if predict_clicked:
+        mode = st.session_state.prediction_mode
         if gender == "Select gender" or education == "Select education level" or job_title == "Select job title":
+            metrics.ERRORS.inc(stage="validation")
             st.error("⚠️ Please fill in all required fields!")
         else:
-            with st.spinner("🤖 AI is analyzing the data..."):
-                import time
-                time.sleep(1.5)
-                
+            with st.spinner("🤖 AI is analyzing the data..."), metrics.timed("total"):
                 try:
-                    if regressor and classifier and scaler and encoders:
-                        # Real model prediction
-                        input_dict = {
-                            "Age": age,
-                            "Gender": gender,
-                            "Education Level": education,
-                            "Job Title": job_title,
-                            "Years of Experience": experience
-                        }
-                        
-                        input_df = pd.DataFrame([input_dict])
-                        input_df_encoded = input_df.copy()
-                        
-                        # Encode categorical columns
-                        for col in input_df_encoded.select_dtypes(include="object").columns:
-                            if col in encoders:
-                                input_df_encoded[col] = encoders[col].transform(input_df_encoded[col])
-                        
-                        # Scale features
-                        input_scaled = scaler.transform(input_df_encoded)
-                        
-                        if st.session_state.prediction_mode == 'salary':
-                            salary_pred = regressor.predict(input_scaled)[0]
-                            st.markdown(f"""
-                            <div class="result-display">
-                                <div class="result-amount">${salary_pred:,.0f}</div>
-                                <div class="result-label">Predicted Annual Salary</div>
-                            </div>
-                            """, unsafe_allow_html=True)
+                    if pipeline is not None:
+                        # Real model prediction (precomputed grid first, if available)
+                        cached = input_scaled = None
+                        if prediction_grid:
+                            with metrics.timed("grid_lookup"):
+                                cached = prediction_grid.lookup(age, gender, education, job_title, experience)
+                            metrics.GRID_LOOKUPS.inc(result="miss" if cached is None else "hit")
+                        if cached is not None:
+                            salary_pred, class_pred, class_confidence = cached
                         else:
-                            class_pred = classifier.predict(input_scaled)[0]
-                            class_proba = classifier.predict_proba(input_scaled)[0]
-                            confidence = max(class_proba) * 100
+                            with metrics.timed("encode"):
+                                input_scaled = pipeline.transform_one(age, gender, education, job_title, experience)
                             
-                            label_map = {0: "Low", 1: "Medium", 2: "High"}
-                            predicted_level = label_map.get(class_pred, 'Unknown')
-                            badge_class = predicted_level.lower()
-                            
-                            st.markdown(f"""
-                            <div class="result-display">
-                                <div class="level-badge {badge_class}">{predicted_level} Salary Level</div><br>
-                                <div class="result-label">Confidence: {confidence:.1f}%</div>
-                            </div>
-                            """, unsafe_allow_html=True)
+                            with metrics.timed(f"predict_{mode}"):
+                                if mode == 'salary':
+                                    salary_pred = pipeline.predict_salary(input_scaled)[0]
+                                else:
+                                    class_preds, class_confidences = pipeline.predict_level(input_scaled)
+                                    class_pred, class_confidence = class_preds[0], class_confidences[0]
+                        
+                        with metrics.timed("render"):
+                            if mode == 'salary':
+                                st.markdown(f"""
+                                <div class="result-display">
+                                    <div class="result-amount">${salary_pred:,.0f}</div>
+                                    <div class="result-label">Predicted Annual Salary</div>
+                                </div>
+                                """, unsafe_allow_html=True)
+                                st.caption(f"Model version {model_version}")
+                            else:
+                                confidence = class_confidence * 100
+                                
+                                label_map = {0: "Low", 1: "Medium", 2: "High"}
+                                predicted_level = label_map.get(class_pred, 'Unknown')
+                                badge_class = predicted_level.lower()
+                                
+                                st.markdown(f"""
+                                <div class="result-display">
+                                    <div class="level-badge {badge_class}">{predicted_level} Salary Level</div><br>
+                                    <div class="result-label">Confidence: {confidence:.1f}%</div>
+                                </div>
+                                """, unsafe_allow_html=True)
+                                st.caption(f"Model version {model_version}")
+                            unknown = pipeline.unknown_inputs(
+                                {"Gender": gender, "Education Level": education, "Job Title": job_title})
+                            for col, value in unknown.items():
+                                st.caption(f"ℹ️ {col} \"{value}\" isn't in the training data, so it was scored "
+                                           f"as the most common one, \"{pipeline.encoders[col].fill_label}\".")
+                            if input_scaled is None:
+                                # Grid hits skip encoding; the breakdown still needs the inputs
+                                input_scaled = pipeline.transform_one(age, gender, education, job_title, experience)
+                            show_contributions(pipeline, input_scaled, mode, None if mode == 'salary' else class_pred)
+                        metrics.PREDICTIONS.inc(mode=mode)
+                        monitor = load_drift_monitor()
+                        if monitor is not None:
+                            monitor.observe_one(
+                                age, gender, education, job_title, experience,
+                                salary=salary_pred if mode == 'salary' or cached is not None else None,
+                                level=class_pred if mode == 'level' or cached is not None else None,
+                            )
                     
                     else:
                         # Mock predictions
-                        if st.session_state.prediction_mode == 'salary':
+                        if mode == 'salary':
                             salary_pred = mock_predict_salary(age, gender, education, job_title, experience)
                             st.markdown(f"""
                             <div class="result-display">
@@ -599,12 +707,116 @@ with col2:
                                 <div class="result-label">Confidence: {confidence*100:.1f}%</div>
                             </div>
                             """, unsafe_allow_html=True)
+                        metrics.PREDICTIONS.inc(mode=mode)
+                        metrics.MOCK_PREDICTIONS.inc(mode=mode)
                 
                 except Exception as e:
+                    metrics.ERRORS.inc(stage="predict")
                     st.error(f"Prediction error: {str(e)}")
+        publish_metrics()
     
     st.markdown('</div>', unsafe_allow_html=True)  # Close card
 
+@st.fragment
+def what_if_sweep():
+    with st.expander("🔮 What-if Sweep"):
+        st.markdown('<p class="section-subtitle">Vary one or two inputs of the current profile across their whole range</p>', unsafe_allow_html=True)
+        sweep_cols = st.columns(2)
+        with sweep_cols[0]:
+            x_feature = st.selectbox("Vary", SWEEPABLE, key="sweep_x")
+        with sweep_cols[1]:
+            y_feature = st.selectbox("And", ["Nothing"] + [f for f in SWEEPABLE if f != x_feature], key="sweep_y")
+        pipeline = load_models()
+        if pipeline is None:
+            st.error("⚠️ Sweeps need the trained model files.")
+        elif st.button("Run Sweep", key="sweep_btn", use_container_width=True):
+            features = [x_feature] if y_feature == "Nothing" else [x_feature, y_feature]
+            selected = {
+                "Gender": st.session_state.get("gender_select", "Select gender"),
+                "Education Level": st.session_state.get("education_select", "Select education level"),
+                "Job Title": st.session_state.get("job_select", "Select job title"),
+            }
+            unset = [col for col, value in selected.items()
+                     if value in ("Select gender", "Select education level", "Select job title") and col not in features]
+            if unset:
+                st.error(f"⚠️ Please choose {', '.join(unset)} in Employee Details first, or sweep that input.")
+                return
+            profile = {
+                "Age": st.session_state.get("age_slider", 30),
+                **selected,
+                "Years of Experience": st.session_state.get("experience_slider", 5),
+            }
+            try:
+                with metrics.timed("sweep"):
+                    results = sweep(pipeline, profile, features)
+            except ValueError as e:
+                st.error(f"⚠️ {e}. Pick a value the model knows in Employee Details, or sweep that input.")
+                return
+            import altair as alt
+            salary_axis = alt.Color("Predicted Salary:Q", scale=alt.Scale(scheme="viridis"), title="Salary")
+            if len(features) == 1:
+                kind = "Q" if x_feature in ("Age", "Years of Experience") else "N"
+                chart = alt.Chart(results).mark_line(point=True) if kind == "Q" else alt.Chart(results).mark_bar()
+                chart = chart.encode(x=alt.X(f"{x_feature}:{kind}", sort=None), y="Predicted Salary:Q",
+                                     tooltip=list(results.columns))
+            else:
+                chart = alt.Chart(results).mark_rect().encode(
+                    x=alt.X(f"{x_feature}:O"), y=alt.Y(f"{y_feature}:O"), color=salary_axis,
+                    tooltip=list(results.columns),
+                )
+            st.altair_chart(chart, use_container_width=True)
+            st.caption(f"{len(results):,} combinations scored in one batch with model version {getattr(pipeline, 'version', None)}")
+
+# Downloads are served from Streamlit's in-memory media store, so larger
+# results point to batch_scoring.py instead
+BULK_DOWNLOAD_LIMIT_MB = 100
+
+@st.fragment
+def bulk_scoring():
+    with st.expander("📂 Bulk Scoring (CSV upload)"):
+        st.markdown('<p class="section-subtitle">Upload a CSV with the same columns as the training data to score every row</p>', unsafe_allow_html=True)
+        uploaded_file = st.file_uploader("CSV file", type=["csv"], key="bulk_upload", label_visibility="collapsed")
+        pipeline = load_models()
+        if uploaded_file is not None:
+            if pipeline is None:
+                st.error("⚠️ Bulk scoring needs the trained model files.")
+            else:
+                explain = st.checkbox("Add per-input contribution columns", key="bulk_explain")
+                if st.button("Score File", key="bulk_score_btn", use_container_width=True):
+                    progress_text = st.empty()
+                    output_file = None
+                    try:
+                        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as output_file:
+                            stats = score_csv(
+                                uploaded_file, output_file.name, pipeline, chunk_size=DEFAULT_CHUNK_SIZE,
+                                on_chunk=lambda s: progress_text.text(f"{s['rows']:,} rows scored..."),
+                                explain=explain, monitor=load_drift_monitor(),
+                            )
+                        progress_text.success(f"✅ Scored {stats['scored']:,} of {stats['rows']:,} rows ({stats['skipped']:,} skipped) "
+                                              f"with model version {getattr(pipeline, 'version', None)}")
+                        size_mb = os.path.getsize(output_file.name) / 2**20
+                        if size_mb > BULK_DOWNLOAD_LIMIT_MB:
+                            st.warning(f"⚠️ The scored file is {size_mb:,.0f} MB, over the {BULK_DOWNLOAD_LIMIT_MB} MB the app serves. "
+                                       "Score it with `python batch_scoring.py input.csv predictions.csv` instead.")
+                        else:
+                            with open(output_file.name, "rb") as f:
+                                st.download_button("Download Predictions", f, file_name="salary_predictions.csv", mime="text/csv", use_container_width=True)
+                    except Exception as e:
+                        st.error(f"Bulk scoring error: {str(e)}")
+                    finally:
+                        if output_file is not None and os.path.exists(output_file.name):
+                            os.remove(output_file.name)
+
+with col1:
+    employee_details()
+
+with col2:
+    prediction_results()
+
+# What-if sweeps and bulk scoring
+what_if_sweep()
+bulk_scoring()
+
 # Footer
 st.markdown("""
 <div class="footer">
@@ -612,4 +824,10 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-st.markdown('</div>', unsafe_allow_html=True)  # Close main container
\ No newline at end of file
+st.markdown('</div>', unsafe_allow_html=True)  # Close main container
+
+if profiler is not None:
+    profile_path, profile_summary = metrics.stop_profile(profiler)
+    del st.query_params["profile"]
+    with st.expander(f"🔬 Rerun profile ({profile_path})"):
+        st.code(profile_summary)
\ No newline at end of file
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+
+# Feature layout the scaler and models were fitted on (see the notebook)
+FEATURE_COLUMNS = ["Age", "Gender", "Education Level", "Job Title", "Years of Experience"]
+CATEGORICAL_COLUMNS = ["Gender", "Education Level", "Job Title"]
+TARGET_COLUMN = "Salary"
+
+# Classifier class index -> salary level, as used by the app
+LEVEL_LABELS = {0: "Low", 1: "Medium", 2: "High"}
+
+REGRESSOR_FILE = "best_regressor.pkl"
+CLASSIFIER_FILE = "best_classifier.pkl"
+SCALER_FILE = "scaler.pkl"
+ENCODERS_FILE = "encoders.pkl"
+ARTIFACT_FILES = [REGRESSOR_FILE, CLASSIFIER_FILE, SCALER_FILE, ENCODERS_FILE]
+# Optional: the training salary terciles, for deriving levels from the regressor,
+# and the level of each classifier class when it doesn't follow LEVEL_LABELS
+LEVELS_FILE = "salary_levels.json"
+# Optional: input and prediction distributions on the training data, for drift monitoring
+BASELINE_FILE = "drift_baseline.json"
+
+
+def load_artifacts(directory=".", relabel=True):
+    # Raises FileNotFoundError if any artifact is missing. When
+    # salary_levels.json records the level of each classifier class (the
+    # notebook's classifier numbers them High, Low, Medium), the classifier's
+    # classes are relabelled to LEVEL_LABELS codes, so its predictions decode
+    # like everyone else's; `relabel=False` returns it as trained.
+    regressor = joblib.load(os.path.join(directory, REGRESSOR_FILE))
+    classifier = joblib.load(os.path.join(directory, CLASSIFIER_FILE))
+    scaler = joblib.load(os.path.join(directory, SCALER_FILE))
+    encoders = joblib.load(os.path.join(directory, ENCODERS_FILE))
+    class_levels = _load_levels(directory).get("class_levels")
+    if relabel and class_levels is not None:
+        classifier.classes_ = np.asarray(class_levels)
+    return regressor, classifier, scaler, encoders
+
+
+def _load_levels(directory):
+    path = os.path.join(directory, LEVELS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_level_cuts(directory="."):
+    # The two Salary cut points between Low/Medium and Medium/High, or None
+    # if the models were saved without them
+    return _load_levels(directory).get("cuts")
+
+
+def artifact_fingerprint(directory="."):
+    # Content hash of the four artifact files and, when present, the level cuts
+    digest = hashlib.sha256()
+    for name in ARTIFACT_FILES + [LEVELS_FILE]:
+        if name == LEVELS_FILE and not os.path.exists(os.path.join(directory, name)):
+            continue
+        digest.update(name.encode())
+        with open(os.path.join(directory, name), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifacts import FEATURE_COLUMNS, LEVEL_LABELS, load_artifacts, load_level_cuts
+from inference import InferencePipeline
+
+DEFAULT_CHUNK_SIZE = 100_000
+PREDICTION_COLUMNS = ["Predicted Salary", "Predicted Level", "Level Confidence"]
+# The categorical columns whose label the encoders don't know, so it was
+# scored as the training mode (see encoding.CategoryEncoder)
+UNKNOWN_COLUMN = "Unknown Inputs"
+# Added with explain=True: each feature's share of the predicted salary
+CONTRIBUTION_COLUMNS = [f"{col} Contribution" for col in FEATURE_COLUMNS]
+
+
+def _check_columns(chunk):
+    missing = [col for col in FEATURE_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+
+
+def predict_chunk(chunk, pipeline, explain=False, monitor=None):
+    # Rows that can't be scored (missing numbers, categories that aren't
+    # labels) are left blank instead of aborting the job, and still reach the
+    # drift monitor; unseen labels are scored and named in UNKNOWN_COLUMN
+    _check_columns(chunk)
+    X_scaled, valid = pipeline.transform(chunk)
+
+    salary = np.full(len(chunk), np.nan)
+    confidence = np.full(len(chunk), np.nan)
+    contributions = np.full((len(chunk), len(FEATURE_COLUMNS)), np.nan) if explain else None
+    class_idx = np.full(len(chunk), -1)
+    if valid.any():
+        X_valid = np.ascontiguousarray(X_scaled[valid])
+        salary[valid], class_idx[valid], confidence[valid] = pipeline.predict(X_valid)
+        if explain:
+            _, contributions[valid] = pipeline.explain_salary(X_valid, salary[valid])
+    return scored_frame(chunk, valid, salary, class_idx, confidence, contributions, monitor,
+                        pipeline.unknown_columns(chunk))
+
+
+def scored_frame(chunk, valid, salary, class_idx, confidence, contributions=None, monitor=None, unknown=None):
+    # The input rows plus the prediction (and contribution) columns, blank
+    # where `valid` is False. `unknown` is pipeline.unknown_columns(chunk).
+    if monitor is not None:
+        monitor.observe(chunk, salary, class_idx)
+    level = np.full(len(chunk), "", dtype=object)
+    level[valid] = [LEVEL_LABELS.get(c, "Unknown") for c in class_idx[valid]]
+
+    result = chunk.copy()
+    result["Predicted Salary"] = salary.round(2)
+    result["Predicted Level"] = level
+    result["Level Confidence"] = confidence.round(4)
+    if unknown is not None:
+        result[UNKNOWN_COLUMN] = unknown
+    if contributions is not None:
+        for j, col in enumerate(CONTRIBUTION_COLUMNS):
+            result[col] = contributions[:, j].round(2)
+    return result, int(valid.sum())
+
+
+def score_csv(source, destination, pipeline, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None, explain=False,
+              monitor=None, workers=None):
+    # Stream `source` through the models `chunk_size` rows at a time and
+    # append the scored rows to `destination`. Memory use is bounded by the
+    # chunk size, not by the input size. With workers > 1, chunks are scored
+    # by a parallel_scoring.ParallelScorer while the next one is read and the
+    # previous one written.
+    stats = {"rows": 0, "scored": 0, "skipped": 0, "chunks": 0}
+    start = time.perf_counter()
+    header = True
+
+    def write(chunk, result, scored):
+        nonlocal header
+        result.to_csv(destination, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+        stats["rows"] += len(chunk)
+        stats["scored"] += scored
+        stats["skipped"] += len(chunk) - scored
+        stats["chunks"] += 1
+        if on_chunk is not None:
+            on_chunk(stats)
+
+    if workers is None or workers <= 1:
+        for chunk in pd.read_csv(source, chunksize=chunk_size):
+            write(chunk, *predict_chunk(chunk, pipeline, explain, monitor))
+    else:
+        from parallel_scoring import ParallelScorer
+
+        def finish(chunk, job):
+            salary, class_idx, confidence, contributions, valid = job.result()
+            write(chunk, *scored_frame(chunk, valid, salary, class_idx, confidence, contributions, monitor,
+                                       pipeline.unknown_columns(chunk)))
+
+        with ParallelScorer(pipeline, workers, capacity=chunk_size, explain=explain) as scorer:
+            pending = None
+            for chunk in pd.read_csv(source, chunksize=chunk_size):
+                _check_columns(chunk)
+                job = scorer.submit(chunk)
+                if pending is not None:
+                    finish(*pending)
+                pending = chunk, job
+            if pending is not None:
+                finish(*pending)
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score an employee CSV with the trained salary models.")
+    parser.add_argument("input", help="CSV with the same feature columns as salary_data.csv")
+    parser.add_argument("output", help="Where to write the scored CSV")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--models-dir", default=".", help="Directory holding the .pkl artifacts")
+    parser.add_argument("--explain", action="store_true",
+                        help="Add per-feature contribution columns (exact TreeSHAP) for the predicted salary")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Score chunks across this many worker processes (0: one per core)")
+    parser.add_argument("--drift", action="store_true",
+                        help="Compare the file's inputs and predictions with the training baseline")
+    args = parser.parse_args(argv)
+
+    pipeline = InferencePipeline.from_artifacts(*load_artifacts(args.models_dir),
+                                                level_cuts=load_level_cuts(args.models_dir))
+
+    def report(stats):
+        print(f"  {stats['rows']:,} rows processed", file=sys.stderr)
+
+    monitor = None
+    if args.drift:
+        from drift import DriftMonitor
+
+        # One window covering the whole file
+        monitor = DriftMonitor.from_directory(args.models_dir, window_rows=float("inf"))
+        if monitor is None:
+            parser.error(f"--drift needs a baseline in {args.models_dir}; run drift.py first")
+    stats = score_csv(args.input, args.output, pipeline, chunk_size=args.chunk_size, on_chunk=report,
+                      explain=args.explain, monitor=monitor, workers=args.workers or os.cpu_count())
+    if monitor is not None:
+        with pd.option_context("display.width", 200, "display.max_columns", 20, "display.float_format",
+                               "{:,.4f}".format):
+            print(monitor.report().fillna("").to_string(index=False))
+    print(f"✅ Scored {stats['scored']:,} of {stats['rows']:,} rows "
+          f"({stats['skipped']:,} skipped) in {stats['seconds']:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
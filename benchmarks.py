@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifacts import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, load_artifacts
+from inference import InferencePipeline
+from synthetic_data import SyntheticSalaryData
+
+RESULTS_DIR = "benchmark_results"
+BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+PREPROCESS_SIZES = [10_000, 1_000_000]
+TRAINING_ROWS = 2_000
+
+
+def _timeit(fn, repeat=5, min_seconds=0.2):
+    # Seconds per call, `repeat` samples, each averaging enough calls to last
+    # roughly `min_seconds`
+    fn()
+    start = time.perf_counter()
+    fn()
+    once = time.perf_counter() - start
+    number = max(1, int(min_seconds / max(once, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def _result(name, samples, rows=None, **params):
+    median = float(np.median(samples))
+    result = {"name": name, "params": params, "median_seconds": median,
+              "min_seconds": float(min(samples)), "samples": [float(s) for s in samples]}
+    if rows:
+        result["rows"] = rows
+        result["rows_per_second"] = rows / median
+    return result
+
+
+def legacy_single_row(regressor, scaler, encoders, input_dict):
+    # The app's original predict branch: DataFrame -> LabelEncoder -> scaler -> predict
+    input_df = pd.DataFrame([input_dict])
+    input_df_encoded = input_df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        input_df_encoded[col] = encoders[col].transform(input_df_encoded[col])
+    return regressor.predict(scaler.transform(input_df_encoded))[0]
+
+
+def notebook_preprocess(df):
+    # Preprocessing cells of Employee_Salary_Prediction.ipynb
+    from sklearn.preprocessing import LabelEncoder
+
+    df = df.copy()
+    df.fillna(df.mode().iloc[0], inplace=True)
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = LabelEncoder().fit_transform(df[col])
+
+    def remove_outliers(df, cols):
+        for col in cols:
+            q1 = df[col].quantile(0.25)
+            q3 = df[col].quantile(0.75)
+            iqr = q3 - q1
+            df = df[(df[col] >= q1 - 1.5 * iqr) & (df[col] <= q3 + 1.5 * iqr)]
+        return df
+
+    df = remove_outliers(df, ["Salary"])
+    df = remove_outliers(df, ["Age", "Gender", "Education Level", "Job Title", "Years of Experience"])
+    df["Salary_Class"] = pd.qcut(df["Salary"], q=3, labels=["Low", "Medium", "High"])
+    return df
+
+
+def bench_load(models_dir):
+    code = ("import time, warnings; warnings.simplefilter('ignore'); start = time.perf_counter(); "
+            "from artifacts import load_artifacts; load_artifacts(%r); print(time.perf_counter() - start)" % models_dir)
+    cold = [float(subprocess.check_output([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__))))
+            for _ in range(3)]
+    warm = _timeit(lambda: load_artifacts(models_dir), repeat=3)
+    return [_result("load_models_cold", cold), _result("load_models_warm", warm)]
+
+
+def bench_single_row(pipeline, regressor, scaler, encoders, profile):
+    input_dict = dict(zip(FEATURE_COLUMNS, profile))
+    return [
+        _result("single_row_legacy", _timeit(lambda: legacy_single_row(regressor, scaler, encoders, input_dict))),
+        _result("single_row_pipeline", _timeit(
+            lambda: pipeline.predict_salary(pipeline.transform_one(*profile)))),
+    ]
+
+
+def bench_batches(pipeline, generator, sizes):
+    results = []
+    for size in sizes:
+        X, valid = pipeline.transform(generator.generate(size, seed=size).dropna())
+        X = np.ascontiguousarray(X[valid])
+        repeat = 3 if len(X) >= 100_000 else 5
+        results.append(_result("batch_regressor", _timeit(lambda: pipeline.predict_salary(X), repeat=repeat),
+                               rows=len(X), batch_size=size))
+        results.append(_result("batch_classifier", _timeit(lambda: pipeline.predict_level(X), repeat=repeat),
+                               rows=len(X), batch_size=size))
+        raw = generator.rows.iloc[np.arange(size) % len(generator.rows)]
+        results.append(_result("batch_encode_scale", _timeit(lambda: pipeline.transform(raw), repeat=repeat),
+                               rows=size, batch_size=size))
+    return results
+
+
+def bench_preprocessing(generator, sizes):
+    # In-memory cleaning, then what a training run pays to get training-ready
+    # arrays: parsing and cleaning the CSV vs memory-mapping the data cache
+    import tempfile
+
+    from data_cache import build_cache, open_dataset
+
+    results = []
+    for size in sizes:
+        df = generator.generate(size, seed=size)
+        results.append(_result("notebook_preprocess", _timeit(lambda: notebook_preprocess(df), repeat=3),
+                               rows=size, dataset_rows=size))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data.csv")
+            df.to_csv(path, index=False)
+            results.append(_result("csv_parse_preprocess", _timeit(lambda: notebook_preprocess(pd.read_csv(path)), repeat=3),
+                                   rows=size, dataset_rows=size))
+            cache_dir = os.path.join(tmp, "cache")
+            build_cache(path, cache_dir)
+            results.append(_result("cached_dataset_open", _timeit(lambda: open_dataset(path, cache_dir).X_scaled.sum(), repeat=3),
+                                   rows=size, dataset_rows=size))
+    return results
+
+
+def bench_training(generator, rows):
+    # Fit and score each notebook candidate once on a synthetic dataset
+    from sklearn.ensemble import (GradientBoostingClassifier, GradientBoostingRegressor,
+                                  RandomForestClassifier, RandomForestRegressor)
+    from sklearn.linear_model import LinearRegression, LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.naive_bayes import GaussianNB
+    from sklearn.neighbors import KNeighborsClassifier, KNeighborsRegressor
+    from sklearn.preprocessing import LabelEncoder, RobustScaler
+    from sklearn.svm import SVC, SVR
+    from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+    df = notebook_preprocess(generator.generate(rows, seed=rows))
+    X = RobustScaler().fit_transform(df[FEATURE_COLUMNS])
+    y_reg = df["Salary"].to_numpy()
+    y_cls = LabelEncoder().fit_transform(df["Salary_Class"])
+    X_train_r, X_test_r, y_train_r, _ = train_test_split(X, y_reg, test_size=0.3, random_state=42)
+    X_train_c, X_test_c, y_train_c, _ = train_test_split(X, y_cls, test_size=0.3, random_state=42)
+
+    candidates = [
+        ("Linear Regression", LinearRegression, "reg"),
+        ("Random Forest Regressor", RandomForestRegressor, "reg"),
+        ("Gradient Boosting Regressor", GradientBoostingRegressor, "reg"),
+        ("SVR", SVR, "reg"),
+        ("Decision Tree Regressor", DecisionTreeRegressor, "reg"),
+        ("KNN Regressor", KNeighborsRegressor, "reg"),
+        ("Logistic Regression", lambda: LogisticRegression(max_iter=1000), "cls"),
+        ("Random Forest", RandomForestClassifier, "cls"),
+        ("Gradient Boosting", GradientBoostingClassifier, "cls"),
+        ("SVC", lambda: SVC(probability=True), "cls"),
+        ("Decision Tree", DecisionTreeClassifier, "cls"),
+        ("KNN", KNeighborsClassifier, "cls"),
+        ("Naive Bayes", GaussianNB, "cls"),
+    ]
+    results = []
+    total = 0.0
+    for name, make, kind in candidates:
+        X_train, y_train, X_test = (X_train_r, y_train_r, X_test_r) if kind == "reg" else (X_train_c, y_train_c, X_test_c)
+        start = time.perf_counter()
+        model = make().fit(X_train, y_train)
+        model.predict(X_test)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        results.append(_result("train_model", [elapsed], rows=len(X_train), model=name))
+    results.append(_result("train_all_serial", [total], rows=len(df)))
+    return results
+
+
+def run_metadata():
+    # Where and with what a run happened; recorded in every report so
+    # results from different commits or machines aren't compared blindly
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                         stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import sklearn
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine(),
+    }
+
+
+def run(suites, models_dir=".", batch_sizes=BATCH_SIZES, preprocess_sizes=PREPROCESS_SIZES,
+        training_rows=TRAINING_ROWS):
+    generator = SyntheticSalaryData()
+    regressor, classifier, scaler, encoders = load_artifacts(models_dir)
+    pipeline = InferencePipeline.from_artifacts(regressor, classifier, scaler, encoders)
+    profile = (30, "Female", "Bachelor's", "Data Analyst", 5)
+
+    results = []
+    if "load" in suites:
+        results += bench_load(models_dir)
+    if "single" in suites:
+        results += bench_single_row(pipeline, regressor, scaler, encoders, profile)
+    if "batch" in suites:
+        results += bench_batches(pipeline, generator, batch_sizes)
+    if "preprocess" in suites:
+        results += bench_preprocessing(generator, preprocess_sizes)
+    if "training" in suites:
+        results += bench_training(generator, training_rows)
+    return {"metadata": run_metadata(), "results": results}
+
+
+def _key(result):
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(baseline, current, threshold=0.1):
+    # Median-time ratio for every benchmark present in both runs; prints the
+    # table and returns the names that got slower by more than `threshold`
+    base = {_key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"{'benchmark':<60} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for result in current["results"]:
+        old = base.get(_key(result))
+        if old is None:
+            continue
+        ratio = result["median_seconds"] / old["median_seconds"]
+        flag = " ⚠️" if ratio > 1 + threshold else ""
+        label = result["name"] + "".join(f" {k}={v}" for k, v in result["params"].items())
+        print(f"{label:<60} {old['median_seconds']:>12.6f} {result['median_seconds']:>12.6f} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(label)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model loading, inference, preprocessing and training.")
+    sub = parser.add_subparsers(dest="command")
+
+    run_parser = sub.add_parser("run", help="Run the benchmark suites (default)")
+    run_parser.add_argument("--suites", default="load,single,batch,preprocess,training",
+                            help="Comma-separated subset of load,single,batch,preprocess,training")
+    run_parser.add_argument("--batch-sizes", default=",".join(map(str, BATCH_SIZES)))
+    run_parser.add_argument("--preprocess-sizes", default=",".join(map(str, PREPROCESS_SIZES)))
+    run_parser.add_argument("--training-rows", type=int, default=TRAINING_ROWS)
+    run_parser.add_argument("--models-dir", default=".")
+    run_parser.add_argument("--output", help=f"JSON file to write (default: {RESULTS_DIR}/<timestamp>-<commit>.json)")
+
+    compare_parser = sub.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown before flagging")
+
+    args = parser.parse_args(argv or sys.argv[1:] or ["run"])
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    report = run(
+        args.suites.split(","), args.models_dir,
+        batch_sizes=[int(s) for s in args.batch_sizes.split(",")],
+        preprocess_sizes=[int(s) for s in args.preprocess_sizes.split(",")],
+        training_rows=args.training_rows,
+    )
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['metadata']['commit'] or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for result in report["results"]:
+        label = result["name"] + "".join(f" {k}={v}" for k, v in result["params"].items())
+        throughput = f" {result['rows_per_second']:>14,.0f} rows/s" if "rows_per_second" in result else ""
+        print(f"{label:<60} {result['median_seconds'] * 1000:>12.3f} ms{throughput}")
+    print(f"✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
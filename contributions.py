@@ -0,0 +1,267 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from artifacts import FEATURE_COLUMNS, load_artifacts, load_level_cuts
+from forest_engine import round_down_float32
+from inference import InferencePipeline
+
+# Rows per block, which bounds the (rows, subsets) working arrays
+BLOCK_SIZE = 8192
+
+
+class ForestExplainer:
+    # Exact path-dependent TreeSHAP values for a FlatForest, the same
+    # quantities shap.TreeExplainer reports for a RandomForestRegressor.
+    #
+    # For a leaf L and feature j, let a_j(x) say whether x satisfies every
+    # split on j along the path to L, and r_j the share of training cover
+    # that followed those splits. With the features in S known, the forest's
+    # expected output v(S) is the mean over trees of sum over L of value_L *
+    # prod_{j in S} a_j * prod_{j not in S} r_j, and the Shapley values are
+    # fixed weighted sums of the 2^M values v(S). Each a_j only depends on
+    # which interval between the forest's split thresholds x_j falls in, so
+    # v(S) is a lookup table over the intervals of the features in S: every
+    # leaf adds its weight to a box of cells, built with one difference
+    # array and a cumulative sum per axis. Explaining a row is then one
+    # gather per subset, whatever the number of leaves; v(all features) is
+    # the prediction itself, so that table is never built.
+
+    def __init__(self, forest, categorical=None):
+        # `categorical` maps a feature index to the (scaled) values it can
+        # take, e.g. the category codes; only the intervals holding one of
+        # them get table cells, which keeps the tables several times smaller
+        if forest.cover is None:
+            raise ValueError("The forest has no node cover; re-export it to get contributions")
+        categorical = categorical or {}
+        n_features = len(FEATURE_COLUMNS)
+        self.forest = forest
+        self.n_trees = forest.n_trees
+        lower, upper, ratio, leaves = _leaf_paths(forest, n_features)
+        values = np.asarray(forest.value, dtype=np.float64)[leaves] / self.n_trees
+        self.expected_value = float((values * ratio.prod(axis=1)).sum())
+        self.n_leaves = len(leaves)
+
+        # Per feature: the interval bounds, the table cell of each interval
+        # (-1 for intervals no allowed value falls in), and each leaf's cells
+        # as the half-open range [first, last)
+        self.edges, self.cells, sizes, first, last = [], [], [], [], []
+        for j in range(n_features):
+            # Exact in float32, like the thresholds FlatForest compares against
+            lo, hi = round_down_float32(lower[:, j]), round_down_float32(upper[:, j])
+            edges = np.unique(np.concatenate([lo[np.isfinite(lo)], hi[np.isfinite(hi)]]))
+            lo_rank = np.where(np.isfinite(lo), np.searchsorted(edges, lo), -1)
+            hi_rank = np.where(np.isfinite(hi), np.searchsorted(edges, hi), len(edges))
+            if j in categorical:
+                allowed = np.asarray(categorical[j], dtype=np.float32)
+                kept = np.unique(np.searchsorted(edges, allowed, side="left"))
+            else:
+                kept = np.arange(len(edges) + 1)
+            cells = np.full(len(edges) + 1, -1, dtype=np.intp)
+            cells[kept] = np.arange(len(kept))
+            # A leaf is reached from intervals lo_rank + 1 .. hi_rank
+            first.append(np.searchsorted(kept, lo_rank + 1, side="left"))
+            last.append(np.searchsorted(kept, hi_rank, side="right"))
+            self.edges.append(edges)
+            self.cells.append(cells)
+            sizes.append(len(kept))
+
+        # v(S) for every proper, non-empty subset, as one flat array; subset
+        # `mask` starts at offsets[mask] and is laid out column-major over
+        # its features in index order, so lengths[mask] is its cell count
+        full = (1 << n_features) - 1
+        tables, self.offsets, self.lengths = [], [0] * full, [1] * full
+        total = 0
+        for mask in range(1, full):
+            axes = [j for j in range(n_features) if mask >> j & 1]
+            outside = [j for j in range(n_features) if not mask >> j & 1]
+            tables.append(_subset_table([sizes[j] for j in axes], [first[j] for j in axes],
+                                        [last[j] for j in axes], values * ratio[:, outside].prod(axis=1)))
+            self.offsets[mask], self.lengths[mask] = total, len(tables[-1])
+            total += len(tables[-1])
+        self.table = np.concatenate(tables)
+
+        # phi_i = sum over S of weights[S, i] * v(S): the Shapley weight
+        # |S|! (M - |S| - 1)! / M! of each S that i joins
+        self.weights = np.zeros((full + 1, n_features))
+        for mask in range(full + 1):
+            for i in range(n_features):
+                size = bin(mask & ~(1 << i)).count("1")
+                weight = math.factorial(size) * math.factorial(n_features - size - 1) / math.factorial(n_features)
+                self.weights[mask, i] = weight if mask >> i & 1 else -weight
+
+    def interval_cells(self, X):
+        # (n_features, n_rows) table cell of each value. Like FlatForest, a
+        # split sends x left when x <= threshold, so the interval is the
+        # number of bounds strictly below x.
+        cells = np.empty((len(self.edges), len(X)), dtype=np.intp)
+        for j, (edges, lookup) in enumerate(zip(self.edges, self.cells)):
+            cells[j] = lookup[np.searchsorted(edges, X[:, j], side="left")]
+        if (cells < 0).any():
+            raise ValueError("Contributions need categorical features to hold category codes")
+        return cells
+
+    def explain(self, X_scaled, prediction=None, block_size=BLOCK_SIZE):
+        # (n_rows, n_features) contributions; each row sums to the forest's
+        # prediction minus expected_value. `prediction` saves recomputing the
+        # forest's output when the caller already has it.
+        X = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        if prediction is None:
+            prediction = self.forest.predict(X)
+        full = len(self.weights) - 1
+        out = np.empty((len(X), self.weights.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), block_size):
+            cells = self.interval_cells(X[start:start + block_size])
+            n_rows = cells.shape[1]
+            v = np.empty((n_rows, full + 1))
+            v[:, 0] = self.expected_value
+            v[:, full] = prediction[start:start + block_size]
+            index = np.zeros((full, n_rows), dtype=np.intp)
+            for mask in range(1, full):
+                # Column-major: the subset's highest feature has the largest
+                # stride, the cell count of the subset without it
+                top = mask.bit_length() - 1
+                rest = mask ^ (1 << top)
+                index[mask] = index[rest] + cells[top] * self.lengths[rest]
+                v[:, mask] = self.table[self.offsets[mask] + index[mask]]
+            out[start:start + n_rows] = v @ self.weights
+        return out
+
+
+def _subset_table(sizes, first, last, weight):
+    # Sum of every leaf's weight over the box of cells [first, last) it's
+    # reached from, column-major over an array of shape `sizes`. Each leaf
+    # adds +-weight at its box corners in an array one larger per axis, and
+    # a cumulative sum along every axis spreads it over the box.
+    reached = np.logical_and.reduce([f < l for f, l in zip(first, last)])
+    shape = [size + 1 for size in sizes]
+    index, signed = [], []
+    for corner in range(1 << len(sizes)):
+        flat, stride, sign = 0, 1, 1.0
+        for axis, size in enumerate(shape):
+            if corner >> axis & 1:
+                flat = flat + last[axis][reached] * stride
+                sign = -sign
+            else:
+                flat = flat + first[axis][reached] * stride
+            stride *= size
+        index.append(flat)
+        signed.append(sign * weight[reached])
+    table = np.bincount(np.concatenate(index), np.concatenate(signed), minlength=math.prod(shape))
+    table = table.reshape(shape, order="F")
+    for axis in range(len(shape)):
+        table = np.cumsum(table, axis=axis)
+    return table[tuple(slice(0, size) for size in sizes)].ravel(order="F")
+
+
+def _leaf_paths(forest, n_features):
+    # Per leaf: the interval (lower, upper] each feature must fall in to
+    # reach it and the cover share r_j of its path's splits on each feature
+    feature = np.asarray(forest.feature)
+    threshold = np.asarray(forest.threshold, dtype=np.float64)
+    children = np.asarray(forest.children)
+    cover = np.asarray(forest.cover, dtype=np.float64)
+    n_nodes = len(feature)
+
+    lower = np.full((n_nodes, n_features), -np.inf)
+    upper = np.full((n_nodes, n_features), np.inf)
+    ratio = np.ones((n_nodes, n_features))
+    is_leaf = children[:, 0] == np.arange(n_nodes)
+    frontier = np.asarray(forest.roots, dtype=np.intp)
+    leaves = []
+    # Push each level's bounds and ratios down to its children
+    while len(frontier):
+        leaves.append(frontier[is_leaf[frontier]])
+        nodes = frontier[~is_leaf[frontier]]
+        f = feature[nodes]
+        for side in (0, 1):
+            child = children[nodes, side]
+            lower[child], upper[child], ratio[child] = lower[nodes], upper[nodes], ratio[nodes]
+            if side == 0:
+                upper[child, f] = np.minimum(upper[nodes, f], threshold[nodes])
+            else:
+                lower[child, f] = np.maximum(lower[nodes, f], threshold[nodes])
+            ratio[child, f] *= cover[child] / cover[nodes]
+        frontier = children[nodes].ravel()
+    leaves = np.sort(np.concatenate(leaves))
+    return lower[leaves], upper[leaves], ratio[leaves], leaves
+
+
+def path_expectations(forest, x):
+    # v(S) for every subset mask S of one scaled row, straight from the
+    # trees: a split on a known feature follows x, any other averages its
+    # children by cover. Slow; a reference to check the tables against.
+    feature = np.asarray(forest.feature)
+    threshold = np.asarray(forest.threshold, dtype=np.float64)
+    children = np.asarray(forest.children)
+    cover = np.asarray(forest.cover, dtype=np.float64)
+    value = np.asarray(forest.value, dtype=np.float64)
+    is_leaf = children[:, 0] == np.arange(len(feature))
+    x = np.asarray(x, dtype=np.float32).astype(np.float64)
+    out = np.empty(1 << len(FEATURE_COLUMNS))
+    for mask in range(len(out)):
+        nodes = np.asarray(forest.roots, dtype=np.intp)
+        weight = np.ones(len(nodes))
+        total = 0.0
+        while len(nodes):
+            leaf = is_leaf[nodes]
+            total += (weight[leaf] * value[nodes[leaf]]).sum()
+            nodes, weight = nodes[~leaf], weight[~leaf]
+            f = feature[nodes]
+            known = (mask >> f & 1).astype(bool)
+            follow = children[nodes[known], (x[f[known]] > threshold[nodes[known]]).astype(np.intp)]
+            both = children[nodes[~known]]
+            share = cover[both] / cover[nodes[~known], None]
+            nodes = np.concatenate([follow, both.ravel()])
+            weight = np.concatenate([weight[known], (weight[~known, None] * share).ravel()])
+        out[mask] = total / forest.n_trees
+    return out
+
+
+def linear_contributions(classifier, X_scaled, class_idx):
+    # Each feature's term coef * x in the score of the class in `class_idx`
+    # (3+ classes, as the salary levels are); with the class intercept they
+    # add up to that score. Features are scaled, so 0 is the training median.
+    classes = list(np.asarray(classifier.classes_))
+    rows = [classes.index(c) for c in class_idx]
+    return np.asarray(classifier.intercept_)[rows], np.asarray(X_scaled) * np.asarray(classifier.coef_)[rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and time the exact forest contributions.")
+    parser.add_argument("--models-dir", default=".")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--check", type=int, default=20, help="Rows to check against a walk of the trees")
+    args = parser.parse_args(argv)
+
+    from synthetic_data import SyntheticSalaryData
+
+    pipeline = InferencePipeline.from_artifacts(*load_artifacts(args.models_dir),
+                                                level_cuts=load_level_cuts(args.models_dir))
+    start = time.perf_counter()
+    explainer = pipeline.explainer
+    build_seconds = time.perf_counter() - start
+
+    X, valid = pipeline.transform(SyntheticSalaryData().generate(args.rows, seed=0))
+    X = X[valid]
+    start = time.perf_counter()
+    predicted = pipeline.predict_salary(X)
+    predict_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    phi = explainer.explain(X, predicted)
+    explain_seconds = time.perf_counter() - start
+
+    gap = 0.0
+    for x, row in zip(X[:args.check], phi):
+        gap = max(gap, np.abs(path_expectations(pipeline.flat_forest, x) @ explainer.weights - row).max())
+    print(f"{explainer.n_leaves:,} leaves, {explainer.table.nbytes / 2 ** 20:.1f} MB of tables "
+          f"built in {build_seconds:.2f}s")
+    print(f"Expected value {explainer.expected_value:,.2f}; max gap to the tree walk "
+          f"over {min(args.check, len(X))} rows = {gap:.2e}")
+    print(f"✅ {len(X):,} rows explained in {explain_seconds * 1000:.1f} ms "
+          f"(predict: {predict_seconds * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import RobustScaler
+
+from artifacts import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, LEVEL_LABELS, TARGET_COLUMN
+from encoding import CategoryEncoder
+
+CACHE_DIR = "data_cache"
+CACHE_FORMAT_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+DICTIONARY_FILE = "dictionary.json"
+SCALER_FILE = "scaler.pkl"
+
+# Integer codes and numbers stored as one .npy file per column
+_COLUMN_DTYPES = {
+    "Age": np.float64,
+    "Gender": np.int32,
+    "Education Level": np.int32,
+    "Job Title": np.int32,
+    "Years of Experience": np.float64,
+    TARGET_COLUMN: np.float64,
+    "Salary_Class": np.int8,
+}
+
+
+def file_fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def preprocess_settings(streaming=False, iqr_factor=None):
+    # Everything besides the CSV contents that changes the cleaned rows
+    from training import IQR_FACTOR
+
+    return {
+        "format_version": CACHE_FORMAT_VERSION,
+        "method": "streaming" if streaming else "exact",
+        "iqr_factor": IQR_FACTOR if iqr_factor is None else iqr_factor,
+        "feature_columns": FEATURE_COLUMNS,
+        "levels": [LEVEL_LABELS[i] for i in sorted(LEVEL_LABELS)],
+    }
+
+
+class CachedDataset:
+    # Memory-mapped view of a cached, cleaned dataset: one array per column
+    # (categoricals as encoder codes), the scaled feature matrix, and the
+    # encoders/scaler that produced them.
+
+    def __init__(self, path, mmap_mode="r"):
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(path, DICTIONARY_FILE)) as f:
+            self.categories = json.load(f)
+        self.path = path
+        self.rows = self.manifest["rows"]
+        self.columns = {col: np.load(os.path.join(path, f"{_file_name(col)}.npy"), mmap_mode=mmap_mode)
+                        for col in _COLUMN_DTYPES}
+        self.X_scaled = np.load(os.path.join(path, "features_scaled.npy"), mmap_mode=mmap_mode)
+        self.scaler = joblib.load(os.path.join(path, SCALER_FILE))
+        self.encoders = {col: CategoryEncoder(self.categories[col], self.manifest["fill_labels"][col])
+                         for col in CATEGORICAL_COLUMNS}
+
+    @property
+    def level_cuts(self):
+        return self.manifest["level_cuts"]
+
+    @property
+    def salary(self):
+        return self.columns[TARGET_COLUMN]
+
+    @property
+    def salary_class(self):
+        return self.columns["Salary_Class"]
+
+    def features(self):
+        # Encoded, unscaled feature matrix
+        return np.column_stack([self.columns[col] for col in FEATURE_COLUMNS]).astype(np.float64)
+
+    def frame(self):
+        # The cleaned rows in the shape training.preprocess returns
+        df = pd.DataFrame({col: np.asarray(values) for col, values in self.columns.items()})
+        df["Salary_Class"] = pd.Categorical.from_codes(df["Salary_Class"], self.manifest["settings"]["levels"],
+                                                       ordered=True)
+        return df
+
+
+def _file_name(col):
+    return col.lower().replace(" ", "_")
+
+
+def build_cache(data_path, cache_dir=CACHE_DIR, streaming=False, iqr_factor=None):
+    # Clean `data_path` once and write the result as a new cache version. The
+    # cache is filled under a temporary name and renamed into place.
+    from training import level_cuts, preprocess, streaming_preprocess
+
+    settings = preprocess_settings(streaming, iqr_factor)
+    if streaming:
+        df, encoders = streaming_preprocess(data_path, settings["iqr_factor"])
+    else:
+        df, encoders = preprocess(pd.read_csv(data_path), settings["iqr_factor"])
+    scaler = RobustScaler()
+    X_scaled = scaler.fit_transform(df[FEATURE_COLUMNS])
+
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=cache_dir)
+    columns = {col: df[col].to_numpy() for col in _COLUMN_DTYPES if col != "Salary_Class"}
+    columns["Salary_Class"] = df["Salary_Class"].cat.codes.to_numpy()
+    for col, dtype in _COLUMN_DTYPES.items():
+        np.save(os.path.join(staging, f"{_file_name(col)}.npy"), np.ascontiguousarray(columns[col], dtype=dtype))
+    np.save(os.path.join(staging, "features_scaled.npy"), np.ascontiguousarray(X_scaled, dtype=np.float64))
+    joblib.dump(scaler, os.path.join(staging, SCALER_FILE))
+    with open(os.path.join(staging, DICTIONARY_FILE), "w") as f:
+        json.dump({col: [str(label) for label in encoders[col].classes_] for col in CATEGORICAL_COLUMNS}, f)
+
+    stat = os.stat(data_path)
+    manifest = {
+        "source": os.path.abspath(data_path),
+        "source_sha256": file_fingerprint(data_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "settings": settings,
+        "rows": len(df),
+        "level_cuts": level_cuts(df[TARGET_COLUMN]),
+        "fill_labels": {col: encoders[col].fill_label for col in CATEGORICAL_COLUMNS},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    target = os.path.join(cache_dir, _cache_key(data_path, settings))
+    if os.path.exists(target):
+        # Move the stale copy aside first; open memory maps stay valid
+        stale = tempfile.mkdtemp(prefix=".stale-", dir=cache_dir)
+        os.rename(target, os.path.join(stale, "old"))
+        os.rename(staging, target)
+        shutil.rmtree(stale)
+    else:
+        os.rename(staging, target)
+    return target
+
+
+def _cache_key(data_path, settings):
+    # One cache per (source file, settings); the contents hash is checked
+    # separately so an edited CSV replaces its cache instead of adding one
+    key = json.dumps({"source": os.path.abspath(data_path), "settings": settings}, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def cache_is_fresh(path, data_path, settings):
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest["settings"] != settings:
+        return False
+    stat = os.stat(data_path)
+    if stat.st_size != manifest["source_size"]:
+        return False
+    if stat.st_mtime_ns == manifest["source_mtime_ns"]:
+        return True
+    # Touched but maybe not changed: fall back to hashing the contents
+    return file_fingerprint(data_path) == manifest["source_sha256"]
+
+
+def open_dataset(data_path="salary_data.csv", cache_dir=CACHE_DIR, streaming=False, iqr_factor=None,
+                 mmap_mode="r"):
+    # Memory-map the cached dataset for `data_path`, rebuilding it first when
+    # the CSV or the preprocessing settings have changed
+    settings = preprocess_settings(streaming, iqr_factor)
+    path = os.path.join(cache_dir, _cache_key(data_path, settings))
+    if not cache_is_fresh(path, data_path, settings):
+        path = build_cache(data_path, cache_dir, streaming, iqr_factor)
+    return CachedDataset(path, mmap_mode)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the columnar training data cache.")
+    parser.add_argument("--data", default="salary_data.csv")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--streaming", action="store_true", help="Clean the CSV with the out-of-core preprocessor")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the cache is fresh")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.rebuild:
+        build_cache(args.data, args.cache_dir, args.streaming)
+    dataset = open_dataset(args.data, args.cache_dir, args.streaming)
+    print(f"✅ {dataset.rows:,} rows cached at {dataset.path} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import argparse
+import copy
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from artifacts import BASELINE_FILE, CATEGORICAL_COLUMNS, FEATURE_COLUMNS, LEVEL_LABELS, load_artifacts, load_level_cuts
+from sketches import FrequentItems, KLLSketch
+
+NUMERIC_COLUMNS = ["Age", "Years of Experience"]
+SALARY_COLUMN = "Predicted Salary"
+LEVEL_COLUMN = "Predicted Level"
+MONITORED_NUMERIC = NUMERIC_COLUMNS + [SALARY_COLUMN]
+MONITORED_CATEGORICAL = CATEGORICAL_COLUMNS + [LEVEL_COLUMN]
+
+# Numeric values are binned on the baseline's deciles
+N_BINS = 10
+REPORT_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+# Single observations are buffered and added to the sketches this many at a time
+DEFAULT_BUFFER_ROWS = 2048
+# Scores cover the last one to two windows of traffic
+DEFAULT_WINDOW_ROWS = 10_000
+# Distinct values tracked per categorical input; rarer unseen values are
+# still counted as unseen
+DEFAULT_CAPACITY = 1_000
+SKETCH_K = 200
+# Usual PSI reading: below 0.1 stable, 0.1-0.25 moderate shift, above 0.25 drifted
+PSI_MODERATE = 0.1
+PSI_DRIFTED = 0.25
+# Share floor so a bin that is empty on one side doesn't make PSI infinite
+PSI_EPSILON = 1e-4
+# Fewer recent rows than this are reported as too few to judge
+MIN_ROWS = 100
+
+
+def build_baseline(columns, salary, level):
+    # Distribution profile of the training rows: decile bins and quantiles for
+    # the numeric inputs and the predicted salary, category shares for the
+    # categorical inputs and the predicted level. `columns` maps each input
+    # to its raw values; `level` holds class indexes.
+    columns = dict(columns)
+    columns[SALARY_COLUMN] = salary
+    columns[LEVEL_COLUMN] = [LEVEL_LABELS.get(int(c), "Unknown") for c in level]
+    baseline = {"rows": len(salary), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "numeric": {}, "categorical": {}}
+    for col in MONITORED_NUMERIC:
+        values = np.asarray(columns[col], dtype=np.float64)
+        values = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, N_BINS + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        baseline["numeric"][col] = {
+            "edges": edges.tolist(),
+            "shares": (counts / len(values)).tolist(),
+            "quantiles": np.quantile(values, REPORT_QUANTILES).tolist(),
+        }
+    for col in MONITORED_CATEGORICAL:
+        values, counts = np.unique(np.asarray(columns[col], dtype=str), return_counts=True)
+        baseline["categorical"][col] = dict(zip(values.tolist(), (counts / counts.sum()).tolist()))
+    return baseline
+
+
+def save_baseline(output_dir, baseline):
+    path = os.path.join(output_dir, BASELINE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(baseline, f)
+    os.replace(path + ".tmp", path)
+
+
+def load_baseline(directory="."):
+    path = os.path.join(directory, BASELINE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def psi(expected, actual):
+    # Population stability index between two share vectors
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def drift_status(score, rows):
+    if math.isnan(score):
+        return "no data"
+    if rows < MIN_ROWS:
+        return "too few rows"
+    return "drifted" if score >= PSI_DRIFTED else "moderate" if score >= PSI_MODERATE else "stable"
+
+
+def _as_float(values):
+    # Non-numeric values become NaN (and are skipped)
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(np.float64)
+
+
+def _count(values):
+    # Counts of the non-missing values, as strings like the baseline's keys
+    return Counter(value if isinstance(value, str) else str(value) for value in values
+                   if value is not None and value == value)
+
+
+class _Window:
+    # Sketches of one window of traffic: fixed bin counts and a KLL sketch
+    # per numeric column, bounded Misra-Gries counters per categorical one
+
+    def __init__(self, baseline, capacity, sketch_k):
+        self.rows = 0
+        self.bins = {col: np.zeros(len(spec["edges"]) + 1, dtype=np.int64)
+                     for col, spec in baseline["numeric"].items()}
+        self.quantiles = {col: KLLSketch(sketch_k) for col in baseline["numeric"]}
+        self.categories = {col: FrequentItems(capacity) for col in baseline["categorical"]}
+
+    def update(self, block, edges):
+        self.rows += block["rows"]
+        for col, values in block["numeric"].items():
+            values = values[~np.isnan(values)]
+            self.bins[col] += np.bincount(np.searchsorted(edges[col], values, side="right"),
+                                          minlength=len(self.bins[col]))
+            self.quantiles[col].update(values)
+        for col, counts in block["categorical"].items():
+            self.categories[col].update_counts(counts)
+
+    def merge(self, other):
+        self.rows += other.rows
+        for col in self.bins:
+            self.bins[col] += other.bins[col]
+            self.quantiles[col].merge(other.quantiles[col])
+        for col in self.categories:
+            self.categories[col].merge(other.categories[col])
+        return self
+
+
+class DriftMonitor:
+    # Compares live inputs and predictions with the training baseline in
+    # fixed memory. Observations go into a small buffer (a list append under
+    # a lock) that is folded into mergeable sketches every `buffer_rows` rows,
+    # so the per-prediction cost is a few microseconds. Sketches are kept for
+    # the current window and the previous complete one; scores cover both,
+    # i.e. the last `window_rows` to 2 * `window_rows` rows. Every flush
+    # updates the salary_drift_* gauges in metrics.
+
+    def __init__(self, baseline, window_rows=DEFAULT_WINDOW_ROWS, buffer_rows=DEFAULT_BUFFER_ROWS,
+                 capacity=DEFAULT_CAPACITY, sketch_k=SKETCH_K):
+        self.baseline = baseline
+        self.window_rows = window_rows
+        self.buffer_rows = buffer_rows
+        self.capacity = capacity
+        self.sketch_k = sketch_k
+        self.observed = 0
+        self._edges = {col: np.asarray(spec["edges"]) for col, spec in baseline["numeric"].items()}
+        self._current = self._new_window()
+        self._previous = None
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_directory(cls, directory=".", **kwargs):
+        # None when the models were saved without a baseline
+        baseline = load_baseline(directory)
+        return cls(baseline, **kwargs) if baseline is not None else None
+
+    def _new_window(self):
+        return _Window(self.baseline, self.capacity, self.sketch_k)
+
+    def observe_one(self, age, gender, education, job_title, experience, salary=None, level=None):
+        # One interactive prediction; salary/level are None when not computed
+        with self._lock:
+            self._buffer.append((age, gender, education, job_title, experience, salary, level))
+            if len(self._buffer) >= self.buffer_rows:
+                self._flush()
+
+    def observe(self, columns, salary=None, level=None):
+        # A batch: `columns` maps input names to raw values (a DataFrame works);
+        # `salary` / `level` (class indexes, -1 or NaN where not scored) are
+        # aligned with the rows
+        n = len(columns[NUMERIC_COLUMNS[0]])
+        block = self._block(
+            {col: columns[col] for col in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS},
+            np.full(n, np.nan) if salary is None else salary,
+            [None] * n if level is None else level,
+            n,
+        )
+        with self._lock:
+            self._update(block)
+
+    def _block(self, columns, salary, level, n):
+        numeric = {col: _as_float(columns[col]) for col in NUMERIC_COLUMNS}
+        numeric[SALARY_COLUMN] = _as_float(salary)
+        categorical = {col: _count(columns[col]) for col in CATEGORICAL_COLUMNS}
+        levels = _as_float(level)
+        categorical[LEVEL_COLUMN] = _count(LEVEL_LABELS.get(int(c), "Unknown") for c in levels[levels >= 0])
+        return {"rows": n, "numeric": numeric, "categorical": categorical}
+
+    def _flush(self):
+        # Caller holds the lock
+        if not self._buffer:
+            return
+        rows = list(zip(*self._buffer))
+        n = len(self._buffer)
+        self._buffer = []
+        columns = dict(zip(FEATURE_COLUMNS, rows[:5]))
+        salary = [np.nan if value is None else value for value in rows[5]]
+        self._update(self._block(columns, salary, rows[6], n))
+
+    def _update(self, block):
+        self._current.update(block, self._edges)
+        self.observed += block["rows"]
+        metrics.DRIFT_ROWS.inc(block["rows"])
+        if self._current.rows >= self.window_rows:
+            self._previous, self._current = self._current, self._new_window()
+        for col, (score, unseen) in self._scores().items():
+            metrics.DRIFT_PSI.set(round(score, 6), feature=col)
+            if unseen is not None:
+                metrics.DRIFT_UNSEEN.set(round(unseen, 6), feature=col)
+
+    def _scores(self):
+        # feature -> (PSI, unseen share or None) over the current and previous
+        # windows, from the bin and category counts only
+        windows = [w for w in (self._previous, self._current) if w is not None]
+        scores = {}
+        for col, spec in self.baseline["numeric"].items():
+            counts = sum(w.bins[col] for w in windows)
+            total = counts.sum()
+            scores[col] = (psi(spec["shares"], counts / total) if total else math.nan, None)
+        for col, shares in self.baseline["categorical"].items():
+            total = sum(w.categories[col].count for w in windows)
+            if not total:
+                scores[col] = (math.nan, math.nan)
+                continue
+            known = np.array([sum(w.categories[col].counts.get(value, 0) for w in windows) for value in shares])
+            unseen = max(total - known.sum(), 0)
+            # Unseen values share one extra bucket the baseline gives ~0
+            score = psi(list(shares.values()) + [0.0], np.append(known, unseen) / total)
+            scores[col] = (score, unseen / total)
+        return scores
+
+    def report(self):
+        # Drift per monitored column as a DataFrame: PSI, status, unseen share
+        # and most frequent unseen values (categorical), and baseline vs
+        # recent quantiles (numeric)
+        with self._lock:
+            self._flush()
+            scores = self._scores()
+            windows = [copy.deepcopy(w) for w in (self._previous, self._current) if w is not None]
+        recent = windows[0]
+        for window in windows[1:]:
+            recent.merge(window)
+
+        rows = []
+        for col, (score, unseen) in scores.items():
+            row = {"Feature": col, "Rows": recent.rows, "PSI": score, "Status": drift_status(score, recent.rows)}
+            if col in self.baseline["numeric"]:
+                sketch = recent.quantiles[col]
+                baseline_quantiles = self.baseline["numeric"][col]["quantiles"]
+                row["Baseline p50"] = baseline_quantiles[REPORT_QUANTILES.index(0.5)]
+                row["Recent p50"] = sketch.quantile(0.5)
+                row["Baseline p5-p95"] = f"{baseline_quantiles[0]:,.0f}-{baseline_quantiles[-1]:,.0f}"
+                row["Recent p5-p95"] = (f"{sketch.quantile(0.05):,.0f}-{sketch.quantile(0.95):,.0f}"
+                                        if sketch.count else "")
+            else:
+                known = self.baseline["categorical"][col]
+                top = sorted(((count, value) for value, count in recent.categories[col].counts.items()
+                              if value not in known), reverse=True)[:3]
+                row["Unseen Share"] = unseen
+                row["Top Unseen"] = ", ".join(str(value) for _, value in top)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def reset(self):
+        with self._lock:
+            self._buffer = []
+            self._current, self._previous = self._new_window(), None
+
+
+def training_baseline(data_path="salary_data.csv", models_dir="."):
+    # Baseline for the saved models from the rows they were trained on
+    from data_cache import open_dataset
+    from inference import InferencePipeline
+
+    dataset = open_dataset(data_path)
+    pipeline = InferencePipeline.from_artifacts(*load_artifacts(models_dir), level_cuts=load_level_cuts(models_dir))
+    salary, level, _ = pipeline.predict(np.ascontiguousarray(dataset.X_scaled))
+    return build_baseline(raw_columns(dataset.columns, dataset.encoders), salary, level)
+
+
+def raw_columns(columns, encoders):
+    # Encoded training columns (categoricals as encoder codes) as raw inputs
+    raw = {col: np.asarray(columns[col]) for col in FEATURE_COLUMNS}
+    for col in CATEGORICAL_COLUMNS:
+        raw[col] = encoders[col].inverse_transform(raw[col].astype(np.intp))
+    return raw
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save the training baseline the drift monitor compares traffic with. "
+                                                 "Check a CSV against it with batch_scoring.py --drift.")
+    parser.add_argument("--data", default="salary_data.csv", help="Data the models were trained on")
+    parser.add_argument("--models-dir", default=".")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    baseline = training_baseline(args.data, args.models_dir)
+    save_baseline(args.models_dir, baseline)
+    print(f"✅ Saved a drift baseline of {baseline['rows']:,} rows to {args.models_dir} "
+          f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from artifacts import CATEGORICAL_COLUMNS, ENCODERS_FILE
+
+try:
+    # pandas stores CSV strings in Arrow when it is installed; matching them
+    # there skips converting every value to a Python object
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+# What inverse_transform returns for the reserved bucket
+UNKNOWN_LABEL = "<unknown>"
+
+
+class CategoryEncoder:
+    # Drop-in for LabelEncoder on one categorical column. Labels are looked up
+    # in a precomputed hash table: a dict for single values, the hash engine
+    # of a pandas Index (or Arrow's, for Arrow-backed strings) for batches.
+    # Known labels keep LabelEncoder's codes
+    # (sorted order), so existing encoders.pkl files and the models fitted on
+    # them stay valid; the file itself keeps LabelEncoders (see
+    # as_label_encoder). Unseen labels go to a reserved bucket, code
+    # len(classes_), instead of raising. No model was trained on that code, so
+    # `fill_code` is the code they are given for it instead: the training
+    # mode, the way the notebook fills missing values (None rejects them).
+
+    def __init__(self, classes=None, fill_label=None):
+        self.fill_label = fill_label
+        if classes is not None:
+            self.classes_ = classes
+
+    @property
+    def classes_(self):
+        return self._classes
+
+    @classes_.setter
+    def classes_(self, classes):
+        # Also rebuilds the lookup tables (incremental updates append labels)
+        self._classes = np.asarray(classes, dtype=object)
+        self._index = pd.Index(self._classes)
+        self.code_map = {label: code for code, label in enumerate(self._classes.tolist())}
+        labels = self._classes.tolist()
+        self._arrow_labels = pa.array(labels) if pa is not None and all(isinstance(v, str) for v in labels) else None
+
+    @property
+    def unknown_code(self):
+        return len(self._classes)
+
+    @property
+    def fill_code(self):
+        return None if self.fill_label is None else self.code_map.get(self.fill_label)
+
+    def fit(self, values):
+        values = pd.Series(values, dtype=object).dropna()
+        self.classes_ = np.unique(values.to_numpy())
+        counts = values.value_counts()
+        # Ties go to the smallest label, like DataFrame.mode()
+        self.fill_label = min(counts.index[counts == counts.max()]) if len(counts) else None
+        return self
+
+    def fit_transform(self, values):
+        return self.fit(values).transform(values)
+
+    def code(self, value):
+        return self.code_map.get(value, self.unknown_code)
+
+    def transform(self, values):
+        # Codes for a batch; unseen and missing values get unknown_code
+        if (self._arrow_labels is not None and isinstance(values, pd.Series)
+                and isinstance(values.dtype, pd.StringDtype) and values.dtype.storage == "pyarrow"):
+            codes = pc.index_in(pa.array(values.array), value_set=self._arrow_labels)
+            return pc.fill_null(codes, self.unknown_code).to_numpy().astype(np.intp)
+        if not isinstance(values, pd.Series):
+            values = np.asarray(values, dtype=object)
+        codes = self._index.get_indexer(values)
+        codes[codes < 0] = self.unknown_code
+        return codes
+
+    def model_codes(self, codes):
+        # The codes the models are given: the bucket becomes fill_code (-1
+        # where there is none, for the caller to reject)
+        codes = np.asarray(codes)
+        fill = -1 if self.fill_code is None else self.fill_code
+        return np.where(codes == self.unknown_code, fill, codes)
+
+    def inverse_transform(self, codes):
+        labels = np.append(self._classes, UNKNOWN_LABEL)
+        return labels[np.asarray(codes, dtype=np.intp)]
+
+    def __getstate__(self):
+        # The tables are rebuilt on load
+        return {"classes": self._classes.tolist(), "fill_label": self.fill_label}
+
+    def __setstate__(self, state):
+        self.fill_label = state["fill_label"]
+        self.classes_ = state["classes"]
+
+
+def as_category_encoder(encoder):
+    # A CategoryEncoder with the codes of `encoder`: a fitted LabelEncoder
+    # from encoders.pkl (its fill label, if any, in a `fill_label`
+    # attribute) or a CategoryEncoder, returned as is
+    if isinstance(encoder, CategoryEncoder):
+        return encoder
+    return CategoryEncoder(encoder.classes_, getattr(encoder, "fill_label", None))
+
+
+def as_label_encoder(encoder):
+    # The form encoders.pkl stores: a plain sklearn LabelEncoder, so the
+    # notebook and any other loader can read the file, with the fill label
+    # kept as an extra attribute
+    from sklearn.preprocessing import LabelEncoder
+
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.asarray(encoder.classes_, dtype=object)
+    label_encoder.fill_label = getattr(encoder, "fill_label", None)
+    return label_encoder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record each column's training mode in encoders.pkl, so unseen "
+                                                 "labels are scored as it instead of rejected. The LabelEncoders "
+                                                 "and their codes are kept.")
+    parser.add_argument("--data", default="salary_data.csv", help="Data the encoders were fitted on (for the modes)")
+    parser.add_argument("--models-dir", default=".")
+    args = parser.parse_args(argv)
+
+    from training import atomic_dump
+
+    start = time.perf_counter()
+    path = os.path.join(args.models_dir, ENCODERS_FILE)
+    encoders = joblib.load(path)
+    raw = pd.read_csv(args.data, usecols=CATEGORICAL_COLUMNS)
+    modes = {col: CategoryEncoder().fit(raw[col]).fill_label for col in CATEGORICAL_COLUMNS}
+    upgraded = {col: as_label_encoder(CategoryEncoder(encoders[col].classes_, modes[col]))
+                for col in CATEGORICAL_COLUMNS}
+    for col in CATEGORICAL_COLUMNS:
+        if list(upgraded[col].classes_) != list(encoders[col].classes_):
+            raise ValueError(f"{col} codes changed during the upgrade")
+    atomic_dump(upgraded, path)
+    fills = ", ".join(f"{col}: {modes[col]}" for col in CATEGORICAL_COLUMNS)
+    print(f"✅ Recorded fill labels in {path} ({fills}) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.model_selection import KFold, StratifiedKFold
+
+from training import CLASSIFIERS, DATA_FILE, REGRESSORS
+
+CACHE_DIR = "evaluation_cache"
+DEFAULT_FOLDS = 5
+DEFAULT_BOOTSTRAPS = 1000
+CI_LEVEL = 0.95
+# Bootstrap resamples are scored in blocks of about this many weights, so
+# memory stays bounded however many rows there are
+BOOTSTRAP_BLOCK = 1 << 22
+
+REGRESSION_METRICS = ["MAE", "MSE", "RMSE", "R2 Score"]
+CLASSIFICATION_METRICS = ["Accuracy", "Precision", "Recall", "F1 Score", "Confidence Score"]
+# The per-fold score training.py reports as "CV <name> Mean/Std"
+CV_SCORING = {"regression": ("r2", "R2 Score"), "classification": ("accuracy", "Accuracy")}
+
+
+def regression_scores(y_true, y_pred, weights):
+    # All regression metrics for every row of `weights` (n_sets, n_rows) at
+    # once. Row weights are fold indicators for per-fold scores and resample
+    # counts for the bootstrap.
+    weights = np.atleast_2d(weights)
+    total = weights.sum(axis=1)
+    errors = y_pred - y_true
+    mse = weights @ (errors * errors) / total
+    # Centre first so the sum of squares doesn't lose precision on salaries
+    centred = y_true - y_true.mean()
+    mean = weights @ centred / total
+    ss_tot = weights @ (centred * centred) - total * mean * mean
+    return {
+        "MAE": weights @ np.abs(errors) / total,
+        "MSE": mse,
+        "RMSE": np.sqrt(mse),
+        "R2 Score": 1.0 - mse * total / ss_tot,
+    }
+
+
+def classification_scores(y_true, y_pred, confidence, weights, n_classes):
+    # Accuracy and support-weighted precision/recall/F1 (zero_division=0, as
+    # training.classification_metrics reports them) plus the notebook's
+    # confidence score, from one weighted confusion matrix per row of
+    # `weights`
+    weights = np.atleast_2d(weights)
+    total = weights.sum(axis=1)
+    cells = np.zeros((len(y_true), n_classes * n_classes))
+    cells[np.arange(len(y_true)), y_true * n_classes + y_pred] = 1.0
+    confusion = (weights @ cells).reshape(-1, n_classes, n_classes)
+
+    hits = np.diagonal(confusion, axis1=1, axis2=2)
+    support = confusion.sum(axis=2)
+    predicted = confusion.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, hits / predicted, 0.0)
+        recall = np.where(support > 0, hits / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    share = support / total[:, None]
+    return {
+        "Accuracy": hits.sum(axis=1) / total,
+        "Precision": (precision * share).sum(axis=1),
+        "Recall": (recall * share).sum(axis=1),
+        "F1 Score": (f1 * share).sum(axis=1),
+        "Confidence Score": weights @ confidence / total,
+    }
+
+
+def bootstrap_weights(n_rows, n_resamples, rng):
+    # Yields (n, n_rows) blocks of resample counts: row i of a block is how
+    # many times each row was drawn in one bootstrap resample
+    block = max(1, min(n_resamples, BOOTSTRAP_BLOCK // max(n_rows, 1)))
+    for start in range(0, n_resamples, block):
+        n = min(block, n_resamples - start)
+        draws = rng.integers(0, n_rows, size=(n, n_rows)) + (np.arange(n) * n_rows)[:, None]
+        yield np.bincount(draws.ravel(), minlength=n * n_rows).reshape(n, n_rows).astype(np.float64)
+
+
+def _score(task, y_true, predictions, weights, n_classes):
+    if task == "regression":
+        return regression_scores(y_true, predictions["prediction"], weights)
+    return classification_scores(y_true, predictions["prediction"].astype(np.intp), predictions["confidence"],
+                                 weights, n_classes)
+
+
+def summarize(task, y_true, predictions, n_resamples=DEFAULT_BOOTSTRAPS, ci_level=CI_LEVEL, seed=0):
+    # Metrics for one model's out-of-fold predictions: the pooled score,
+    # a percentile bootstrap interval for each metric, and the mean/std of
+    # the per-fold CV score
+    y_true = np.asarray(y_true)
+    n_classes = int(y_true.max()) + 1 if task == "classification" else None
+    fold = predictions["fold"]
+    n_folds = int(fold.max()) + 1
+    pooled = _score(task, y_true, predictions, np.ones(len(y_true)), n_classes)
+    per_fold = _score(task, y_true, predictions, (fold == np.arange(n_folds)[:, None]).astype(np.float64), n_classes)
+
+    scores = {name: float(values[0]) for name, values in pooled.items()}
+    if n_resamples:
+        rng = np.random.default_rng(seed)
+        blocks = [_score(task, y_true, predictions, w, n_classes)
+                  for w in bootstrap_weights(len(y_true), n_resamples, rng)]
+        tail = (1 - ci_level) / 2 * 100
+        for name in pooled:
+            resampled = np.concatenate([block[name] for block in blocks])
+            low, high = np.nanpercentile(resampled, [tail, 100 - tail])
+            scores[f"{name} Low"], scores[f"{name} High"] = float(low), float(high)
+
+    scoring, metric = CV_SCORING[task]
+    scores[f"CV {scoring} Mean"] = float(per_fold[metric].mean())
+    scores[f"CV {scoring} Std"] = float(per_fold[metric].std())
+    return scores
+
+
+def data_fingerprint(X, y):
+    digest = hashlib.sha256()
+    for array in (X, y):
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def model_fingerprint(estimator_class, params):
+    # Class, hyperparameters and sklearn version: anything that can change
+    # what the model predicts for the same data
+    spec = {
+        "class": f"{estimator_class.__module__}.{estimator_class.__qualname__}",
+        "params": {key: repr(value) for key, value in sorted(params.items())},
+        "sklearn": sklearn.__version__,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def make_folds(task, y, n_folds):
+    # The splits cross_val_score(cv=n_folds) uses: stratified for
+    # classifiers, plain k-fold for regressors, both unshuffled
+    splitter = StratifiedKFold(n_folds) if task == "classification" else KFold(n_folds)
+    fold = np.empty(len(y), dtype=np.int16)
+    for i, (_, test_idx) in enumerate(splitter.split(np.zeros((len(y), 1)), y)):
+        fold[test_idx] = i
+    return fold
+
+
+def _cache_path(cache_dir, model_key, data_key, n_folds):
+    key = hashlib.sha256(f"{model_key}:{data_key}:{n_folds}".encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{key}.npz")
+
+
+def _load_cached(path):
+    try:
+        with np.load(path) as cached:
+            return {name: cached[name] for name in cached.files}
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cached(path, predictions):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".npz", dir=directory)
+    os.close(fd)
+    try:
+        np.savez(tmp_path, **predictions)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def save_folds(cache_dir, task, X, y, n_folds):
+    # Writes X, y and the fold ids once per (task, data, folds) as .npy files
+    # that every worker memory-maps read-only. Returns the directory and the
+    # data fingerprint.
+    data_key = data_fingerprint(X, y)
+    directory = os.path.join(cache_dir, "folds", f"{task}-{data_key[:16]}-{n_folds}")
+    if not os.path.isdir(directory):
+        os.makedirs(os.path.dirname(directory), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(directory))
+        for name, array in (("X", X), ("y", y), ("fold", make_folds(task, y, n_folds))):
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Another run saved the same folds first
+            shutil.rmtree(tmp_dir)
+    return directory, data_key
+
+
+def load_folds(directory):
+    return tuple(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ("X", "y", "fold"))
+
+
+# Set in each worker by the pool initializer: task -> (X, y, fold ids)
+_WORKER_DATA = None
+
+
+def _init_worker(data):
+    # `data` maps each task to its fold directory, or to the arrays themselves
+    global _WORKER_DATA
+    _WORKER_DATA = {task: load_folds(value) if isinstance(value, str) else value for task, value in data.items()}
+
+
+def train_subset(folds, fold, train_rows):
+    # The first `train_rows` of a fixed shuffle of the fold's training rows,
+    # in their original order; a larger subset contains every smaller one
+    train = np.flatnonzero(folds != fold)
+    if train_rows is None or train_rows >= len(train):
+        return train
+    return np.sort(np.random.default_rng(fold).permutation(train)[:train_rows])
+
+
+def predict_fold(task, estimator_class, params, fold, train_rows=None):
+    # Fit on every other fold (or `train_rows` of them) and predict this one
+    # (runs in a worker process). Returns (row indices, predictions, per-row
+    # confidence, fit seconds).
+    X, y, folds = _WORKER_DATA[task]
+    test = folds == fold
+    train = train_subset(folds, fold, train_rows)
+    start = time.perf_counter()
+    model = estimator_class(**params).fit(X[train], y[train])
+    predicted = model.predict(X[test])
+    confidence = None
+    if task == "classification":
+        # The notebook's confidence score, per row
+        if hasattr(model, "predict_proba"):
+            confidence = model.predict_proba(X[test]).max(axis=1)
+        else:
+            decision = model.decision_function(X[test])
+            confidence = np.abs(decision).mean(axis=1) if decision.ndim > 1 else np.abs(decision)
+    return np.flatnonzero(test), predicted, confidence, time.perf_counter() - start
+
+
+def evaluate(data, regressors=REGRESSORS, classifiers=CLASSIFIERS, n_folds=DEFAULT_FOLDS,
+             n_resamples=DEFAULT_BOOTSTRAPS, jobs=None, cache_dir=CACHE_DIR, use_cache=True, seed=0):
+    # Cross-validate every candidate and score it with bootstrap intervals.
+    # `data` maps "regression"/"classification" to (X, y). Every (model, fold)
+    # fit that isn't cached runs as one task in a process pool; each model's
+    # out-of-fold predictions are cached under a hash of (model, data, folds),
+    # so unchanged models are never refit, and workers memory-map the folds
+    # from the same cache. All metrics come from those predictions. Returns
+    # one results table per task.
+    candidates = {"regression": regressors, "classification": classifiers}
+    worker_data, labels, predictions, pending, cached_models = {}, {}, {}, [], set()
+    for task, (X, y) in data.items():
+        X, y = np.ascontiguousarray(X), np.ascontiguousarray(y)
+        if use_cache:
+            fold_dir, data_key = save_folds(cache_dir, task, X, y, n_folds)
+            worker_data[task] = fold_dir
+            folds = np.asarray(load_folds(fold_dir)[2])
+        else:
+            folds = make_folds(task, y, n_folds)
+            worker_data[task] = (X, y, folds)
+            data_key = data_fingerprint(X, y)
+        labels[task] = (y, folds)
+        for name, (cls, params) in candidates[task].items():
+            path = _cache_path(cache_dir, model_fingerprint(cls, params), data_key, n_folds)
+            cached = _load_cached(path) if use_cache and os.path.exists(path) else None
+            if cached is not None:
+                predictions[task, name] = cached
+                cached_models.add((task, name))
+            else:
+                pending.append((task, name, cls, params, path))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(worker_data,)) as pool:
+            futures = {(task, name): [pool.submit(predict_fold, task, cls, params, fold) for fold in range(n_folds)]
+                       for task, name, cls, params, _ in pending}
+            for task, name, _, _, path in pending:
+                y, folds = labels[task]
+                result = {"prediction": np.empty(len(y), dtype=np.float64), "fold": folds,
+                          "confidence": np.full(len(y), np.nan), "fit_seconds": np.zeros(n_folds)}
+                for fold, future in enumerate(futures[task, name]):
+                    rows, predicted, confidence, seconds = future.result()
+                    result["prediction"][rows] = predicted
+                    if confidence is not None:
+                        result["confidence"][rows] = confidence
+                    result["fit_seconds"][fold] = seconds
+                if use_cache:
+                    _save_cached(path, result)
+                predictions[task, name] = result
+
+    tables = {}
+    for task in data:
+        y = labels[task][0]
+        rows = []
+        for name in candidates[task]:
+            result = predictions[task, name]
+            scores = summarize(task, y, result, n_resamples, seed=seed)
+            rows.append({"Task": task, "Model": name, **scores,
+                         "Fit Seconds": float(result["fit_seconds"].sum()),
+                         "Cached": (task, name) in cached_models})
+        tables[task] = pd.DataFrame(rows).sort_values(CV_SCORING[task][1], ascending=False, ignore_index=True)
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validate every candidate model with bootstrap "
+                                                 "confidence intervals, reusing cached results.")
+    parser.add_argument("--data", default=DATA_FILE)
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--bootstrap", type=int, default=DEFAULT_BOOTSTRAPS, help="Resamples, 0 to skip intervals")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--task", choices=["regression", "classification", "both"], default="both")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="Refit everything and don't write the cache")
+    args = parser.parse_args(argv)
+
+    from data_cache import open_dataset
+
+    start = time.perf_counter()
+    dataset = open_dataset(args.data)
+    data = {"regression": (dataset.X_scaled, dataset.salary),
+            "classification": (dataset.X_scaled, dataset.salary_class)}
+    if args.task != "both":
+        data = {args.task: data[args.task]}
+    tables = evaluate(data, n_folds=args.folds, n_resamples=args.bootstrap, jobs=args.jobs,
+                      cache_dir=args.cache_dir, use_cache=not args.no_cache)
+
+    ci = f"{CI_LEVEL:.0%} bootstrap interval" if args.bootstrap else "no intervals"
+    with pd.option_context("display.width", 250, "display.max_columns", 40, "display.float_format", "{:,.4f}".format):
+        for task, table in tables.items():
+            metrics = REGRESSION_METRICS if task == "regression" else CLASSIFICATION_METRICS
+            shown = table[["Model"]].copy()
+            for metric in metrics:
+                if args.bootstrap:
+                    shown[metric] = [f"{v:,.4f} [{lo:,.4f}, {hi:,.4f}]" for v, lo, hi in
+                                     zip(table[metric], table[f"{metric} Low"], table[f"{metric} High"])]
+                else:
+                    shown[metric] = table[metric]
+            scoring = CV_SCORING[task][0]
+            shown[f"CV {scoring}"] = [f"{m:.4f} ± {s:.4f}" for m, s in
+                                      zip(table[f"CV {scoring} Mean"], table[f"CV {scoring} Std"])]
+            shown["Cached"] = table["Cached"]
+            print(f"\n🔷 {task.title()} ({args.folds}-fold out-of-fold predictions, {ci})")
+            print(shown.to_string(index=False))
+    evaluated = sum(len(table) for table in tables.values())
+    cached = sum(int(table["Cached"].sum()) for table in tables.values())
+    print(f"\n✅ Evaluated {evaluated} models ({cached} from cache) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
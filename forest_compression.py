@@ -0,0 +1,273 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, r2_score
+
+from artifacts import REGRESSOR_FILE, artifact_fingerprint, load_artifacts, load_level_cuts
+from forest_engine import FlatForest, round_down_float32
+from inference import InferencePipeline
+from model_bundle import BUNDLE_DIR, export_bundle, load_bundle, measure_mode
+
+# Default accuracy budget versus the original forest on the test split
+MAX_MAE_INCREASE = 0.02
+MAX_R2_DROP = 0.005
+
+TREE_COUNTS = [5, 10, 15, 20, 30, 40, 50, 60, 80, 100]
+# Cost-complexity pruning strengths, as a fraction of the root impurity
+# a split must remove per extra leaf
+PRUNE_ALPHAS = [0.0, 1e-4, 3e-4, 1e-3, 3e-3, 1e-2]
+# (trees, max depth) of the distilled students
+DISTILL_SHAPES = [(10, 6), (20, 6), (20, 8), (50, 8), (50, 10)]
+DISTILL_ROWS = 20_000
+LATENCY_CALLS = 1000
+# Rows per predict call in the latency report
+LATENCY_BATCHES = [1, 1000]
+
+
+class PrunedTree:
+    # Node arrays of a pruned tree, named like sklearn's Tree so that
+    # FlatForest.from_trees accepts either
+
+    def __init__(self, feature, threshold, children_left, children_right, value, weighted_n_node_samples,
+                 max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.weighted_n_node_samples = weighted_n_node_samples
+        self.max_depth = max_depth
+        self.node_count = len(feature)
+
+
+def prune_tree(tree, alpha):
+    # Minimal cost-complexity pruning from the fitted tree alone: a subtree
+    # collapses into its root when it removes at most `alpha` (a fraction of
+    # the root impurity) of weighted impurity per extra leaf. A collapsed
+    # node predicts the mean sklearn already stored for it.
+    left, right = tree.children_left, tree.children_right
+    risk = tree.impurity * tree.weighted_n_node_samples / tree.weighted_n_node_samples[0]
+    alpha = alpha * risk[0]
+    stop = left == -1
+    subtree_risk = risk.copy()
+    leaves = np.ones(tree.node_count, dtype=np.intp)
+    # sklearn numbers children after their parent, so this visits bottom-up
+    for node in range(tree.node_count - 1, -1, -1):
+        if stop[node]:
+            continue
+        below = subtree_risk[left[node]] + subtree_risk[right[node]]
+        n_leaves = leaves[left[node]] + leaves[right[node]]
+        if risk[node] - below <= alpha * (n_leaves - 1):
+            stop[node] = True
+        else:
+            subtree_risk[node] = below
+            leaves[node] = n_leaves
+
+    # Renumber the surviving nodes in depth-first order
+    order, depth = [], []
+    stack = [(0, 0)]
+    while stack:
+        node, d = stack.pop()
+        order.append(node)
+        depth.append(d)
+        if not stop[node]:
+            stack.append((right[node], d + 1))
+            stack.append((left[node], d + 1))
+    order = np.array(order, dtype=np.intp)
+    is_leaf = stop[order]
+    new_ids = np.zeros(tree.node_count, dtype=np.intp)
+    new_ids[order] = np.arange(len(order))
+    return PrunedTree(
+        feature=np.where(is_leaf, -2, tree.feature[order]),
+        threshold=np.where(is_leaf, -2.0, tree.threshold[order]),
+        children_left=np.where(is_leaf, -1, new_ids[np.where(is_leaf, 0, left[order])]),
+        children_right=np.where(is_leaf, -1, new_ids[np.where(is_leaf, 0, right[order])]),
+        value=tree.value[order],
+        weighted_n_node_samples=tree.weighted_n_node_samples[order],
+        max_depth=max(depth),
+    )
+
+
+def order_trees(per_tree, target):
+    # Greedy forward selection: each step adds the tree that brings the
+    # running average closest to `target`. Prefixes of the returned order
+    # are the best small sub-forests found this way.
+    remaining = list(range(len(per_tree)))
+    total = np.zeros(per_tree.shape[1])
+    order = []
+    for k in range(1, len(per_tree) + 1):
+        errors = (((total + per_tree[remaining]) / k - target) ** 2).mean(axis=1)
+        best = remaining.pop(int(errors.argmin()))
+        order.append(best)
+        total += per_tree[best]
+    return order
+
+
+def distill(teacher, X_train, shapes=DISTILL_SHAPES, rows=DISTILL_ROWS, seed=0):
+    # Fit shallow forests to the teacher's predictions on the training rows
+    # plus rows drawn from each feature's marginal distribution, which
+    # covers input combinations the training data lacks
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(seed)
+    sampled = np.column_stack([rng.choice(X_train[:, j], rows) for j in range(X_train.shape[1])])
+    X = np.concatenate([X_train, sampled])
+    y = teacher.predict(X)
+    students = []
+    for n_trees, depth in shapes:
+        student = RandomForestRegressor(n_estimators=n_trees, max_depth=depth, random_state=seed).fit(X, y)
+        students.append(({"method": "distill", "trees": n_trees, "max_depth": depth},
+                         FlatForest.from_sklearn(student)))
+    return students
+
+
+def quantize(forest, values=True):
+    # Compact dtypes. Thresholds are rounded down to float32, which is
+    # lossless (see round_down_float32). Leaf values become float32 only if
+    # `values` is set.
+    threshold = round_down_float32(forest.threshold)
+    index_dtype = np.int32 if len(forest.value) < np.iinfo(np.int32).max // 2 else np.intp
+    return FlatForest(
+        feature=forest.feature.astype(np.int8 if forest.feature.max() < 128 else index_dtype),
+        threshold=threshold,
+        children=forest.children.astype(index_dtype),
+        value=forest.value.astype(np.float32) if values else forest.value,
+        roots=forest.roots.astype(index_dtype),
+        depth=forest.depth,
+        cover=None if forest.cover is None else forest.cover.astype(np.float32),
+    )
+
+
+def forest_bytes(forest):
+    # Arrays used for prediction; the cover only matters for contributions
+    return sum(getattr(forest, name).nbytes for name in ("feature", "threshold", "children", "value", "roots"))
+
+
+def _scores(forest, X_test, y_test):
+    predicted = forest.predict(X_test)
+    return mean_absolute_error(y_test, predicted), r2_score(y_test, predicted)
+
+
+def compress(regressor, X_train, X_test, y_test, max_mae_increase=MAX_MAE_INCREASE, max_r2_drop=MAX_R2_DROP,
+             use_distillation=False):
+    # Try pruned sub-forests (and distilled students) and keep the smallest
+    # one whose test MAE and R² stay within the budget of the original, then
+    # quantize it. Returns the compressed FlatForest, its settings and a
+    # table of every candidate.
+    original = FlatForest.from_sklearn(regressor)
+    base_mae, base_r2 = _scores(original, X_test, y_test)
+
+    def within_budget(mae, r2):
+        return mae <= base_mae * (1 + max_mae_increase) and r2 >= base_r2 - max_r2_drop
+
+    trees = [estimator.tree_ for estimator in regressor.estimators_]
+    order = order_trees(original.predict_trees(X_train), original.predict(X_train))
+    candidates = []
+    for alpha in PRUNE_ALPHAS:
+        pruned = [prune_tree(trees[i], alpha) if alpha else trees[i] for i in order]
+        for n_trees in [n for n in TREE_COUNTS if n < len(trees)] + [len(trees)]:
+            candidates.append(({"method": "prune", "trees": n_trees, "alpha": alpha},
+                               FlatForest.from_trees(pruned[:n_trees])))
+    if use_distillation:
+        candidates += distill(original, X_train)
+
+    rows = []
+    for settings, forest in candidates:
+        mae, r2 = _scores(forest, X_test, y_test)
+        rows.append(dict(settings, nodes=len(forest.value), depth=forest.depth, mae=mae, r2=r2,
+                         within_budget=within_budget(mae, r2)))
+    table = pd.DataFrame(rows)
+
+    # The unpruned full forest is always within budget
+    fits = table[table["within_budget"]].sort_values(["nodes", "mae"])
+    settings, forest = candidates[fits.index[0]]
+    compressed = quantize(forest)
+    settings = dict(settings, leaf_values="float32")
+    if not within_budget(*_scores(compressed, X_test, y_test)):
+        compressed = quantize(forest, values=False)
+        settings["leaf_values"] = "float64"
+    settings["original"] = {"mae": base_mae, "r2": base_r2}
+    return compressed, settings, table
+
+
+def latency_ms(pipeline, X, batch=1, calls=LATENCY_CALLS):
+    # p50/p99 of predict_salary calls on `batch` rows, cycling through `X`
+    times = np.empty(calls)
+    for i in range(calls):
+        rows = X.take(np.arange(i * batch, (i + 1) * batch) % len(X), axis=0)
+        start = time.perf_counter()
+        pipeline.predict_salary(rows)
+        times[i] = time.perf_counter() - start
+    return np.percentile(times, 50) * 1000, np.percentile(times, 99) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compress the salary forest within an accuracy budget and "
+                                                 "publish it as a bundle version.")
+    parser.add_argument("--data", default="salary_data.csv", help="Data the models were trained on")
+    parser.add_argument("--models-dir", default=".")
+    parser.add_argument("--bundle-dir", default=BUNDLE_DIR)
+    parser.add_argument("--max-mae-increase", type=float, default=MAX_MAE_INCREASE,
+                        help="Allowed relative increase in test MAE (0.02 = 2%%)")
+    parser.add_argument("--max-r2-drop", type=float, default=MAX_R2_DROP, help="Allowed absolute drop in test R²")
+    parser.add_argument("--distill", action="store_true", help="Also try shallow forests distilled from the original")
+    parser.add_argument("--activate", action="store_true", help="Make the compressed version the active one")
+    parser.add_argument("--candidates", action="store_true", help="Print every candidate that was tried")
+    args = parser.parse_args(argv)
+
+    from data_cache import open_dataset
+    from training import split_data
+
+    start = time.perf_counter()
+    artifacts = load_artifacts(args.models_dir)
+    cuts = load_level_cuts(args.models_dir)
+    pipeline = InferencePipeline.from_artifacts(*artifacts, level_cuts=cuts)
+    dataset = open_dataset(args.data)
+    X = pipeline.scale_features(dataset.features())
+    X_train, X_test, _, y_test, _, _ = split_data(X, dataset.salary, dataset.salary_class)["regression"]
+    X_train, X_test = np.ascontiguousarray(X_train), np.ascontiguousarray(X_test)
+
+    compressed, settings, table = compress(artifacts[0], X_train, X_test, y_test, args.max_mae_increase,
+                                           args.max_r2_drop, args.distill)
+    if args.candidates:
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(table.to_string(index=False), end="\n\n")
+
+    version = artifact_fingerprint(args.models_dir)[:12]
+    original_dir = export_bundle(*artifacts, bundle_dir=args.bundle_dir, version=version, level_cuts=cuts,
+                                 activate=False)
+    compressed_dir = export_bundle(*artifacts, bundle_dir=args.bundle_dir, level_cuts=cuts, flat_forest=compressed,
+                                   metadata={"compressed_from": version, "compression": settings},
+                                   activate=args.activate)
+
+    served = [("original (pickle)", pipeline, measure_mode("pickle", args.models_dir, original_dir, workers=1)),
+              ("original (bundle)", load_bundle(original_dir), measure_mode("bundle", args.models_dir, original_dir, workers=1)),
+              ("compressed (bundle)", load_bundle(compressed_dir),
+               measure_mode("bundle", args.models_dir, compressed_dir, workers=1))]
+    rows = []
+    for name, served_pipeline, memory in served:
+        forest = served_pipeline.flat_forest
+        mae, r2 = _scores(forest, X_test, y_test)
+        row = {"Model": name, "Trees": forest.n_trees, "Nodes": len(forest.value), "Depth": forest.depth,
+               "Forest KB": forest_bytes(forest) / 1024, "Test MAE": mae, "Test R²": r2}
+        for batch in LATENCY_BATCHES:
+            row[f"p50 ms ({batch})"], row[f"p99 ms ({batch})"] = latency_ms(served_pipeline, X_test, batch)
+        row["RSS MB"] = memory["rss_mb"]
+        rows.append(row)
+    report = pd.DataFrame(rows)
+    pickle_kb = os.path.getsize(os.path.join(args.models_dir, REGRESSOR_FILE)) / 1024
+
+    with pd.option_context("display.width", 200, "display.float_format", "{:,.3f}".format):
+        print(report.to_string(index=False))
+    chosen = ", ".join(f"{key}={value}" for key, value in settings.items() if key != "original")
+    print(f"\nChosen: {chosen}")
+    print(f"Pickled regressor: {pickle_kb:,.0f} KB")
+    print(f"✅ Compressed version {os.path.basename(compressed_dir)} written"
+          f"{' and activated' if args.activate else ''} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import timeit
+
+import numpy as np
+
+from artifacts import load_artifacts
+
+# sklearn marks leaves with feature == -2
+_LEAF = -2
+
+
+def round_down_float32(values):
+    # The largest float32 not above each value. Since features are compared
+    # as float32, x <= t and x <= round_down_float32(t) always agree.
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    too_high = rounded > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+class FlatForest:
+    # A fitted tree ensemble flattened into contiguous node arrays. All trees
+    # are walked in lock-step for a batch of rows with NumPy gathers; leaves
+    # point at themselves so rows that reach one early just stay put.
+
+    def __init__(self, feature, threshold, children, value, roots, depth, cover=None):
+        # `children` holds interleaved (left, right) pairs, shape (n_nodes, 2),
+        # so each step is a single gather. `cover` is the (weighted) number of
+        # training samples that reached each node; only contribution breakdowns
+        # need it. Arrays are used as given, which lets them be read-only
+        # memory maps.
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.cover = cover
+        self._flat_children = children.reshape(-1)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        return cls.from_trees([estimator.tree_ for estimator in forest.estimators_])
+
+    @classmethod
+    def from_trees(cls, trees):
+        # `trees` are sklearn Tree objects or anything with the same node
+        # arrays (node_count, feature, threshold, children_left/right, value,
+        # weighted_n_node_samples, max_depth)
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+        feature, threshold, left, right, value, cover = [], [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.feature == _LEAF
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            value.append(tree.value[:, 0, 0])
+            cover.append(tree.weighted_n_node_samples)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(feature), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(threshold), dtype=np.float64),
+            children=np.ascontiguousarray(np.stack([np.concatenate(left), np.concatenate(right)], axis=1), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(value), dtype=np.float64),
+            roots=np.ascontiguousarray(offsets[:-1], dtype=np.intp),
+            depth=max(tree.max_depth for tree in trees),
+            cover=np.ascontiguousarray(np.concatenate(cover), dtype=np.float64),
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        # Leaf index of every (tree, row) pair, shape (n_trees, n_rows).
+        # Like sklearn, features are compared as float32 against the float64
+        # thresholds.
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = np.arange(n_rows, dtype=np.intp) * n_features
+
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        for _ in range(self.depth):
+            x = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_right = ~(x <= self.threshold.take(nodes))
+            nodes = self._flat_children.take(2 * nodes + go_right)
+        return nodes
+
+    def predict_trees(self, X):
+        # Every tree's prediction, shape (n_trees, n_rows)
+        return self.value.take(self.apply(X)).astype(np.float64, copy=False)
+
+    def predict(self, X, block_size=4096):
+        # Average of the per-tree leaf values. Trees are summed in order, as
+        # RandomForestRegressor does, so results match it bit for bit.
+        X = np.asarray(X)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), block_size):
+            leaves = self.apply(X[start:start + block_size])
+            out[start:start + block_size] = self.value.take(leaves).sum(axis=0, dtype=np.float64) / self.n_trees
+        return out
+
+
+def check_parity(forest, flat_forest, X):
+    expected = forest.predict(X)
+    actual = flat_forest.predict(X)
+    return np.array_equal(expected, actual), float(np.max(np.abs(expected - actual), initial=0.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and benchmark the flattened forest against sklearn.")
+    parser.add_argument("--models-dir", default=".", help="Directory holding the .pkl artifacts")
+    parser.add_argument("--sizes", default="1,10,100,1000,10000", help="Comma-separated batch sizes")
+    args = parser.parse_args(argv)
+
+    regressor, _, scaler, _ = load_artifacts(args.models_dir)
+    flat_forest = FlatForest.from_sklearn(regressor)
+    print(f"{flat_forest.n_trees} trees, {len(flat_forest.value):,} nodes, depth {flat_forest.depth}")
+
+    # Random rows spread around the scaler's centre cover every branch
+    rng = np.random.default_rng(0)
+    sizes = [int(s) for s in args.sizes.split(",")]
+    X_all = rng.normal(0.0, 1.5, size=(max(sizes), len(scaler.center_)))
+
+    identical, max_diff = check_parity(regressor, flat_forest, X_all)
+    print(f"Parity with RandomForestRegressor.predict: {'identical' if identical else f'max abs diff {max_diff}'}")
+
+    print(f"{'rows':>8} {'sklearn ms':>12} {'flat ms':>10} {'speedup':>8}")
+    for size in sizes:
+        X = X_all[:size]
+        number = max(1, 2000 // size)
+        sklearn_ms = min(timeit.repeat(lambda: regressor.predict(X), number=number, repeat=3)) / number * 1000
+        flat_ms = min(timeit.repeat(lambda: flat_forest.predict(X), number=number, repeat=3)) / number * 1000
+        print(f"{size:>8} {sklearn_ms:>12.3f} {flat_ms:>10.3f} {sklearn_ms / flat_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import argparse
+import copy
+import math
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from artifacts import (CATEGORICAL_COLUMNS, FEATURE_COLUMNS, TARGET_COLUMN, artifact_fingerprint,
+                       load_artifacts)
+from level_modes import tercile_class_codes
+from model_bundle import BUNDLE_DIR, export_bundle
+from streaming_preprocess import FILTER_COLUMNS, exact_boundaries
+from training import atomic_dump, save_artifacts
+
+STATE_FILE = "training_state.pkl"
+REPLAY_SIZE = 5000
+
+
+def _histogram_quantile(counts, q):
+    # np.percentile (linear interpolation) over a {value: count} histogram
+    values = np.array(sorted(counts))
+    cumulative = np.cumsum([counts[v] for v in values])
+    position = q * (cumulative[-1] - 1)
+    lower = values[np.searchsorted(cumulative, math.floor(position) + 1)]
+    upper = values[np.searchsorted(cumulative, math.ceil(position) + 1)]
+    return lower + (upper - lower) * (position - math.floor(position))
+
+
+class TrainingState:
+    # What an update needs to know about the history without re-reading it:
+    # the fill values, fences and class cut points the models were trained
+    # with, exact value histograms of each feature (for the scaler's median
+    # and IQR), and a fixed-size reservoir sample of encoded training rows
+    # that new trees and refits see alongside the new records.
+
+    def __init__(self, modes, fences, cuts, class_codes, replay_size=REPLAY_SIZE, seed=0):
+        self.modes = modes
+        self.fences = fences
+        self.cuts = cuts
+        # Salary tercile (0 = Low, 1 = Medium, 2 = High) -> classifier class
+        self.class_codes = class_codes
+        self.histograms = {col: {} for col in FEATURE_COLUMNS}
+        self.rows = 0
+        self.replay_size = replay_size
+        self.replay_X = np.empty((0, len(FEATURE_COLUMNS)))
+        self.replay_salary = np.empty(0)
+        self.replay_class = np.empty(0, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+
+    def add_rows(self, X, salary, salary_class):
+        # X holds encoded, unscaled features of rows that passed the fences
+        for j, col in enumerate(FEATURE_COLUMNS):
+            histogram = self.histograms[col]
+            values, counts = np.unique(X[:, j], return_counts=True)
+            for value, count in zip(values.tolist(), counts.tolist()):
+                histogram[value] = histogram.get(value, 0) + count
+
+        # Reservoir sampling (algorithm R), vectorised over the batch
+        free = max(self.replay_size - len(self.replay_X), 0)
+        head = min(free, len(X))
+        self.replay_X = np.concatenate([self.replay_X, X[:head]])
+        self.replay_salary = np.concatenate([self.replay_salary, salary[:head]])
+        self.replay_class = np.concatenate([self.replay_class, salary_class[:head]])
+        seen = self.rows + head + np.arange(len(X) - head)
+        slots = self._rng.integers(0, seen + 1) if len(seen) else seen
+        picked = np.flatnonzero(slots < self.replay_size)
+        self.replay_X[slots[picked]] = X[head + picked]
+        self.replay_salary[slots[picked]] = salary[head + picked]
+        self.replay_class[slots[picked]] = salary_class[head + picked]
+        self.rows += len(X)
+
+    def scaler_stats(self):
+        # Same centre and scale RobustScaler.fit would compute on the history
+        center, scale = [], []
+        for col in FEATURE_COLUMNS:
+            histogram = self.histograms[col]
+            q1, median, q3 = (_histogram_quantile(histogram, q) for q in (0.25, 0.5, 0.75))
+            center.append(median)
+            scale.append(q3 - q1 if q3 > q1 else 1.0)
+        return np.array(center, dtype=np.float64), np.array(scale, dtype=np.float64)
+
+    def salary_class(self, salary):
+        terciles = np.searchsorted(self.cuts, salary, side="left")
+        return np.asarray(self.class_codes)[terciles]
+
+    def save(self, path):
+        atomic_dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+def init_state(data_path, models_dir="."):
+    # Build the state once from the data the current artifacts were trained on
+    _, classifier, scaler, encoders = load_artifacts(models_dir)
+    raw = pd.read_csv(data_path)
+    boundaries, df = exact_boundaries(data_path)
+    for col in CATEGORICAL_COLUMNS:
+        labels = sorted(raw[col].dropna().unique())
+        if list(encoders[col].classes_) != labels:
+            raise ValueError(f"{col} categories in {data_path} don't match the encoders in {models_dir}")
+
+    modes = raw.mode().iloc[0].to_dict()
+    fences = {col: boundaries[f"{col} fence"] for col in FILTER_COLUMNS}
+    cuts = list(boundaries["Salary terciles"])
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    salary = df[TARGET_COLUMN].to_numpy(dtype=np.float64)
+
+    # Match each tercile to the class the classifier predicts most for it
+    terciles = np.searchsorted(cuts, salary, side="left")
+    predicted = classifier.predict(scaler.transform(pd.DataFrame(X, columns=FEATURE_COLUMNS)))
+    class_codes = tercile_class_codes(predicted, terciles, classifier.classes_)
+
+    state = TrainingState(modes, fences, cuts, class_codes)
+    state.add_rows(X, salary, state.salary_class(salary))
+    state.save(os.path.join(models_dir, STATE_FILE))
+    return state
+
+
+def extend_encoders(encoders, df):
+    # Unseen labels get the next free codes; existing codes never change
+    encoders = copy.deepcopy(encoders)
+    added = {}
+    for col in CATEGORICAL_COLUMNS:
+        known = set(encoders[col].classes_)
+        new = sorted(set(df[col].dropna().unique()) - known)
+        if new:
+            encoders[col].classes_ = np.concatenate([encoders[col].classes_, np.array(new, dtype=object)])
+            added[col] = new
+    return encoders, added
+
+
+def prepare_delta(df, state, encoders):
+    # Fill, encode, fence and label new rows the way training did
+    df = df.fillna(state.modes)
+    X = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float64)
+    for j, col in enumerate(FEATURE_COLUMNS):
+        if col in CATEGORICAL_COLUMNS:
+            X[:, j] = pd.Index(encoders[col].classes_).get_indexer(df[col])
+        else:
+            X[:, j] = df[col].to_numpy(dtype=np.float64)
+    salary = df[TARGET_COLUMN].to_numpy(dtype=np.float64)
+
+    columns = dict(zip(FEATURE_COLUMNS, X.T))
+    columns[TARGET_COLUMN] = salary
+    keep = np.ones(len(df), dtype=bool)
+    for col in FILTER_COLUMNS:
+        lower, upper = state.fences[col]
+        keep &= (columns[col] >= lower) & (columns[col] <= upper)
+    return X[keep], salary[keep], state.salary_class(salary[keep])
+
+
+def _move_thresholds(thresholds, old, new):
+    # `old`/`new` are the sorted float32 images of the known raw values of a
+    # feature under the old and new scaling. A threshold between two known
+    # values moves to the midpoint of their new images, as a refit would
+    # place it, so every known value lands on the same side as before.
+    above = np.searchsorted(old, thresholds, side="right")
+    inside = (above > 0) & (above < len(old))
+    lower = new[np.clip(above - 1, 0, len(new) - 1)].astype(np.float64)
+    upper = new[np.clip(above, 0, len(new) - 1)].astype(np.float64)
+    midpoint = lower / 2 + upper / 2
+    midpoint = np.where(midpoint == upper, lower, midpoint)
+    return inside, midpoint
+
+
+def rescale_model(model, old_center, old_scale, new_center, new_scale, known_values=None):
+    # Rewrite a fitted model so it gives the same outputs on features scaled
+    # with the new statistics as it did with the old ones. Linear models are
+    # exact. Tree thresholds are moved affinely; with `known_values` (sorted
+    # raw values per feature) they are re-centred between the known values
+    # instead, which keeps float32 rounding from flipping any of them.
+    if hasattr(model, "estimators_"):
+        for estimator in np.ravel(model.estimators_):
+            rescale_model(estimator, old_center, old_scale, new_center, new_scale, known_values)
+    elif hasattr(model, "tree_"):
+        tree = model.tree_
+        split = np.flatnonzero(tree.children_left != -1)
+        feature = tree.feature[split]
+        old_threshold = tree.threshold[split]
+        raw = old_threshold * old_scale[feature] + old_center[feature]
+        threshold = (raw - new_center[feature]) / new_scale[feature]
+        for j in range(len(old_center)) if known_values is not None else []:
+            nodes = feature == j
+            values = np.asarray(known_values[j], dtype=np.float64)
+            if not nodes.any() or not len(values):
+                continue
+            old = ((values - old_center[j]) / old_scale[j]).astype(np.float32)
+            new = ((values - new_center[j]) / new_scale[j]).astype(np.float32)
+            inside, midpoint = _move_thresholds(old_threshold[nodes], old, new)
+            threshold[nodes] = np.where(inside, midpoint, threshold[nodes])
+        tree.threshold[split] = threshold
+    elif hasattr(model, "coef_"):
+        model.intercept_ = model.intercept_ + (model.coef_ * (new_center - old_center) / old_scale).sum(axis=-1)
+        model.coef_ = model.coef_ * (new_scale / old_scale)
+    else:
+        raise ValueError(f"Can't rescale a {type(model).__name__}; retrain with training.py instead")
+    return model
+
+
+def update_model(model, X, y, new_trees):
+    # Forests grow `new_trees` more trees fitted on X; warm-startable models
+    # continue from their current coefficients; others use partial_fit
+    params = model.get_params()
+    if "n_estimators" in params and "warm_start" in params and hasattr(model, "estimators_"):
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+        model.fit(X, y)
+        model.set_params(warm_start=False)
+    elif "warm_start" in params:
+        model.set_params(warm_start=True)
+        model.fit(X, y)
+        model.set_params(warm_start=False)
+    elif hasattr(model, "partial_fit"):
+        model.partial_fit(X, y)
+    else:
+        raise ValueError(f"{type(model).__name__} can't be updated incrementally; retrain with training.py instead")
+    return model
+
+
+def incremental_update(delta_path, models_dir=".", output_dir=None, bundle_dir=BUNDLE_DIR, new_trees=None):
+    # Fold the rows in `delta_path` into the current artifacts and publish
+    # them as a new version. Work is proportional to the delta plus the fixed
+    # replay sample; the history is never re-read.
+    start = time.perf_counter()
+    output_dir = output_dir or models_dir
+    state = TrainingState.load(os.path.join(models_dir, STATE_FILE))
+    regressor, classifier, scaler, encoders = load_artifacts(models_dir)
+
+    delta = pd.read_csv(delta_path)
+    encoders, added = extend_encoders(encoders, delta)
+    X_new, salary_new, class_new = prepare_delta(delta, state, encoders)
+    history_rows = state.rows
+    replay = state.replay_X, state.replay_salary, state.replay_class
+    state.add_rows(X_new, salary_new, class_new)
+
+    old_center, old_scale = scaler.center_.copy(), scaler.scale_.copy()
+    new_center, new_scale = state.scaler_stats()
+    known_values = [sorted(state.histograms[col]) for col in FEATURE_COLUMNS]
+    rescale_model(regressor, old_center, old_scale, new_center, new_scale, known_values)
+    rescale_model(classifier, old_center, old_scale, new_center, new_scale, known_values)
+    scaler = copy.deepcopy(scaler)
+    scaler.center_, scaler.scale_ = new_center, new_scale
+
+    # New trees and refits see the new rows plus the replay sample, so a
+    # small delta doesn't produce trees that only know a handful of rows
+    X_fit = (np.concatenate([X_new, replay[0]]) - new_center) / new_scale
+    if new_trees is None:
+        n_trees = len(getattr(regressor, "estimators_", []))
+        new_trees = max(1, round(n_trees * len(X_new) / max(history_rows, 1)))
+    if len(X_new):
+        update_model(regressor, X_fit, np.concatenate([salary_new, replay[1]]), new_trees)
+        update_model(classifier, X_fit, np.concatenate([class_new, replay[2]]), new_trees)
+
+    save_artifacts(output_dir, regressor, classifier, scaler, encoders, state.cuts)
+    state.save(os.path.join(output_dir, STATE_FILE))
+    version = artifact_fingerprint(output_dir)[:12]
+    bundle = None
+    if bundle_dir:
+        try:
+            bundle = export_bundle(regressor, classifier, scaler, encoders, bundle_dir, version, state.cuts)
+        except ValueError as e:
+            print(f"⚠️ Bundle not exported: {e}")
+    return {
+        "rows": len(delta),
+        "kept": len(X_new),
+        "new_categories": added,
+        "new_trees": new_trees if len(X_new) else 0,
+        "history_rows": state.rows,
+        "version": version,
+        "bundle": bundle,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the salary models with new records instead of retraining.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    init = sub.add_parser("init", help="Record the training state of the current artifacts (run once)")
+    init.add_argument("--data", default="salary_data.csv", help="Data the current artifacts were trained on")
+    init.add_argument("--models-dir", default=".")
+
+    update = sub.add_parser("update", help="Fold new records into the models and publish a new version")
+    update.add_argument("delta", help="CSV with only the new records")
+    update.add_argument("--models-dir", default=".")
+    update.add_argument("--output-dir", help="Where to write the updated artifacts (default: --models-dir)")
+    update.add_argument("--bundle-dir", default=BUNDLE_DIR, help="Bundle to publish to ('' to skip)")
+    update.add_argument("--new-trees", type=int, help="Trees to add (default: proportional to the delta)")
+
+    args = parser.parse_args(argv)
+    if args.command == "init":
+        state = init_state(args.data, args.models_dir)
+        print(f"✅ Training state for {state.rows:,} rows saved to {os.path.join(args.models_dir, STATE_FILE)}")
+    else:
+        summary = incremental_update(args.delta, args.models_dir, args.output_dir, args.bundle_dir, args.new_trees)
+        for col, labels in summary["new_categories"].items():
+            print(f"New {col}: {', '.join(map(str, labels))}")
+        print(f"✅ Folded in {summary['kept']:,} of {summary['rows']:,} rows (+{summary['new_trees']} trees); "
+              f"history now {summary['history_rows']:,} rows. Version {summary['version']} "
+              f"in {summary['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
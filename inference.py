@@ -0,0 +1,219 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from artifacts import CATEGORICAL_COLUMNS, FEATURE_COLUMNS
+from encoding import CategoryEncoder, as_category_encoder
+from forest_engine import FlatForest
+
+# Up to this many rows the flattened forest beats sklearn's per-tree dispatch
+FLAT_FOREST_MAX_ROWS = 256
+
+# Where salary levels come from: "classifier" runs the separate classifier,
+# "regressor" takes the tercile of the forest's prediction
+LEVEL_MODES = ("classifier", "regressor")
+DEFAULT_LEVEL_MODE = os.environ.get("SALARY_LEVEL_MODE", "classifier")
+
+
+class InferencePipeline:
+    # Encode -> scale -> predict without the per-call DataFrame copies,
+    # LabelEncoder validation and scaler feature-name checks. Built once from
+    # the fitted artifacts; produces the same numbers as the sklearn chain.
+
+    def __init__(self, regressor, classifier, center, scale, categories, flat_forest=None, level_cuts=None,
+                 level_mode=None, fill_codes=None):
+        # `regressor` may be None when only the flattened forest is available
+        # (e.g. a memory-mapped bundle); `categories` lists each categorical
+        # column's labels in code order. `level_cuts` are the training salary
+        # terciles, needed by the "regressor" level mode. `fill_codes` gives
+        # per column the code unseen labels are scored as (see
+        # encoding.CategoryEncoder); columns without one reject them.
+        self.regressor = regressor
+        self.classifier = classifier
+        self.flat_forest = flat_forest
+        self.categories = categories
+        self.level_cuts = None if level_cuts is None else np.asarray(level_cuts, dtype=np.float64)
+        self._explainer = None
+        self.level_mode = level_mode or DEFAULT_LEVEL_MODE
+        if self.level_mode not in LEVEL_MODES:
+            raise ValueError(f"Unknown level mode {self.level_mode!r}; use one of {', '.join(LEVEL_MODES)}")
+        if self.level_mode == "regressor" and (self.level_cuts is None or flat_forest is None):
+            raise ValueError("The regressor level mode needs a random forest and the salary tercile cuts")
+
+        fill_codes = fill_codes or {}
+        self.encoders = {col: CategoryEncoder(categories[col]) for col in CATEGORICAL_COLUMNS}
+        for col, encoder in self.encoders.items():
+            code = fill_codes.get(col)
+            encoder.fill_label = None if code is None else encoder.classes_[code]
+        self.code_maps = {col: encoder.code_map for col, encoder in self.encoders.items()}
+
+        self.center = np.ascontiguousarray(center, dtype=np.float64)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float64)
+
+    @classmethod
+    def from_artifacts(cls, regressor, classifier, scaler, encoders, level_cuts=None, level_mode=None):
+        from sklearn.ensemble import RandomForestRegressor
+
+        n_features = len(FEATURE_COLUMNS)
+        center = scaler.center_ if scaler.with_centering else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_scaling else np.ones(n_features)
+        # encoders.pkl holds LabelEncoders; without a recorded fill label
+        # (older files) a column rejects unseen labels
+        encoders = {col: as_category_encoder(encoders[col]) for col in CATEGORICAL_COLUMNS}
+        categories = {col: list(encoders[col].classes_) for col in CATEGORICAL_COLUMNS}
+        fill_codes = {col: encoders[col].fill_code for col in CATEGORICAL_COLUMNS}
+        flat_forest = FlatForest.from_sklearn(regressor) if isinstance(regressor, RandomForestRegressor) else None
+        return cls(regressor, classifier, center, scale, categories, flat_forest, level_cuts, level_mode, fill_codes)
+
+    @property
+    def fill_codes(self):
+        return {col: encoder.fill_code for col, encoder in self.encoders.items()}
+
+    def unknown_inputs(self, values):
+        # The entries of `values` (categorical column -> raw value) that the
+        # encoders don't know
+        return {col: value for col, value in values.items() if value not in self.code_maps[col]}
+
+    def unknown_columns(self, columns):
+        # Batch form of unknown_inputs: per row of `columns`, the categorical
+        # columns whose value the encoders don't know, joined with "; " (""
+        # when there are none)
+        flags = np.full(len(columns[FEATURE_COLUMNS[0]]), "", dtype=object)
+        for col in CATEGORICAL_COLUMNS:
+            encoder = self.encoders[col]
+            unknown = encoder.transform(columns[col]) == encoder.unknown_code
+            flags[unknown] = [f"{flag}; {col}" if flag else col for flag in flags[unknown]]
+        return flags
+
+    def encode(self, columns, out=None):
+        # `columns` maps each feature name to a sequence of raw values (a
+        # DataFrame works). Returns the unscaled feature matrix and a mask of
+        # rows that can be scored: no missing numbers, and every category
+        # known or filled in. `out` is an optional (n_rows, n_features)
+        # float64 array to write the matrix into.
+        n_rows = len(columns[FEATURE_COLUMNS[0]])
+        X = np.empty((n_rows, len(FEATURE_COLUMNS)), dtype=np.float64) if out is None else out
+        valid = np.ones(n_rows, dtype=bool)
+        for j, col in enumerate(FEATURE_COLUMNS):
+            values = columns[col]
+            if col in CATEGORICAL_COLUMNS:
+                encoder = self.encoders[col]
+                raw_codes = encoder.transform(values)
+                codes = encoder.model_codes(raw_codes)
+                known = codes >= 0
+                unknown = np.flatnonzero(raw_codes == encoder.unknown_code)
+                if len(unknown):
+                    # Only unseen labels are filled in; numbers and other
+                    # non-strings are rejected
+                    known[unknown] &= _labels_or_missing(np.asarray(values, dtype=object)[unknown])
+                X[:, j] = np.where(known, codes, 0)
+            else:
+                values = np.asarray(pd.to_numeric(values, errors="coerce"), dtype=np.float64)
+                known = ~np.isnan(values)
+                X[:, j] = np.where(known, values, 0.0)
+            valid &= known
+        return X, valid
+
+    def encode_one(self, age, gender, education, job_title, experience):
+        codes = []
+        for col, value in zip(CATEGORICAL_COLUMNS, (gender, education, job_title)):
+            encoder = self.encoders[col]
+            code = encoder.code(value)
+            if code == encoder.unknown_code:
+                if not isinstance(value, str):
+                    raise ValueError(f"{col} must be a label, not {value!r}")
+                if encoder.fill_code is None:
+                    raise ValueError(f"y contains previously unseen labels: {value!r}")
+                code = encoder.fill_code
+            codes.append(code)
+        return np.array([[age, codes[0], codes[1], codes[2], experience]], dtype=np.float64)
+
+    def scale_features(self, X):
+        # RobustScaler.transform, fused in place on the contiguous array
+        X -= self.center
+        X /= self.scale
+        return X
+
+    def transform(self, columns):
+        X, valid = self.encode(columns)
+        return self.scale_features(X), valid
+
+    def transform_one(self, age, gender, education, job_title, experience):
+        return self.scale_features(self.encode_one(age, gender, education, job_title, experience))
+
+    def predict_salary(self, X_scaled):
+        if self.flat_forest is not None and (self.regressor is None or len(X_scaled) <= FLAT_FOREST_MAX_ROWS):
+            return self.flat_forest.predict(X_scaled)
+        return self.regressor.predict(X_scaled)
+
+    def predict_trees(self, X_scaled):
+        # Per-tree salary predictions, shape (n_trees, n_rows)
+        if self.regressor is None or len(X_scaled) <= FLAT_FOREST_MAX_ROWS:
+            return self.flat_forest.predict_trees(X_scaled)
+        X = np.asarray(X_scaled, dtype=np.float32)
+        return np.stack([tree.predict(X) for tree in self.regressor.estimators_])
+
+    def predict_level(self, X_scaled):
+        # Returns (class index, confidence); a single predict_proba call in
+        # "classifier" mode
+        if self.level_mode == "regressor":
+            _, level, confidence = self.predict(X_scaled)
+            return level, confidence
+        proba = self.classifier.predict_proba(X_scaled)
+        return self.classifier.classes_[proba.argmax(axis=1)], proba.max(axis=1)
+
+    def predict(self, X_scaled):
+        # (salary, level index, confidence) in one call. In "regressor" mode
+        # all three come from one forest pass: the level is the tercile the
+        # averaged prediction falls in (0 = Low, as LEVEL_LABELS), and the
+        # confidence is the share of trees whose own prediction lands there.
+        if self.level_mode == "classifier":
+            return (self.predict_salary(X_scaled),) + self.predict_level(X_scaled)
+        per_tree = self.predict_trees(X_scaled)
+        # Summed in tree order, as RandomForestRegressor.predict does
+        salary = per_tree.sum(axis=0) / len(per_tree)
+        level = np.searchsorted(self.level_cuts, salary, side="left")
+        agree = np.searchsorted(self.level_cuts, per_tree, side="left") == level
+        return salary, level, agree.mean(axis=0)
+
+    @property
+    def explainer(self):
+        # The contributions.ForestExplainer behind explain_salary, built on
+        # first use, with table cells only for the category codes
+        if self._explainer is None:
+            if self.flat_forest is None:
+                raise ValueError("Contributions need a random forest regressor")
+            from contributions import ForestExplainer
+
+            codes = {j: (np.arange(len(self.categories[col])) - self.center[j]) / self.scale[j]
+                     for j, col in enumerate(FEATURE_COLUMNS) if col in CATEGORICAL_COLUMNS}
+            self._explainer = ForestExplainer(self.flat_forest, codes)
+        return self._explainer
+
+    def explain_salary(self, X_scaled, salary=None):
+        # (expected value, per-feature contributions) for predict_salary: exact
+        # TreeSHAP values, one column per FEATURE_COLUMNS entry. Pass the
+        # predicted `salary` when it's already known.
+        explainer = self.explainer
+        if salary is None:
+            salary = self.predict_salary(X_scaled)
+        return explainer.expected_value, explainer.explain(X_scaled, salary)
+
+    def explain_level(self, X_scaled, class_idx):
+        # (base, per-feature contributions) behind the levels in `class_idx`:
+        # the salary contributions in "regressor" mode, otherwise each
+        # feature's term in the classifier's score for that class (the base
+        # is the class intercept, one per row)
+        if self.level_mode == "regressor":
+            return self.explain_salary(X_scaled)
+        from contributions import linear_contributions
+
+        if not hasattr(self.classifier, "coef_"):
+            raise ValueError("Level contributions need a linear classifier")
+        return linear_contributions(self.classifier, X_scaled, class_idx)
+
+
+def _labels_or_missing(values):
+    # Which of `values` are strings or missing (None / NaN)
+    return np.array([isinstance(v, str) or (np.ndim(v) == 0 and bool(pd.isna(v))) for v in values], dtype=bool)
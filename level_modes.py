@@ -0,0 +1,142 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+
+from artifacts import LEVEL_LABELS, load_artifacts, load_level_cuts
+from inference import InferencePipeline
+
+
+def tercile_class_codes(predicted, terciles, classes):
+    # The classifier class predicted most often for each salary tercile. The
+    # classifier may number the levels differently from the terciles (the
+    # notebook's encoder did); falls back to the identity if the majority
+    # vote doesn't give a one-to-one mapping.
+    codes = []
+    for tercile in range(len(LEVEL_LABELS)):
+        values, counts = np.unique(predicted[terciles == tercile], return_counts=True)
+        codes.append(values[counts.argmax()].item() if len(values) else None)
+    if sorted(codes, key=str) != sorted(np.asarray(classes).tolist(), key=str):
+        codes = list(range(len(LEVEL_LABELS)))
+    return codes
+
+
+def classifier_levels(classifier, X_scaled, labels):
+    # The LEVEL_LABELS code of each of the classifier's classes, in classes_
+    # order, matched to the terciles on the data it was trained on; the
+    # "class_levels" entry of salary_levels.json
+    codes = tercile_class_codes(classifier.predict(X_scaled), labels, classifier.classes_)
+    return [codes.index(c) for c in np.asarray(classifier.classes_).tolist()]
+
+
+def _ms_per_call(fn, repeat=5, number=200):
+    # Median milliseconds per call over `repeat` timed loops
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return float(np.median(samples)) * 1000
+
+
+def _scores(y_true, y_pred):
+    return {"Accuracy": accuracy_score(y_true, y_pred),
+            "Macro F1": f1_score(y_true, y_pred, average="macro")}
+
+
+def compare_level_modes(data_path="salary_data.csv", models_dir=".", cuts=None):
+    # Score both level modes on the held-out split training.py uses. The
+    # classifier is scored twice: decoded through LEVEL_LABELS, as the app
+    # and services show it, and relabelled to its best-matching terciles.
+    # Returns the accuracy table, a single-request latency table and the
+    # classifier class matched to each tercile.
+    from data_cache import open_dataset
+    from training import split_data
+
+    artifacts = load_artifacts(models_dir)
+    dataset = open_dataset(data_path)
+    cuts = cuts if cuts is not None else load_level_cuts(models_dir)
+    if cuts is None:
+        cuts = dataset.level_cuts
+    classifier_mode = InferencePipeline.from_artifacts(*artifacts, level_mode="classifier")
+    regressor_mode = InferencePipeline.from_artifacts(*artifacts, level_cuts=cuts, level_mode="regressor")
+
+    X = classifier_mode.scale_features(dataset.features())
+    labels = np.asarray(dataset.salary_class)
+    _, X_test, _, y_test, _, _ = split_data(X, dataset.salary, labels)["classification"]
+    splits = {"test": (X_test, y_test), "all": (X, labels)}
+
+    classifier = artifacts[1]
+    class_codes = tercile_class_codes(classifier.predict(X), labels, classifier.classes_)
+    relabel = {code: tercile for tercile, code in enumerate(class_codes)}
+
+    rows = []
+    for split, (X_split, y_split) in splits.items():
+        X_split = np.ascontiguousarray(X_split)
+        _, served, _ = classifier_mode.predict(X_split)
+        _, derived, confidence = regressor_mode.predict(X_split)
+        relabelled = np.array([relabel.get(code, -1) for code in served])
+        for name, predicted in [("classifier (as served)", served), ("classifier (relabelled)", relabelled),
+                                ("regressor terciles", derived)]:
+            row = {"Split": split, "Rows": len(y_split), "Levels from": name}
+            row.update(_scores(y_split, predicted))
+            if name == "regressor terciles":
+                correct = derived == y_split
+                row["Mean confidence (right)"] = float(confidence[correct].mean()) if correct.any() else np.nan
+                row["Mean confidence (wrong)"] = float(confidence[~correct].mean()) if (~correct).any() else np.nan
+            rows.append(row)
+    accuracy = pd.DataFrame(rows)
+
+    # One request = salary and level for one profile
+    row = np.ascontiguousarray(X[:1])
+    latency = pd.DataFrame([
+        {"Mode": "classifier", "Model calls": 2,
+         "ms per request": _ms_per_call(lambda: classifier_mode.predict(row))},
+        {"Mode": "regressor", "Model calls": 1,
+         "ms per request": _ms_per_call(lambda: regressor_mode.predict(row))},
+    ])
+    return accuracy, latency, class_codes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare salary levels from the classifier with levels derived "
+                                                 "from the regressor, or save the tercile cuts for the models.")
+    parser.add_argument("--data", default="salary_data.csv", help="Data the models were trained on")
+    parser.add_argument("--models-dir", default=".")
+    parser.add_argument("--save-cuts", action="store_true",
+                        help="Write the data's tercile cuts, and the level of each classifier class, next "
+                             "to the models (for models trained before they were saved)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.save_cuts:
+        from data_cache import open_dataset
+        from training import save_level_cuts
+
+        dataset = open_dataset(args.data)
+        cuts = dataset.level_cuts
+        # Matched on the classifier as trained, not as relabelled by an
+        # earlier save
+        artifacts = load_artifacts(args.models_dir, relabel=False)
+        X = InferencePipeline.from_artifacts(*artifacts, level_mode="classifier").scale_features(dataset.features())
+        class_levels = classifier_levels(artifacts[1], X, np.asarray(dataset.salary_class))
+        identity = class_levels == list(range(len(class_levels)))
+        save_level_cuts(args.models_dir, cuts, None if identity else class_levels)
+        print(f"✅ Saved tercile cuts {cuts[0]:,.2f} / {cuts[1]:,.2f} to {args.models_dir}"
+              + ("" if identity else f", with classifier classes relabelled to levels {class_levels}"))
+
+    accuracy, latency, class_codes = compare_level_modes(args.data, args.models_dir)
+    mapping = ", ".join(f"{LEVEL_LABELS[tercile]} -> {code}" for tercile, code in enumerate(class_codes))
+    with pd.option_context("display.width", 200, "display.float_format", "{:,.4f}".format):
+        print(accuracy.to_string(index=False))
+        print(f"\nClassifier classes by tercile: {mapping}\n")
+        print(latency.to_string(index=False))
+    print(f"✅ Compared level modes in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import sys
+import tempfile
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = "benchmark_results"
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MyPyScript.py")
+USER_COUNTS = [1, 4, 8]
+# The app's dropdown options (the placeholders aside)
+GENDERS = ["Male", "Female"]
+EDUCATION_LEVELS = ["High School", "Associate's", "Bachelor's", "Master's", "PhD"]
+JOB_TITLES = ["Software Engineer", "Data Scientist", "Data Analyst", "HR", "Manager", "Sales Executive"]
+
+
+def _rss_mb():
+    # Current resident set size; the peak where /proc isn't available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def _shows_result(at):
+    # Not at.error: the mock fallback's "model files not found" stays on the page
+    return not at.exception and any("result-display" in m.value for m in at.markdown)
+
+
+def _served_by_model(at):
+    # Model results carry a version caption; the mock fallback's don't
+    return any(c.value.startswith("Model version") for c in at.caption)
+
+
+class UserSession:
+    # One simulated user: an AppTest session of the app, driven like a
+    # browser would drive it. Every widget change is a rerun, as it is when
+    # a user moves a slider; Predict is a rerun that renders the result.
+
+    def __init__(self, rng, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = rng
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.mode = "salary"
+
+    def _run(self, widget):
+        start = time.perf_counter()
+        widget.run()
+        return time.perf_counter() - start
+
+    def open(self):
+        self.at.run()
+        for key, options in (("gender_select", GENDERS), ("education_select", EDUCATION_LEVELS),
+                             ("job_select", JOB_TITLES)):
+            self.at.selectbox(key=key).set_value(self.rng.choice(options))
+        return self._run(self.at)
+
+    def switch(self, mode):
+        self.mode = mode
+        return self._run(self.at.button(key=f"{mode}_tab").click())
+
+    def change(self):
+        # Move one input to a new value
+        key = self.rng.choice(["age_slider", "experience_slider", "gender_select", "education_select", "job_select"])
+        if key == "age_slider":
+            widget = self.at.slider(key=key).set_value(self.rng.randint(18, 65))
+        elif key == "experience_slider":
+            widget = self.at.slider(key=key).set_value(self.rng.randint(0, 40))
+        else:
+            options = {"gender_select": GENDERS, "education_select": EDUCATION_LEVELS, "job_select": JOB_TITLES}[key]
+            widget = self.at.selectbox(key=key).set_value(self.rng.choice(options))
+        return self._run(widget)
+
+    def predict(self):
+        seconds = self._run(self.at.button(key="predict_btn").click())
+        return seconds, _shows_result(self.at), _served_by_model(self.at)
+
+
+def _user(user_id, options, barrier, results):
+    # Worker process body: warm up, wait for every user, then run the
+    # scripted actions and report timings, CPU time and memory
+    try:
+        logging.disable(logging.WARNING)
+        if options["mock"]:
+            # No artifacts in the working directory, so the app falls back to
+            # its mock predictions
+            os.chdir(tempfile.mkdtemp(prefix="load_test_"))
+        rng = random.Random(options["seed"] * 1000 + user_id)
+        session = UserSession(rng, options["timeout"])
+
+        start = time.perf_counter()
+        session.open()
+        # One prediction per mode, so model loading and first-use costs stay
+        # out of the measured window
+        for mode in ("level", "salary"):
+            session.switch(mode)
+            session.predict()
+        warmup_seconds = time.perf_counter() - start
+        warm_rss = _rss_mb()
+
+        barrier.wait(timeout=options["timeout"])
+        started = time.time()
+        cpu_start = time.process_time()
+        predictions, reruns, failures, mocked = [], [], 0, 0
+        for _ in range(options["actions"]):
+            mode = "level" if rng.random() < options["level_share"] else "salary"
+            if mode != session.mode:
+                reruns.append(session.switch(mode))
+            for _ in range(options["changes"]):
+                reruns.append(session.change())
+            seconds, ok, by_model = session.predict()
+            predictions.append((mode, seconds))
+            failures += not ok
+            mocked += ok and not by_model
+            if options["think"]:
+                time.sleep(rng.expovariate(1 / options["think"]))
+        results.put({
+            "user": user_id, "started": started, "finished": time.time(),
+            "cpu_seconds": time.process_time() - cpu_start, "warmup_seconds": warmup_seconds,
+            "predictions": predictions, "reruns": reruns, "failures": failures, "mocked": mocked,
+            "rss_mb": _rss_mb(), "warm_rss_mb": warm_rss,
+        })
+    except Exception:
+        barrier.abort()
+        results.put({"user": user_id, "error": traceback.format_exc()})
+
+
+def _percentiles(seconds):
+    if not seconds:
+        return {f"p{q}_ms": None for q in (50, 95, 99)}
+    return {f"p{q}_ms": float(np.percentile(seconds, q)) * 1000 for q in (50, 95, 99)}
+
+
+def summarize(users, reports):
+    # One row of the results table from the worker reports of one run
+    predictions = [s for r in reports for _, s in r["predictions"]]
+    window = max(r["finished"] for r in reports) - min(r["started"] for r in reports)
+    row = {
+        "users": users,
+        "predictions": len(predictions),
+        "failures": sum(r["failures"] for r in reports),
+        "mock_predictions": sum(r["mocked"] for r in reports),
+        "throughput_per_s": len(predictions) / window,
+        **_percentiles(predictions),
+    }
+    for mode in ("salary", "level"):
+        row[f"{mode}_p95_ms"] = _percentiles([s for r in reports for m, s in r["predictions"] if m == mode])["p95_ms"]
+    row["rerun_p50_ms"] = _percentiles([s for r in reports for s in r["reruns"]])["p50_ms"]
+    row["cpu_ms_per_prediction"] = sum(r["cpu_seconds"] for r in reports) / max(len(predictions), 1) * 1000
+    row["cpu_s_per_session"] = float(np.mean([r["cpu_seconds"] for r in reports]))
+    row["rss_mb_per_session"] = float(np.mean([r["rss_mb"] for r in reports]))
+    row["growth_mb_per_session"] = float(np.mean([r["rss_mb"] - r["warm_rss_mb"] for r in reports]))
+    row["warmup_s"] = float(np.mean([r["warmup_seconds"] for r in reports]))
+    return row
+
+
+def run_load(users, actions=20, changes=2, level_share=0.5, think=0.0, mock=False, seed=0, timeout=300):
+    # Simulates `users` concurrent sessions, each in its own process (an
+    # AppTest session isn't safe to run next to another in one process), and
+    # returns the summary row and the raw worker reports
+    options = {"actions": actions, "changes": changes, "level_share": level_share, "think": think,
+               "mock": mock, "seed": seed, "timeout": timeout}
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(users)
+    results = context.Queue()
+    workers = [context.Process(target=_user, args=(i, options, barrier, results), daemon=True) for i in range(users)]
+    for worker in workers:
+        worker.start()
+    reports = []
+    try:
+        for _ in workers:
+            reports.append(results.get(timeout=timeout * 2))
+    except queue.Empty:
+        raise RuntimeError(f"Only {len(reports)} of {users} users reported within {timeout * 2}s")
+    finally:
+        for worker in workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+    errors = [r["error"] for r in reports if "error" in r]
+    if errors:
+        # The first failure is the cause; the others are broken barriers
+        raise RuntimeError(f"A simulated user failed:\n{min(errors, key=lambda e: 'BrokenBarrierError' in e)}")
+    return summarize(users, reports), sorted(reports, key=lambda r: r["user"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent users of the Streamlit app and report "
+                                                 "throughput, time-to-result percentiles, CPU and memory.")
+    parser.add_argument("--users", default=",".join(map(str, USER_COUNTS)),
+                        help="Comma-separated numbers of concurrent users, one run each")
+    parser.add_argument("--actions", type=int, default=20, help="Predictions per user")
+    parser.add_argument("--changes", type=int, default=2, help="Input changes (reruns) before each prediction")
+    parser.add_argument("--level-share", type=float, default=0.5,
+                        help="Share of predictions made in salary level mode")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean pause between predictions, in seconds")
+    parser.add_argument("--mock", action="store_true",
+                        help="Run without the model artifacts, on the app's mock predictions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds allowed per app run")
+    parser.add_argument("--output", help=f"JSON file to write (default: {RESULTS_DIR}/load-<timestamp>-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    from benchmarks import run_metadata
+    from inference import DEFAULT_LEVEL_MODE
+
+    rows, runs = [], []
+    for users in [int(n) for n in args.users.split(",")]:
+        row, reports = run_load(users, args.actions, args.changes, args.level_share, args.think,
+                                args.mock, args.seed, args.timeout)
+        rows.append(row)
+        runs.append({"summary": row, "users": reports})
+        print(f"{users} users: {row['throughput_per_s']:.1f} predictions/s, "
+              f"p95 {row['p95_ms']:.0f} ms, {row['failures']} without a result")
+
+    report = {"metadata": {**run_metadata(), "mock": args.mock,
+                           "level_mode": DEFAULT_LEVEL_MODE},
+              "params": {k: v for k, v in vars(args).items() if k not in ("users", "output")},
+              "runs": runs}
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"load-{stamp}-{report['metadata']['commit'] or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:,.1f}".format):
+        print(pd.DataFrame(rows).set_index("users").T)
+    print(f"✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
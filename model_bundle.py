@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from artifacts import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, artifact_fingerprint, load_artifacts, load_level_cuts
+from forest_engine import FlatForest
+from inference import InferencePipeline
+
+BUNDLE_DIR = "model_bundle"
+BUNDLE_FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+# Numeric arrays stored as raw .npy files so they can be memory-mapped
+_FOREST_ARRAYS = ["feature", "threshold", "children", "value", "roots"]
+# Classifiers without coefficients (trees, forests) are pickled whole
+CLASSIFIER_PICKLE = "classifier.pkl"
+
+
+class LinearClassifier:
+    # predict_proba of a fitted LogisticRegression from its coefficients alone,
+    # computed the same way sklearn does (softmax for 3+ classes)
+
+    def __init__(self, coef, intercept, classes):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+
+    def decision_function(self, X):
+        scores = X @ self.coef_.T + self.intercept_
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores))
+            return np.column_stack([1.0 - positive, positive])
+        scores -= scores.max(axis=1).reshape((-1, 1))
+        np.exp(scores, scores)
+        scores /= scores.sum(axis=1).reshape((-1, 1))
+        return scores
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _content_version(staging, manifest):
+    # Hash of the arrays and manifest, so identical models get the same version
+    digest = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode())
+    for name in sorted(os.listdir(staging)):
+        with open(os.path.join(staging, name), "rb") as f:
+            digest.update(name.encode())
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def export_bundle(regressor, classifier, scaler, encoders, bundle_dir=BUNDLE_DIR, version=None, level_cuts=None,
+                  flat_forest=None, metadata=None, activate=True):
+    # Write a new bundle version under `bundle_dir` and point CURRENT at it
+    # (unless `activate` is False). The version directory is filled under a
+    # temporary name and renamed into place, so readers never see a partial
+    # bundle. Without an explicit `version` the name is a hash of the bundle
+    # contents. `flat_forest` replaces the regressor's own trees (e.g. a
+    # compressed forest); `metadata` is recorded in the manifest.
+    pipeline = InferencePipeline.from_artifacts(regressor, classifier, scaler, encoders, level_mode="classifier")
+    if flat_forest is not None:
+        pipeline.flat_forest = flat_forest
+    if pipeline.flat_forest is None:
+        raise ValueError("Bundles need a RandomForestRegressor as the regressor")
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=bundle_dir)
+
+    forest = pipeline.flat_forest
+    for name in _FOREST_ARRAYS:
+        np.save(os.path.join(staging, f"forest_{name}.npy"), np.ascontiguousarray(getattr(forest, name)))
+    if forest.cover is not None:
+        np.save(os.path.join(staging, "forest_cover.npy"), np.ascontiguousarray(forest.cover))
+    if hasattr(classifier, "coef_"):
+        classifier_kind = "linear"
+        np.save(os.path.join(staging, "classifier_coef.npy"), np.ascontiguousarray(classifier.coef_, dtype=np.float64))
+        np.save(os.path.join(staging, "classifier_intercept.npy"),
+                np.ascontiguousarray(classifier.intercept_, dtype=np.float64))
+    else:
+        classifier_kind = "pickle"
+        joblib.dump(classifier, os.path.join(staging, CLASSIFIER_PICKLE))
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "feature_columns": FEATURE_COLUMNS,
+        "categories": {col: [str(label) for label in pipeline.categories[col]] for col in CATEGORICAL_COLUMNS},
+        "fill_codes": pipeline.fill_codes,
+        "scaler": {"center": pipeline.center.tolist(), "scale": pipeline.scale.tolist()},
+        "forest": {"depth": int(forest.depth), "n_trees": forest.n_trees},
+        "classifier": {"kind": classifier_kind, "classes": np.asarray(classifier.classes_).tolist()},
+    }
+    if level_cuts is not None:
+        manifest["level_cuts"] = [float(cut) for cut in level_cuts]
+    if metadata:
+        manifest["metadata"] = metadata
+    version = version or _content_version(staging, manifest)
+    manifest.update(version=version, created=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    version_dir = os.path.join(bundle_dir, version)
+    if os.path.exists(version_dir):
+        # Same version already exported; keep the existing copy
+        shutil.rmtree(staging)
+    else:
+        os.rename(staging, version_dir)
+
+    if activate:
+        set_current(version, bundle_dir)
+    return version_dir
+
+
+def set_current(version, bundle_dir=BUNDLE_DIR):
+    # Atomically point CURRENT at an existing version
+    if not os.path.exists(os.path.join(bundle_dir, version, MANIFEST_FILE)):
+        raise FileNotFoundError(f"No bundle version {version!r} in {bundle_dir}")
+    pointer = os.path.join(bundle_dir, CURRENT_FILE)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version + "\n")
+    os.replace(pointer + ".tmp", pointer)
+
+
+def current_version(bundle_dir=BUNDLE_DIR):
+    with open(os.path.join(bundle_dir, CURRENT_FILE)) as f:
+        return f.read().strip()
+
+
+def current_bundle(bundle_dir=BUNDLE_DIR):
+    return os.path.join(bundle_dir, current_version(bundle_dir))
+
+
+def load_bundle(path=None, mmap_mode="r"):
+    # Build an InferencePipeline whose arrays are read-only memory maps of the
+    # bundle files, so worker processes on the same host share the pages
+    # through the OS page cache. Only a non-linear classifier is unpickled.
+    path = path or current_bundle()
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest["format_version"] != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format {manifest['format_version']} in {path}")
+    if manifest["feature_columns"] != FEATURE_COLUMNS:
+        raise ValueError(f"Bundle at {path} was built for different features")
+
+    def array(name):
+        # A plain ndarray view of the map: np.memmap's subclass hooks add
+        # overhead to every take() on the per-row prediction path
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode).view(np.ndarray)
+
+    forest = FlatForest(
+        **{name: array(f"forest_{name}") for name in _FOREST_ARRAYS},
+        depth=manifest["forest"]["depth"],
+        # Bundles written before contributions existed have no cover
+        cover=array("forest_cover") if os.path.exists(os.path.join(path, "forest_cover.npy")) else None,
+    )
+    # Bundles written before pickled classifiers existed have no "kind"
+    if manifest["classifier"].get("kind", "linear") == "pickle":
+        classifier = joblib.load(os.path.join(path, CLASSIFIER_PICKLE))
+    else:
+        classifier = LinearClassifier(
+            array("classifier_coef"), array("classifier_intercept"), np.array(manifest["classifier"]["classes"]),
+        )
+    pipeline = InferencePipeline(
+        None, classifier,
+        manifest["scaler"]["center"], manifest["scaler"]["scale"],
+        manifest["categories"], flat_forest=forest, level_cuts=manifest.get("level_cuts"),
+        fill_codes=manifest.get("fill_codes"),
+    )
+    pipeline.version = manifest["version"]
+    return pipeline
+
+
+def _memory_kb():
+    # (RSS, PSS) of this process; PSS splits shared pages between processes
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage = {"Rss": rss, "Pss": rss}
+    return usage["Rss"], usage["Pss"]
+
+
+def _measure_worker(mode, models_dir, bundle_path):
+    start = time.perf_counter()
+    if mode == "pickle":
+        pipeline = InferencePipeline.from_artifacts(*load_artifacts(models_dir), level_cuts=load_level_cuts(models_dir))
+    else:
+        pipeline = load_bundle(bundle_path)
+    load_seconds = time.perf_counter() - start
+
+    # Touch every tree so all model pages are resident
+    rng = np.random.default_rng(0)
+    pipeline.predict(rng.normal(0.0, 1.5, size=(256, len(FEATURE_COLUMNS))))
+
+    # Wait until every worker is loaded before sampling memory
+    print("ready", flush=True)
+    sys.stdin.readline()
+    rss_kb, pss_kb = _memory_kb()
+    print(json.dumps({"load_seconds": load_seconds, "rss_kb": rss_kb, "pss_kb": pss_kb}), flush=True)
+
+
+def measure_mode(mode, models_dir=".", bundle_path=None, workers=4):
+    # Start `workers` processes loading the models one way ("pickle" or
+    # "bundle"), all alive at once, and report mean load time plus
+    # per-process RSS/PSS
+    bundle_path = bundle_path or current_bundle()
+    start = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-W", "ignore", __file__, "_worker", mode, models_dir, bundle_path],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.stdout.readline()
+    ready_seconds = time.perf_counter() - start
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.flush()
+    samples = [json.loads(proc.stdout.readline()) for proc in procs]
+    for proc in procs:
+        proc.wait()
+    return {
+        "load_seconds": float(np.mean([s["load_seconds"] for s in samples])),
+        "all_ready_seconds": ready_seconds,
+        "rss_mb": float(np.mean([s["rss_kb"] for s in samples])) / 1024,
+        "pss_mb": float(np.mean([s["pss_kb"] for s in samples])) / 1024,
+    }
+
+
+def measure(models_dir=".", bundle_path=None, workers=4):
+    return {mode: measure_mode(mode, models_dir, bundle_path, workers) for mode in ("pickle", "bundle")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or measure the memory-mapped model bundle.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Write a new bundle version from the .pkl artifacts")
+    export.add_argument("--models-dir", default=".", help="Directory holding the .pkl artifacts")
+    export.add_argument("--bundle-dir", default=BUNDLE_DIR)
+
+    bench = sub.add_parser("measure", help="Compare cold start and memory against joblib.load")
+    bench.add_argument("--models-dir", default=".")
+    bench.add_argument("--bundle-dir", default=BUNDLE_DIR)
+    bench.add_argument("--workers", type=int, default=4, help="Concurrent worker processes per mode")
+
+    worker = sub.add_parser("_worker")
+    worker.add_argument("mode", choices=["pickle", "bundle"])
+    worker.add_argument("models_dir")
+    worker.add_argument("bundle_path")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        try:
+            version_dir = export_bundle(*load_artifacts(args.models_dir), bundle_dir=args.bundle_dir,
+                                        version=artifact_fingerprint(args.models_dir)[:12],
+                                        level_cuts=load_level_cuts(args.models_dir))
+        except ValueError as e:
+            parser.error(f"can't bundle the models in {args.models_dir}: {e}")
+        print(f"✅ Bundle written to {version_dir}")
+    elif args.command == "measure":
+        results = measure(args.models_dir, current_bundle(args.bundle_dir), args.workers)
+        print(f"{'mode':<8} {'load s':>8} {'all ready s':>12} {'RSS MB':>8} {'PSS MB':>8}")
+        for mode, r in results.items():
+            print(f"{mode:<8} {r['load_seconds']:>8.3f} {r['all_ready_seconds']:>12.2f} {r['rss_mb']:>8.1f} {r['pss_mb']:>8.1f}")
+    else:
+        _measure_worker(args.mode, args.models_dir, args.bundle_path)
+
+
+if __name__ == "__main__":
+    main()
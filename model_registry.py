@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from artifacts import ARTIFACT_FILES, LEVELS_FILE, artifact_fingerprint, load_artifacts, load_level_cuts
+from inference import InferencePipeline
+from model_bundle import (BUNDLE_DIR, CURRENT_FILE, MANIFEST_FILE, current_version, export_bundle, load_bundle,
+                          set_current)
+
+POLL_SECONDS = 2.0
+
+# Profiles every new version must score before it is swapped in
+WARMUP_PROFILES = [
+    (25, "Female", "Bachelor's", "Data Analyst", 2),
+    (35, "Male", "Master's", "Software Engineer", 10),
+    (50, "Female", "PhD", "Director of Marketing", 25),
+]
+
+
+def list_versions(bundle_dir=BUNDLE_DIR):
+    # (version, created) for every complete version, oldest first
+    versions = []
+    if not os.path.isdir(bundle_dir):
+        return versions
+    for name in os.listdir(bundle_dir):
+        manifest_path = os.path.join(bundle_dir, name, MANIFEST_FILE)
+        if name.startswith(".") or not os.path.exists(manifest_path):
+            continue
+        with open(manifest_path) as f:
+            versions.append((name, json.load(f).get("created", "")))
+    return sorted(versions, key=lambda v: v[1])
+
+
+def warm_up(pipeline):
+    # Score the warm-up profiles (pages in the memory maps and fails early on
+    # a broken version). Profiles the version's encoders don't know are skipped.
+    scored = 0
+    for profile in WARMUP_PROFILES:
+        try:
+            X = pipeline.transform_one(*profile)
+        except ValueError:
+            continue
+        salary, _, confidence = pipeline.predict(X)
+        if not (np.isfinite(salary).all() and np.isfinite(confidence).all()):
+            raise ValueError(f"Version {getattr(pipeline, 'version', '?')} returned non-finite predictions")
+        scored += 1
+    if not scored:
+        raise ValueError(f"Version {getattr(pipeline, 'version', '?')} could not score any warm-up profile")
+    return scored
+
+
+class ModelRegistry:
+    # Serves the active model version and swaps in new ones without a
+    # restart. The active version is the bundle CURRENT points at; without a
+    # bundle, the .pkl artifacts in `models_dir` (versioned by content hash).
+    # A background thread polls for changes, loads and warms the new version
+    # off the request path, then replaces the reference in one assignment.
+    # Callers take current() once per request, so work already in flight
+    # finishes on the version it started with.
+
+    def __init__(self, bundle_dir=BUNDLE_DIR, models_dir=".", poll_seconds=POLL_SECONDS):
+        self.bundle_dir = bundle_dir
+        self.models_dir = models_dir
+        self.poll_seconds = poll_seconds
+        self.last_error = None
+        self._pipeline = None
+        self._pickle_signature = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # The first load happens here so startup fails loudly
+        self._pipeline = self._load(*self._latest())
+
+    def current(self):
+        return self._pipeline
+
+    @property
+    def version(self):
+        return getattr(self._pipeline, "version", None)
+
+    def _latest(self):
+        # (source, version) of what should be active
+        if os.path.exists(os.path.join(self.bundle_dir, CURRENT_FILE)):
+            return "bundle", current_version(self.bundle_dir)
+        signature = self._signature()
+        if self._pipeline is not None and signature == self._pickle_signature:
+            return "pickle", self.version
+        return "pickle", artifact_fingerprint(self.models_dir)[:12]
+
+    def _signature(self):
+        stats = [os.stat(os.path.join(self.models_dir, name)) for name in ARTIFACT_FILES]
+        levels = os.path.join(self.models_dir, LEVELS_FILE)
+        if os.path.exists(levels):
+            stats.append(os.stat(levels))
+        return tuple((stat.st_mtime_ns, stat.st_size) for stat in stats)
+
+    def _load(self, source, version):
+        if source == "bundle":
+            pipeline = load_bundle(os.path.join(self.bundle_dir, version))
+        else:
+            signature = self._signature()
+            pipeline = InferencePipeline.from_artifacts(*load_artifacts(self.models_dir),
+                                                        level_cuts=load_level_cuts(self.models_dir))
+            if self._signature() != signature:
+                raise ValueError("Artifacts changed while loading; will retry")
+            self._pickle_signature = signature
+            pipeline.version = version
+        metrics.MODEL_LOADS.inc(source=source)
+        warm_up(pipeline)
+        return pipeline
+
+    def refresh(self):
+        # Load the latest version if it differs from the active one. Returns
+        # True when a swap happened. A version that fails to load or warm up
+        # is reported and the active one keeps serving.
+        with self._lock:
+            try:
+                source, version = self._latest()
+                if version == self.version:
+                    return False
+                pipeline = self._load(source, version)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                metrics.MODEL_SWAPS.inc(result="failed")
+                return False
+            self._pipeline = pipeline
+            self.last_error = None
+            metrics.MODEL_SWAPS.inc(result="swapped")
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.refresh()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local model registry (versioned bundles).")
+    parser.add_argument("--bundle-dir", default=BUNDLE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="List versions; * marks the active one")
+    publish = sub.add_parser("publish", help="Publish the .pkl artifacts as a new version and activate it")
+    publish.add_argument("--models-dir", default=".")
+    activate = sub.add_parser("activate", help="Make an existing version active (e.g. to roll back)")
+    activate.add_argument("version")
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        active = current_version(args.bundle_dir) if os.path.exists(os.path.join(args.bundle_dir, CURRENT_FILE)) else None
+        for version, created in list_versions(args.bundle_dir):
+            print(f"{'*' if version == active else ' '} {version}  {created}")
+    elif args.command == "publish":
+        start = time.perf_counter()
+        artifacts = load_artifacts(args.models_dir)
+        cuts = load_level_cuts(args.models_dir)
+        warm_up(InferencePipeline.from_artifacts(*artifacts, level_cuts=cuts))
+        try:
+            version_dir = export_bundle(*artifacts, bundle_dir=args.bundle_dir,
+                                        version=artifact_fingerprint(args.models_dir)[:12], level_cuts=cuts)
+        except ValueError as e:
+            parser.error(f"can't publish the models in {args.models_dir}: {e}")
+        print(f"✅ Published and activated {os.path.basename(version_dir)} ({time.perf_counter() - start:.1f}s)")
+    else:
+        set_current(args.version, args.bundle_dir)
+        print(f"✅ Activated {args.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from artifacts import FEATURE_COLUMNS, load_artifacts, load_level_cuts
+from inference import InferencePipeline
+
+DEFAULT_CAPACITY = 100_000
+# Shards per worker for each batch, so a slow shard doesn't hold up the rest
+SHARDS_PER_WORKER = 4
+MIN_SHARD_ROWS = 1024
+
+
+def _layout(capacity, explain):
+    # (name, dtype, shape) of the arrays in one shared block: the encoded
+    # inputs (scaled in place by the workers) and every output column
+    n_features = len(FEATURE_COLUMNS)
+    arrays = [("X", np.float64, (capacity, n_features)), ("salary", np.float64, (capacity,)),
+              ("level", np.int64, (capacity,)), ("confidence", np.float64, (capacity,))]
+    if explain:
+        arrays.append(("contributions", np.float64, (capacity, n_features)))
+    return arrays
+
+
+def _block_size(capacity, explain):
+    return sum(np.dtype(dtype).itemsize * math.prod(shape) for _, dtype, shape in _layout(capacity, explain))
+
+
+def _views(buffer, capacity, explain):
+    views, offset = {}, 0
+    for name, dtype, shape in _layout(capacity, explain):
+        views[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += views[name].nbytes
+    return views
+
+
+# Set in each worker by the pool initializer: the pipeline, and the shared
+# blocks attached so far (by name)
+_PIPELINE = None
+_BLOCKS = {}
+
+
+def _init_worker(pipeline):
+    global _PIPELINE
+    _PIPELINE = pipeline
+
+
+def _predict_shard(block, capacity, explain, start, stop):
+    # Scale and score rows [start, stop) of a shared block in place (runs in
+    # a worker process)
+    if block not in _BLOCKS:
+        shm = shared_memory.SharedMemory(name=block)
+        _BLOCKS[block] = (shm, _views(shm.buf, capacity, explain))
+    views = _BLOCKS[block][1]
+    X = _PIPELINE.scale_features(views["X"][start:stop])
+    views["salary"][start:stop], views["level"][start:stop], views["confidence"][start:stop] = _PIPELINE.predict(X)
+    if explain:
+        views["contributions"][start:stop] = _PIPELINE.explain_salary(X, views["salary"][start:stop])[1]
+
+
+class ScoringJob:
+    # One submitted batch: its shared block, the rows the encoders accepted
+    # and the shard futures
+
+    def __init__(self, views, n_rows, valid, futures):
+        self.views, self.n_rows, self.valid, self.futures = views, n_rows, valid, futures
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def result(self):
+        # (salary, level index, confidence, contributions or None, valid);
+        # rows that can't be scored get NaN and level -1. Views of shared
+        # memory, valid until the block is reused two submits later.
+        for future in self.futures:
+            future.result()
+        n, invalid = self.n_rows, ~self.valid
+        salary, level = self.views["salary"][:n], self.views["level"][:n]
+        confidence, contributions = self.views["confidence"][:n], self.views.get("contributions")
+        salary[invalid], level[invalid], confidence[invalid] = np.nan, -1, np.nan
+        if contributions is not None:
+            contributions = contributions[:n]
+            contributions[invalid] = np.nan
+        return salary, level, confidence, contributions, self.valid
+
+
+class ParallelScorer:
+    # Batch inference across a process pool. The pipeline is handed to each
+    # worker once, by the pool initializer: a fork start inherits the parent's
+    # copy with no pickling at all (spawn pickles it once per worker), and
+    # with a memory-mapped bundle every process shares the same pages. Each
+    # batch is encoded straight into a shared-memory block, split into row
+    # shards, and the workers scale, predict and write their outputs back
+    # into the block, so only shard offsets cross the process boundary. Two
+    # blocks alternate, so the caller can prepare (or write out) one batch
+    # while the workers score the other.
+
+    def __init__(self, pipeline, workers=None, capacity=DEFAULT_CAPACITY, explain=False):
+        self.pipeline = pipeline
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = capacity
+        self.explain = explain
+        if explain:
+            # Built before the workers start, so forked ones share the tables
+            pipeline.explainer
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self._blocks = []
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                         initializer=_init_worker, initargs=(pipeline,))
+        try:
+            for _ in range(2):
+                shm = shared_memory.SharedMemory(create=True, size=_block_size(capacity, explain))
+                self._blocks.append((shm, _views(shm.buf, capacity, explain), None))
+        except BaseException:
+            self.close()
+            raise
+        self._next = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, columns):
+        # Queue a batch of raw rows (a DataFrame, or any column mapping); see
+        # ScoringJob.result(). Waits for the previous use of the block first.
+        n_rows = len(columns[FEATURE_COLUMNS[0]])
+        if n_rows > self.capacity:
+            raise ValueError(f"Batch of {n_rows:,} rows is over the scorer's capacity of {self.capacity:,}")
+        shm, views, previous = self._blocks[self._next]
+        if previous is not None:
+            wait(previous.futures)
+        _, valid = self.pipeline.encode(columns, out=views["X"][:n_rows])
+        shards = max(1, min(self.workers * SHARDS_PER_WORKER, n_rows // MIN_SHARD_ROWS))
+        bounds = np.linspace(0, n_rows, shards + 1).astype(int)
+        futures = [self._pool.submit(_predict_shard, shm.name, self.capacity, self.explain, int(start), int(stop))
+                   for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+        job = ScoringJob(views, n_rows, valid, futures)
+        self._blocks[self._next] = (shm, views, job)
+        self._next = 1 - self._next
+        return job
+
+    def predict(self, columns):
+        # Score one batch and wait for it; returns copies of the outputs
+        salary, level, confidence, contributions, valid = self.submit(columns).result()
+        return (salary.copy(), level.copy(), confidence.copy(),
+                None if contributions is None else contributions.copy(), valid)
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        for shm, _, _ in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the parallel scorer against the single-process pipeline "
+                                                 "and measure its throughput per worker count.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to try")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="Rows per batch")
+    parser.add_argument("--models-dir", default=".")
+    parser.add_argument("--explain", action="store_true", help="Also compute the contribution columns")
+    args = parser.parse_args(argv)
+
+    from synthetic_data import SyntheticSalaryData
+
+    pipeline = InferencePipeline.from_artifacts(*load_artifacts(args.models_dir),
+                                                level_cuts=load_level_cuts(args.models_dir))
+    data = SyntheticSalaryData().generate(args.rows, seed=0)
+    batches = [data.iloc[start:start + args.capacity] for start in range(0, len(data), args.capacity)]
+
+    start = time.perf_counter()
+    expected = []
+    for batch in batches:
+        X, valid = pipeline.transform(batch)
+        salary, level, confidence = pipeline.predict(X)
+        expected.append(salary)
+        if args.explain:
+            pipeline.explain_salary(X, salary)
+    serial = time.perf_counter() - start
+    print(f"{'1 process':<12} {serial:8.2f}s {args.rows / serial:>12,.0f} rows/s")
+
+    for workers in [int(n) for n in args.workers.split(",")]:
+        with ParallelScorer(pipeline, workers, args.capacity, args.explain) as scorer:
+            scorer.predict(batches[0])
+            start = time.perf_counter()
+            jobs, mismatches = [], 0
+            for i, batch in enumerate(batches):
+                jobs.append((i, scorer.submit(batch)))
+                if len(jobs) == 2:
+                    i, job = jobs.pop(0)
+                    salary, _, _, _, valid = job.result()
+                    mismatches += int((salary[valid] != expected[i][valid]).sum())
+            for i, job in jobs:
+                salary, _, _, _, valid = job.result()
+                mismatches += int((salary[valid] != expected[i][valid]).sum())
+            seconds = time.perf_counter() - start
+        print(f"{workers} workers{'':<4} {seconds:8.2f}s {args.rows / seconds:>12,.0f} rows/s "
+              f"({serial / seconds:.2f}x, {mismatches} salaries differ)")
+    print(f"✅ Scored {args.rows:,} rows per run in batches of {args.capacity:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from artifacts import FEATURE_COLUMNS, artifact_fingerprint, load_artifacts, load_level_cuts
+from inference import DEFAULT_LEVEL_MODE, InferencePipeline
+
+GRID_FILE = "prediction_grid.npz"
+
+# Input ranges exposed by the app's sliders
+AGE_RANGE = (18, 65)
+EXPERIENCE_RANGE = (0, 40)
+
+
+class PredictionGrid:
+    # Model outputs for every (age, gender, education, job title, experience)
+    # combination, stored as dense arrays indexed by the encoder codes.
+
+    def __init__(self, salary, level, confidence, categories, fingerprint):
+        self.salary = salary
+        self.level = level
+        self.confidence = confidence
+        self.categories = categories
+        self.fingerprint = fingerprint
+        self._codes = {col: {label: i for i, label in enumerate(labels)}
+                       for col, labels in categories.items()}
+
+    def lookup(self, age, gender, education, job_title, experience):
+        # Returns (salary, level class, confidence) or None when the input is
+        # outside the precomputed space
+        try:
+            idx = (
+                int(age) - AGE_RANGE[0],
+                self._codes["Gender"][gender],
+                self._codes["Education Level"][education],
+                self._codes["Job Title"][job_title],
+                int(experience) - EXPERIENCE_RANGE[0],
+            )
+        except KeyError:
+            return None
+        if not (0 <= idx[0] < self.salary.shape[0] and 0 <= idx[4] < self.salary.shape[4]):
+            return None
+        return float(self.salary[idx]), int(self.level[idx]), float(self.confidence[idx])
+
+    def save(self, path=GRID_FILE):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                salary=self.salary,
+                level=self.level,
+                confidence=self.confidence,
+                fingerprint=np.array(self.fingerprint),
+                **{f"categories/{col}": np.array(labels, dtype=str)
+                   for col, labels in self.categories.items()},
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=GRID_FILE):
+        with np.load(path) as data:
+            categories = {key.split("/", 1)[1]: list(data[key])
+                          for key in data.files if key.startswith("categories/")}
+            return cls(data["salary"], data["level"], data["confidence"],
+                       categories, str(data["fingerprint"]))
+
+
+def build_grid(pipeline, fingerprint):
+    categories = {col: list(codes) for col, codes in pipeline.code_maps.items()}
+    ages = np.arange(AGE_RANGE[0], AGE_RANGE[1] + 1)
+    experiences = np.arange(EXPERIENCE_RANGE[0], EXPERIENCE_RANGE[1] + 1)
+    shape = (len(ages), len(categories["Gender"]), len(categories["Education Level"]),
+             len(categories["Job Title"]), len(experiences))
+
+    salary = np.empty(shape, dtype=np.float32)
+    level = np.empty(shape, dtype=np.uint8)
+    confidence = np.empty(shape, dtype=np.float32)
+
+    # One age slice at a time keeps the working set small
+    rest = np.indices(shape[1:]).reshape(len(shape) - 1, -1)
+    for i, age in enumerate(ages):
+        X = np.empty((rest.shape[1], len(FEATURE_COLUMNS)), dtype=np.float64)
+        X[:, 0] = age
+        X[:, 1:4] = rest[:3].T
+        X[:, 4] = experiences[rest[3]]
+        X_scaled = pipeline.scale_features(X)
+        slice_salary, class_idx, class_confidence = pipeline.predict(X_scaled)
+        salary[i] = slice_salary.reshape(shape[1:])
+        level[i] = class_idx.reshape(shape[1:])
+        confidence[i] = class_confidence.reshape(shape[1:])
+
+    return PredictionGrid(salary, level, confidence, categories, fingerprint)
+
+
+def load_or_build_grid(path=GRID_FILE, directory=".", pipeline=None):
+    # Load the grid at `path`, rebuilding it when the artifacts or the level
+    # mode have changed
+    mode = pipeline.level_mode if pipeline is not None else DEFAULT_LEVEL_MODE
+    fingerprint = f"{artifact_fingerprint(directory)}:{mode}"
+    if os.path.exists(path):
+        grid = PredictionGrid.load(path)
+        if grid.fingerprint == fingerprint:
+            return grid
+    if pipeline is None:
+        pipeline = InferencePipeline.from_artifacts(*load_artifacts(directory), level_cuts=load_level_cuts(directory))
+    grid = build_grid(pipeline, fingerprint)
+    grid.save(path)
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute model predictions over the app's input space.")
+    parser.add_argument("--output", default=GRID_FILE, help=f"Grid file to write (default: {GRID_FILE})")
+    parser.add_argument("--models-dir", default=".", help="Directory holding the .pkl artifacts")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    grid = load_or_build_grid(args.output, args.models_dir)
+    print(f"✅ Grid of {grid.salary.size:,} predictions ready in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+import numpy as np
+
+from artifacts import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, LEVEL_LABELS
+from model_bundle import BUNDLE_DIR
+from model_registry import POLL_SECONDS, ModelRegistry
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+
+def score_records(pipeline, records, monitor=None):
+    # One vectorized inference call for a list of JSON records
+    columns = {col: [record.get(col) for record in records] for col in FEATURE_COLUMNS}
+    X_scaled, valid = pipeline.transform(columns)
+
+    version = getattr(pipeline, "version", None)
+    # Unseen labels are scored as the training mode; each result names them
+    unknown = [flags.split("; ") if flags else [] for flags in pipeline.unknown_columns(columns)]
+    results = [{"error": "Missing or invalid feature values", "model_version": version, "unknown_inputs": flags}
+               for flags in unknown]
+    salary, class_idx = np.full(len(records), np.nan), np.full(len(records), -1)
+    if valid.any():
+        X_valid = np.ascontiguousarray(X_scaled[valid])
+        salary[valid], class_idx[valid], confidence = pipeline.predict(X_valid)
+        for i, row in enumerate(np.flatnonzero(valid)):
+            results[row] = {
+                "salary": float(salary[row]),
+                "level": LEVEL_LABELS.get(int(class_idx[row]), "Unknown"),
+                "confidence": float(confidence[i]),
+                "model_version": version,
+                "unknown_inputs": unknown[row],
+            }
+    if monitor is not None:
+        # Rejected records count too: unknown categories are drift
+        monitor.observe(columns, salary, class_idx)
+    return results
+
+
+def invalid_feature(record):
+    # An error message for the first feature of the wrong JSON type, or
+    # None: numbers (not booleans) for the numeric features, strings for the
+    # categorical ones; null is allowed for any of them
+    for col in FEATURE_COLUMNS:
+        value = record.get(col)
+        if value is None:
+            continue
+        if col in CATEGORICAL_COLUMNS:
+            if not isinstance(value, str):
+                return f"\"{col}\" must be a string or null"
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f"\"{col}\" must be a number or null"
+    return None
+
+
+class MicroBatcher:
+    # Collects concurrent single-record requests from an asyncio queue and
+    # scores them together, flushing when `max_batch_size` records are queued
+    # or the oldest one has waited `max_wait_ms`. `models` is a pipeline or a
+    # ModelRegistry; with a registry each batch runs on the version that was
+    # active when it started. Scored batches are fed to `monitor`, if given.
+
+    def __init__(self, models, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 monitor=None):
+        self.models = models
+        self.monitor = monitor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.records = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, record):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def score_batch(self, records):
+        # Explicit batch requests skip the queue but still run off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, score_records, self.pipeline(), records,
+                                                                  self.monitor)
+
+    def pipeline(self):
+        return self.models.current() if hasattr(self.models, "current") else self.models
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            records = [record for record, _ in batch]
+            try:
+                results = await self.score_batch(records)
+            except Exception as e:
+                # A scoring failure, not a bad record: every waiting request
+                # gets the exception (and a 500)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.records += len(records)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class PredictionService:
+    # ASGI application:
+    #   POST /predict        {"Age": 30, "Gender": "Male", ...}
+    #   POST /predict/batch  {"instances": [{...}, {...}]}
+    #   GET  /health
+    #   GET  /drift          drift of recent traffic from the training baseline
+
+    def __init__(self, models, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 monitor=None):
+        self.batcher = MicroBatcher(models, max_batch_size, max_wait_ms, monitor)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        try:
+            status, payload = await self.handle(scope["method"], scope["path"], body)
+        except Exception as e:
+            # Requests are validated in handle(), so anything raised is ours
+            status, payload = 500, {"error": f"Internal error: {e}"}
+        data = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    async def handle(self, method, path, body):
+        if method == "GET" and path == "/health":
+            models = self.batcher.models
+            return 200, {"status": "ok", "batches": self.batcher.batches, "records": self.batcher.records,
+                         "model_version": getattr(self.batcher.pipeline(), "version", None),
+                         "registry_error": getattr(models, "last_error", None)}
+        if method == "GET" and path == "/drift":
+            monitor = self.batcher.monitor
+            if monitor is None:
+                return 404, {"error": "No drift baseline was saved with the models"}
+            report = await asyncio.get_running_loop().run_in_executor(None, monitor.report)
+            return 200, {"rows": int(monitor.observed),
+                         "features": json.loads(report.to_json(orient="records"))}
+        if method != "POST" or path not in ("/predict", "/predict/batch"):
+            return 404, {"error": "Not found"}
+
+        try:
+            request = json.loads(body or b"null")
+        except ValueError:
+            return 400, {"error": "Request body is not valid JSON"}
+
+        if path == "/predict/batch":
+            instances = request.get("instances") if isinstance(request, dict) else request
+            if not isinstance(instances, list) or not all(isinstance(r, dict) for r in instances):
+                return 400, {"error": "Expected a list of records under \"instances\""}
+            for i, record in enumerate(instances):
+                error = invalid_feature(record)
+                if error is not None:
+                    return 400, {"error": f"Record {i}: {error}"}
+            return 200, {"predictions": await self.batcher.score_batch(instances) if instances else []}
+
+        if not isinstance(request, dict):
+            return 400, {"error": "Expected a JSON object with the employee features"}
+        error = invalid_feature(request)
+        if error is not None:
+            return 400, {"error": error}
+        result = await self.batcher.submit(request)
+        return (400 if "error" in result else 200), result
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.batcher.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.batcher.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def _handle_connection(app, reader, writer):
+    # Minimal HTTP/1.1 front end for the ASGI app, so the service runs with
+    # the standard library only. Supports keep-alive and Content-Length bodies.
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = []
+            content_length = 0
+            keep_alive = True
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                name, value = name.strip().lower(), value.strip()
+                headers.append((name.encode(), value.encode()))
+                if name == "content-length":
+                    content_length = int(value)
+                elif name == "connection" and value.lower() == "close":
+                    keep_alive = False
+            body = await reader.readexactly(content_length) if content_length else b""
+
+            path, _, query = target.partition("?")
+            scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(),
+                     "headers": headers, "http_version": "1.1"}
+            response = {}
+
+            async def receive():
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response.update(message)
+                else:
+                    status = response["status"]
+                    head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n".encode()
+                    head += b"".join(k + b": " + v + b"\r\n" for k, v in response["headers"])
+                    writer.write(head + b"\r\n" + message.get("body", b""))
+
+            await app(scope, receive, send)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(app, host="127.0.0.1", port=8000):
+    app.batcher.start()
+    server = await asyncio.start_server(lambda r, w: _handle_connection(app, r, w), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def create_app(models_dir=".", max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+               bundle_dir=BUNDLE_DIR, poll_seconds=POLL_SECONDS):
+    from drift import DriftMonitor
+
+    registry = ModelRegistry(bundle_dir, models_dir, poll_seconds).start()
+    return PredictionService(registry, max_batch_size, max_wait_ms, DriftMonitor.from_directory(models_dir))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve salary predictions over HTTP with micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help=f"Most single requests merged into one model call (default: {DEFAULT_MAX_BATCH_SIZE})")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help=f"Longest a request waits for others to batch with (default: {DEFAULT_MAX_WAIT_MS})")
+    parser.add_argument("--models-dir", default=".", help="Directory holding the .pkl artifacts")
+    parser.add_argument("--bundle-dir", default=BUNDLE_DIR, help="Model registry (versioned bundles) to serve from")
+    parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS,
+                        help=f"How often to check for a new active version (default: {POLL_SECONDS})")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    app = create_app(args.models_dir, args.max_batch_size, args.max_wait_ms, args.bundle_dir, args.poll_seconds)
+    print(f"✅ Model version {app.batcher.pipeline().version} loaded in {time.perf_counter() - start:.1f}s, "
+          f"serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(app, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import math
+
+import numpy as np
+
+
+class KLLSketch:
+    # Streaming quantile sketch (Karnin, Lang & Liberty). Level h holds items
+    # that each stand for 2**h inputs; a full level is sorted and every other
+    # item is promoted. Memory is O(k log(n / k)) and rank error is roughly
+    # 1.7 / k of n. Sketches built on separate chunks can be merged.
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so no weight is lost
+                keep = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(keep):]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Capacities shrink when a level is added, so start over
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def update_repeated(self, value, count, block_size=1 << 16):
+        # Add `count` copies of one value without materialising them all at once
+        while count > 0:
+            n = min(count, block_size)
+            self.update(np.full(n, value, dtype=np.float64))
+            count -= n
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    @property
+    def exact(self):
+        # Nothing has been compacted yet, so answers are exact
+        return all(not len(items) for items in self.levels[1:])
+
+    def quantile(self, q):
+        # Linear interpolation between ranks, like numpy/pandas. Each retained
+        # item sits at the centre of the block of ranks it represents.
+        if not self.count:
+            return math.nan
+        if self.exact:
+            return float(np.quantile(self.levels[0], q))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+        centres = np.cumsum(weights) - weights + (weights - 1) / 2
+        position = q * (weights.sum() - 1)
+        result = np.interp(position, centres, items)
+        return float(np.clip(result, self.min, self.max))
+
+    def quantiles(self, qs):
+        return [self.quantile(q) for q in qs]
+
+    def rank(self, value):
+        # Approximate number of inputs <= value
+        total = 0.0
+        for level, items in enumerate(self.levels):
+            total += np.count_nonzero(items <= value) * 2.0 ** level
+        return total
+
+    @property
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+
+class FrequentItems:
+    # Misra-Gries heavy hitters: keeps at most `capacity` counters. Counts are
+    # exact while there are no more than `capacity` distinct values, and any
+    # value more frequent than n / capacity is always kept.
+
+    def __init__(self, capacity=10_000):
+        self.capacity = capacity
+        self.counts = {}
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values)
+        if values.dtype.kind == "f":
+            values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        uniques, counts = np.unique(values, return_counts=True)
+        self.update_counts(dict(zip(uniques.tolist(), counts.tolist())))
+
+    def update_counts(self, counts):
+        # Add pre-aggregated counts (value -> count)
+        for value, count in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+            self.count += count
+        self._trim()
+
+    def merge(self, other):
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        self.count += other.count
+        self._trim()
+        return self
+
+    def _trim(self):
+        if len(self.counts) <= self.capacity:
+            return
+        # Subtract the (capacity + 1)-th largest count from every counter
+        cut = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.counts = {value: count - cut for value, count in self.counts.items() if count > cut}
+
+    def mode(self):
+        # Most frequent value; ties go to the smallest, like DataFrame.mode()
+        if not self.counts:
+            return None
+        best = max(self.counts.values())
+        return min(value for value, count in self.counts.items() if count == best)
@@ -0,0 +1,226 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from artifacts import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, LEVEL_LABELS, TARGET_COLUMN
+from encoding import CategoryEncoder
+from sketches import FrequentItems, KLLSketch
+
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_SKETCH_K = 400
+
+# The notebook filters Salary first, then each feature in turn, every filter
+# computing its IQR fence on the rows the previous ones kept
+FILTER_COLUMNS = [TARGET_COLUMN] + FEATURE_COLUMNS
+COLUMNS = FEATURE_COLUMNS + [TARGET_COLUMN]
+
+
+def _read_chunks(path, chunk_size):
+    dtypes = {col: "str" for col in CATEGORICAL_COLUMNS}
+    return pd.read_csv(path, usecols=COLUMNS, dtype=dtypes, chunksize=chunk_size)
+
+
+def _fence(sketch, factor):
+    q1, q3 = sketch.quantiles([0.25, 0.75])
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
+
+
+class StreamingPreprocessor:
+    # Out-of-core version of training.preprocess. Nothing holds more than one
+    # chunk of rows; modes, quartiles and tercile cuts come from mergeable
+    # sketches (FrequentItems, KLLSketch). Passes over the file:
+    #   1. modes, category vocabularies and the Salary fence
+    #   2-6. one sketch pass per feature fence, since each fence depends on
+    #        the rows kept by the fences before it
+    #   7. Salary tercile cut points on the surviving rows
+    # After fit(), transform_chunk()/write() encode, filter and label rows.
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, sketch_k=DEFAULT_SKETCH_K, iqr_factor=1.5):
+        self.chunk_size = chunk_size
+        self.sketch_k = sketch_k
+        self.iqr_factor = iqr_factor
+        self.modes = {}
+        self.encoders = {}
+        self.fences = {}
+        self.cuts = None
+        self.rows = 0
+        self.passes = 0
+
+    def _chunks(self, path):
+        self.passes += 1
+        return _read_chunks(path, self.chunk_size)
+
+    def _fill_and_encode(self, chunk):
+        chunk = chunk.fillna(self.modes)
+        for col in CATEGORICAL_COLUMNS:
+            chunk[col] = self.encoders[col].transform(chunk[col])
+        return chunk
+
+    def _keep(self, chunk, columns):
+        keep = np.ones(len(chunk), dtype=bool)
+        for col in columns:
+            lower, upper = self.fences[col]
+            values = chunk[col].to_numpy(dtype=np.float64)
+            keep &= (values >= lower) & (values <= upper)
+        return keep
+
+    def fit(self, path):
+        counts = {col: FrequentItems() for col in COLUMNS}
+        vocabularies = {col: set() for col in CATEGORICAL_COLUMNS}
+        salary = KLLSketch(self.sketch_k)
+        missing = {col: 0 for col in COLUMNS}
+        self.rows = 0
+        for chunk in self._chunks(path):
+            self.rows += len(chunk)
+            for col in COLUMNS:
+                values = chunk[col].dropna()
+                missing[col] += len(chunk) - len(values)
+                counts[col].update(values.to_numpy())
+                if col in vocabularies:
+                    vocabularies[col].update(values.unique())
+            salary.update(chunk[TARGET_COLUMN].to_numpy(dtype=np.float64))
+
+        self.modes = {col: counts[col].mode() for col in COLUMNS}
+        for col in CATEGORICAL_COLUMNS:
+            # Missing values are filled with the mode, so it is also the fill
+            # for unseen labels
+            self.encoders[col] = CategoryEncoder(sorted(vocabularies[col]), self.modes[col])
+        # Missing salaries are filled with the mode before the notebook filters
+        salary.update_repeated(self.modes[TARGET_COLUMN], missing[TARGET_COLUMN])
+        self.fences = {TARGET_COLUMN: _fence(salary, self.iqr_factor)}
+
+        for i, col in enumerate(FILTER_COLUMNS[1:], start=1):
+            sketch = KLLSketch(self.sketch_k)
+            for chunk in self._chunks(path):
+                chunk = self._fill_and_encode(chunk)
+                sketch.update(chunk[col].to_numpy(dtype=np.float64)[self._keep(chunk, FILTER_COLUMNS[:i])])
+            self.fences[col] = _fence(sketch, self.iqr_factor)
+
+        sketch = KLLSketch(self.sketch_k)
+        for chunk in self._chunks(path):
+            chunk = self._fill_and_encode(chunk)
+            sketch.update(chunk[TARGET_COLUMN].to_numpy(dtype=np.float64)[self._keep(chunk, FILTER_COLUMNS)])
+        self.cuts = sketch.quantiles([1 / 3, 2 / 3])
+        return self
+
+    def transform_chunk(self, chunk):
+        # Fill, encode and filter one raw chunk; adds Salary_Class codes
+        # (0 = Low, 1 = Medium, 2 = High, as pd.qcut labels them)
+        chunk = self._fill_and_encode(chunk)
+        chunk = chunk[self._keep(chunk, FILTER_COLUMNS)].copy()
+        chunk["Salary_Class"] = np.searchsorted(self.cuts, chunk[TARGET_COLUMN].to_numpy(), side="left").astype(np.int8)
+        return chunk
+
+    def iter_transformed(self, path):
+        for chunk in self._chunks(path):
+            yield self.transform_chunk(chunk)
+
+    def write(self, path, destination):
+        # Second stage: stream training-ready rows to `destination`
+        rows = 0
+        header = True
+        for chunk in self.iter_transformed(path):
+            chunk.to_csv(destination, mode="w" if header else "a", header=header, index=False)
+            header = False
+            rows += len(chunk)
+        return rows
+
+    def boundaries(self):
+        result = {f"{col} fence": fence for col, fence in self.fences.items()}
+        result["Salary terciles"] = tuple(self.cuts)
+        return result
+
+
+def load_prepared(path):
+    # Read rows written by StreamingPreprocessor.write() into the shape
+    # training.preprocess returns
+    df = pd.read_csv(path)
+    labels = [LEVEL_LABELS[i] for i in sorted(LEVEL_LABELS)]
+    df["Salary_Class"] = pd.Categorical.from_codes(df["Salary_Class"], labels, ordered=True)
+    return df
+
+
+def exact_boundaries(path):
+    # The same boundaries computed in memory, the way the notebook does
+    df = pd.read_csv(path, usecols=COLUMNS)
+    df = df.fillna(df.mode().iloc[0])
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = LabelEncoder().fit_transform(df[col])
+
+    result = {}
+    for col in FILTER_COLUMNS:
+        q1, q3 = df[col].quantile(0.25), df[col].quantile(0.75)
+        lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        result[f"{col} fence"] = (lower, upper)
+        df = df[(df[col] >= lower) & (df[col] <= upper)]
+    _, edges = pd.qcut(df[TARGET_COLUMN], q=3, retbins=True)
+    result["Salary terciles"] = (edges[1], edges[2])
+    return result, df
+
+
+def compare_boundaries(path, chunk_size=DEFAULT_CHUNK_SIZE, sketch_k=DEFAULT_SKETCH_K):
+    # Fit both ways on a file that fits in memory. Returns a table of
+    # approximate vs exact boundaries and the share of rows whose
+    # keep/drop decision or salary class differs.
+    preprocessor = StreamingPreprocessor(chunk_size, sketch_k).fit(path)
+    exact, exact_df = exact_boundaries(path)
+
+    rows = []
+    for name, approx_values in preprocessor.boundaries().items():
+        for side, approx, true in zip(("lower", "upper"), approx_values, exact[name]):
+            scale = max(abs(true), 1e-12)
+            rows.append({"Boundary": name, "Side": side, "Exact": true, "Approx": approx,
+                         "Abs Error": abs(approx - true), "Rel Error": abs(approx - true) / scale})
+    table = pd.DataFrame(rows)
+
+    approx_df = pd.concat(preprocessor.iter_transformed(path))
+    kept = approx_df.index.union(exact_df.index)
+    in_both = approx_df.index.intersection(exact_df.index)
+    exact_codes = pd.qcut(exact_df[TARGET_COLUMN], q=3, labels=False)
+    agreement = {
+        "rows": preprocessor.rows,
+        "kept_exact": len(exact_df),
+        "kept_approx": len(approx_df),
+        "keep_mismatch": (len(kept) - len(in_both)) / max(preprocessor.rows, 1),
+        "class_mismatch": float((approx_df.loc[in_both, "Salary_Class"] != exact_codes.loc[in_both]).mean()) if len(in_both) else 0.0,
+    }
+    return table, agreement
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunked, out-of-core preprocessing for the salary dataset.")
+    parser.add_argument("input", help="Raw CSV shaped like salary_data.csv")
+    parser.add_argument("output", nargs="?", help="Where to write the training-ready CSV")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--sketch-k", type=int, default=DEFAULT_SKETCH_K, help="KLL accuracy parameter")
+    parser.add_argument("--compare", action="store_true",
+                        help="Also compute exact boundaries in memory and report the error")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.compare:
+        table, agreement = compare_boundaries(args.input, args.chunk_size, args.sketch_k)
+        with pd.option_context("display.width", 200, "display.float_format", "{:,.4f}".format):
+            print(table.to_string(index=False))
+        print(f"\nRows: {agreement['rows']:,}  kept exact: {agreement['kept_exact']:,}  "
+              f"kept approx: {agreement['kept_approx']:,}")
+        print(f"Keep/drop mismatch: {agreement['keep_mismatch']:.4%}  "
+              f"class mismatch: {agreement['class_mismatch']:.4%}")
+
+    if args.output:
+        preprocessor = StreamingPreprocessor(args.chunk_size, args.sketch_k).fit(args.input)
+        rows = preprocessor.write(args.input, args.output)
+        for name, (lower, upper) in preprocessor.boundaries().items():
+            print(f"{name:<32} {lower:>14,.2f} {upper:>14,.2f}")
+        print(f"✅ Wrote {rows:,} of {preprocessor.rows:,} rows in {preprocessor.passes} passes "
+              f"({time.perf_counter() - start:.1f}s) -> {args.output}")
+    elif not args.compare:
+        parser.error("give an output path, --compare, or both")
+
+
+if __name__ == "__main__":
+    main()
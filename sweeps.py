@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from artifacts import CATEGORICAL_COLUMNS, FEATURE_COLUMNS
+from prediction_grid import AGE_RANGE, EXPERIENCE_RANGE
+
+# Numeric inputs sweep the app's slider ranges; categorical inputs sweep
+# every label the encoders know
+NUMERIC_RANGES = {"Age": AGE_RANGE, "Years of Experience": EXPERIENCE_RANGE}
+SWEEPABLE = ["Years of Experience", "Age", "Job Title", "Education Level", "Gender"]
+
+
+def sweep_values(pipeline, feature):
+    if feature in NUMERIC_RANGES:
+        low, high = NUMERIC_RANGES[feature]
+        return np.arange(low, high + 1)
+    return np.array(pipeline.categories[feature], dtype=object)
+
+
+def sweep(pipeline, profile, features):
+    # Score `profile` (feature name -> raw value) with one or two features
+    # varied over their whole range. Every combination goes through a single
+    # encode/scale/predict pass. Returns a long DataFrame with one column per
+    # varied feature and a "Predicted Salary" column.
+    if not 1 <= len(features) <= 2 or len(set(features)) != len(features):
+        raise ValueError("Sweep one or two different features")
+
+    fixed = {col: [profile.get(col)] for col in FEATURE_COLUMNS if col not in features}
+    # Encoders with a fill code would score an unknown label as the most
+    # common one and quietly sweep a different profile, so check up front
+    unknown = pipeline.unknown_inputs({col: fixed[col][0] for col in CATEGORICAL_COLUMNS if col in fixed})
+    if unknown:
+        raise ValueError(f"Unknown value for {', '.join(unknown)}")
+    # Swept columns get a placeholder here and are overwritten below
+    placeholders = {col: [pipeline.categories[col][0] if col in CATEGORICAL_COLUMNS else 0] for col in features}
+    base, valid = pipeline.encode({**fixed, **placeholders})
+    if not valid[0]:
+        missing = [col for col in fixed if col not in CATEGORICAL_COLUMNS and pd.isna(fixed[col][0])]
+        raise ValueError(f"Missing value for {', '.join(missing) or 'a fixed input'}")
+
+    values = [sweep_values(pipeline, feature) for feature in features]
+    positions = np.meshgrid(*[np.arange(len(v)) for v in values], indexing="ij")
+    positions = [p.ravel() for p in positions]
+
+    X = np.repeat(base, len(positions[0]), axis=0)
+    for feature, v, pos in zip(features, values, positions):
+        # Category codes are positions in the category list
+        X[:, FEATURE_COLUMNS.index(feature)] = pos if feature in CATEGORICAL_COLUMNS else v[pos]
+    salary = pipeline.predict_salary(pipeline.scale_features(X))
+
+    result = {feature: v[pos] for feature, v, pos in zip(features, values, positions)}
+    result["Predicted Salary"] = salary
+    return pd.DataFrame(result)
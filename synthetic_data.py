@@ -0,0 +1,74 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+SOURCE_FILE = "salary_data.csv"
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+class SyntheticSalaryData:
+    # Generates rows shaped like salary_data.csv. Rows are resampled from the
+    # source, so the joint distribution of the categories and numbers is kept.
+    # Then age moves by up to one year (experience moves with it, so the
+    # career start age stays the same) and salary gets a small multiplicative
+    # jitter. The share of all-empty rows matches the source.
+
+    def __init__(self, source=SOURCE_FILE, age_jitter=1, salary_jitter=0.05):
+        df = pd.read_csv(source)
+        empty = df.isna().all(axis=1)
+        self.columns = list(df.columns)
+        self.rows = df[~empty].dropna().reset_index(drop=True)
+        self.missing_rate = float(empty.mean())
+        self.age_jitter = age_jitter
+        self.salary_jitter = salary_jitter
+        self.age_bounds = (self.rows["Age"].min(), self.rows["Age"].max())
+
+    def sample(self, n_rows, rng):
+        picks = rng.integers(0, len(self.rows), size=n_rows)
+        df = self.rows.iloc[picks].reset_index(drop=True)
+
+        shift = rng.integers(-self.age_jitter, self.age_jitter + 1, size=n_rows)
+        age = np.clip(df["Age"].to_numpy() + shift, *self.age_bounds)
+        shift = age - df["Age"].to_numpy()
+        df["Age"] = age
+        df["Years of Experience"] = np.maximum(df["Years of Experience"].to_numpy() + shift, 0)
+        salary = df["Salary"].to_numpy() * rng.lognormal(0.0, self.salary_jitter, size=n_rows)
+        df["Salary"] = np.round(salary, -2)
+
+        if self.missing_rate:
+            df.loc[rng.random(n_rows) < self.missing_rate, :] = np.nan
+        return df[self.columns]
+
+    def generate(self, n_rows, seed=0):
+        return self.sample(n_rows, np.random.default_rng(seed))
+
+    def iter_chunks(self, n_rows, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+        rng = np.random.default_rng(seed)
+        for start in range(0, n_rows, chunk_size):
+            yield self.sample(min(chunk_size, n_rows - start), rng)
+
+    def write_csv(self, path, n_rows, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+        # Streams chunks to disk, so any size can be written in bounded memory
+        header = True
+        for chunk in self.iter_chunks(n_rows, seed, chunk_size):
+            chunk.to_csv(path, mode="w" if header else "a", header=header, index=False)
+            header = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic dataset shaped like salary_data.csv.")
+    parser.add_argument("rows", type=int, help="Number of rows to generate")
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", default=SOURCE_FILE, help="Dataset whose distribution is reproduced")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    SyntheticSalaryData(args.source).write_csv(args.output, args.rows, seed=args.seed)
+    print(f"✅ Wrote {args.rows:,} rows in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import (GradientBoostingClassifier, GradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.metrics import (accuracy_score, f1_score, mean_absolute_error, mean_squared_error,
+                             precision_score, r2_score, recall_score)
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier, KNeighborsRegressor
+from sklearn.preprocessing import RobustScaler
+from sklearn.svm import SVC, SVR
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from artifacts import (CATEGORICAL_COLUMNS, CLASSIFIER_FILE, ENCODERS_FILE, FEATURE_COLUMNS, LEVEL_LABELS,
+                       LEVELS_FILE, REGRESSOR_FILE, SCALER_FILE, TARGET_COLUMN, load_artifacts, load_level_cuts)
+from encoding import CategoryEncoder, as_label_encoder
+
+DATA_FILE = "salary_data.csv"
+RESULTS_FILE = "training_results.csv"
+TUNING_FILE = "tuning_results.csv"
+# Outlier fences sit this many IQRs outside the quartiles
+IQR_FACTOR = 1.5
+
+# Candidate models from the notebook, as (class, params) so they can be
+# shipped to worker processes
+REGRESSORS = {
+    "Linear Regression": (LinearRegression, {}),
+    "Random Forest Regressor": (RandomForestRegressor, {}),
+    "Gradient Boosting Regressor": (GradientBoostingRegressor, {}),
+    "SVR": (SVR, {}),
+    "Decision Tree Regressor": (DecisionTreeRegressor, {}),
+    "KNN Regressor": (KNeighborsRegressor, {}),
+}
+
+CLASSIFIERS = {
+    "Logistic Regression": (LogisticRegression, {"max_iter": 1000}),
+    "Random Forest": (RandomForestClassifier, {}),
+    "Gradient Boosting": (GradientBoostingClassifier, {}),
+    "SVC": (SVC, {"probability": True}),
+    "Decision Tree": (DecisionTreeClassifier, {}),
+    "KNN": (KNeighborsClassifier, {}),
+    "Naive Bayes": (GaussianNB, {}),
+}
+
+
+def remove_outliers(df, cols, factor=IQR_FACTOR):
+    for col in cols:
+        Q1 = df[col].quantile(0.25)
+        Q3 = df[col].quantile(0.75)
+        IQR = Q3 - Q1
+        lower = Q1 - factor * IQR
+        upper = Q3 + factor * IQR
+        df = df[(df[col] >= lower) & (df[col] <= upper)]
+    return df
+
+
+def preprocess(df, iqr_factor=IQR_FACTOR):
+    # The notebook's cleaning steps. Returns the cleaned frame (with a
+    # Salary_Class column) and the fitted label encoders.
+    df = df.copy()
+    df.fillna(df.mode().iloc[0], inplace=True)
+
+    label_encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        encoder = CategoryEncoder()
+        df[col] = encoder.fit_transform(df[col])
+        label_encoders[col] = encoder
+
+    df = remove_outliers(df, [TARGET_COLUMN], iqr_factor)
+    df = remove_outliers(df, FEATURE_COLUMNS, iqr_factor)
+
+    # Class codes follow LEVEL_LABELS (0 = Low, 1 = Medium, 2 = High), the
+    # order the app decodes them in
+    df["Salary_Class"] = pd.qcut(df[TARGET_COLUMN], q=3, labels=[LEVEL_LABELS[i] for i in sorted(LEVEL_LABELS)])
+    return df, label_encoders
+
+
+def level_cuts(salary):
+    # The Salary values between Low/Medium and Medium/High, as pd.qcut bins
+    # them; saved with the models so levels can be derived from the regressor
+    _, edges = pd.qcut(salary, q=3, retbins=True)
+    return [float(edges[1]), float(edges[2])]
+
+
+def prepare_data(df, test_size=0.3, random_state=42):
+    X = df[FEATURE_COLUMNS]
+    y_reg = df[TARGET_COLUMN].to_numpy()
+    y_cls = df["Salary_Class"].cat.codes.to_numpy()
+
+    scaler = RobustScaler()
+    X_scaled = scaler.fit_transform(X)
+    return split_data(X_scaled, y_reg, y_cls, test_size, random_state), scaler
+
+
+def split_data(X_scaled, y_reg, y_cls, test_size=0.3, random_state=42):
+    X_train_r, X_test_r, y_train_r, y_test_r = train_test_split(X_scaled, y_reg, test_size=test_size, random_state=random_state)
+    X_train_c, X_test_c, y_train_c, y_test_c = train_test_split(X_scaled, y_cls, test_size=test_size, random_state=random_state)
+    data = {
+        "regression": (X_train_r, X_test_r, y_train_r, y_test_r, X_scaled, y_reg),
+        "classification": (X_train_c, X_test_c, y_train_c, y_test_c, X_scaled, y_cls),
+    }
+    return data
+
+
+# Set in each worker by the pool initializer, so the arrays are sent once per
+# process rather than once per task
+_WORKER_DATA = None
+
+
+def _init_worker(data):
+    global _WORKER_DATA
+    _WORKER_DATA = data
+
+
+def regression_metrics(y_true, y_pred):
+    mse = mean_squared_error(y_true, y_pred)
+    return {"MAE": mean_absolute_error(y_true, y_pred), "MSE": mse, "RMSE": np.sqrt(mse),
+            "R2 Score": r2_score(y_true, y_pred)}
+
+
+def classification_metrics(model, X_test, y_true, y_pred):
+    if hasattr(model, "predict_proba"):
+        confidence = np.mean(np.max(model.predict_proba(X_test), axis=1))
+    else:
+        confidence = np.mean(np.abs(model.decision_function(X_test)))
+    return {
+        "Accuracy": accuracy_score(y_true, y_pred),
+        "Precision": precision_score(y_true, y_pred, average="weighted", zero_division=0),
+        "Recall": recall_score(y_true, y_pred, average="weighted", zero_division=0),
+        "F1 Score": f1_score(y_true, y_pred, average="weighted", zero_division=0),
+        "Confidence Score": confidence,
+    }
+
+
+def fit_candidate(task, name, estimator_class, params):
+    # Fit and score one model on the holdout split (runs in a worker process)
+    X_train, X_test, y_train, y_test, _, _ = _WORKER_DATA[task]
+    start = time.perf_counter()
+    model = estimator_class(**params).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    y_pred = model.predict(X_test)
+    if task == "regression":
+        scores = regression_metrics(y_test, y_pred)
+    else:
+        scores = classification_metrics(model, X_test, y_test, y_pred)
+
+    # Wall Seconds adds predicting and scoring the holdout split to the fit
+    result = {"Task": task, "Model": name, **scores, "Fit Seconds": fit_seconds,
+              "Wall Seconds": time.perf_counter() - start}
+    return result, model, y_pred
+
+
+def train_all(data, regressors=REGRESSORS, classifiers=CLASSIFIERS, jobs=None, cv=5):
+    # Fit every candidate across a process pool. Returns the results table and
+    # the fitted models / test predictions keyed by (task, name). CV scores
+    # come from the evaluation engine, which reuses cached folds for models
+    # and data that haven't changed.
+    tasks = [("regression", name, cls, params) for name, (cls, params) in regressors.items()]
+    tasks += [("classification", name, cls, params) for name, (cls, params) in classifiers.items()]
+
+    results, models, predictions = [], {}, {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(data,)) as pool:
+        futures = [pool.submit(fit_candidate, task, name, cls, params) for task, name, cls, params in tasks]
+        for (task, name, _, _), future in zip(tasks, futures):
+            result, model, y_pred = future.result()
+            results.append(result)
+            models[task, name] = model
+            predictions[task, name] = y_pred
+
+    table = pd.DataFrame(results)
+    if cv:
+        from evaluation import evaluate
+
+        cv_tables = evaluate({task: data[task][4:] for task in ("regression", "classification")},
+                             regressors, classifiers, n_folds=cv, n_resamples=0, jobs=jobs)
+        cv_columns = pd.concat([t.filter(regex="^(Task|Model|CV )") for t in cv_tables.values()])
+        table = table.merge(cv_columns, on=["Task", "Model"], how="left")
+    timing = ["Fit Seconds", "Wall Seconds"]
+    table = table[[col for col in table.columns if col not in timing] + timing]
+    regression_df = table[table["Task"] == "regression"].dropna(axis=1, how="all").sort_values("R2 Score", ascending=False)
+    classification_df = table[table["Task"] == "classification"].dropna(axis=1, how="all").sort_values("Accuracy", ascending=False)
+    return regression_df, classification_df, models, predictions
+
+
+def atomic_dump(obj, path):
+    # Write next to the target and rename, so readers never see a partial file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def save_artifacts(output_dir, regressor, classifier, scaler, encoders, cuts=None):
+    os.makedirs(output_dir, exist_ok=True)
+    # Encoders are stored as plain LabelEncoders, readable by the notebook
+    encoders = {col: as_label_encoder(encoder) for col, encoder in encoders.items()}
+    for obj, name in [(regressor, REGRESSOR_FILE), (classifier, CLASSIFIER_FILE),
+                      (scaler, SCALER_FILE), (encoders, ENCODERS_FILE)]:
+        atomic_dump(obj, os.path.join(output_dir, name))
+    if cuts is not None:
+        save_level_cuts(output_dir, cuts)
+
+
+def save_level_cuts(output_dir, cuts, class_levels=None):
+    # `class_levels` gives the level of each of the saved classifier's
+    # classes, for classifiers that don't number them as LEVEL_LABELS does
+    # (training.py's own do); see artifacts.load_artifacts
+    levels = {"cuts": [float(cut) for cut in cuts]}
+    if class_levels is not None:
+        levels["class_levels"] = [int(level) for level in class_levels]
+    path = os.path.join(output_dir, LEVELS_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(levels, f)
+    os.replace(path + ".tmp", path)
+
+
+def save_drift_baseline(output_dir, data, encoders, columns):
+    # Input and prediction distributions of the saved models on their training
+    # rows, for drift.DriftMonitor. `columns` holds the cleaned rows with
+    # categoricals as encoder codes.
+    from drift import build_baseline, raw_columns, save_baseline
+    from inference import InferencePipeline
+
+    pipeline = InferencePipeline.from_artifacts(*load_artifacts(output_dir), level_cuts=load_level_cuts(output_dir))
+    salary, level, _ = pipeline.predict(np.ascontiguousarray(data["regression"][4]))
+    save_baseline(output_dir, build_baseline(raw_columns(columns, encoders), salary, level))
+
+
+def save_plots(plot_dir, data, regression_df, classification_df, predictions):
+    # Same figures as the notebook, written to files instead of shown
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import ConfusionMatrixDisplay
+
+    os.makedirs(plot_dir, exist_ok=True)
+    y_test_r = data["regression"][3]
+    y_test_c = data["classification"][3]
+    for name in regression_df["Model"]:
+        fig, ax = plt.subplots(figsize=(5, 4))
+        ax.scatter(y_test_r, predictions["regression", name], s=10)
+        ax.set(xlabel="Actual Salary", ylabel="Predicted Salary", title=f"Regression - {name}")
+        fig.tight_layout()
+        fig.savefig(os.path.join(plot_dir, f"regression_{name.replace(' ', '_')}.png"))
+        plt.close(fig)
+    for name in classification_df["Model"]:
+        fig, ax = plt.subplots(figsize=(5, 4))
+        ConfusionMatrixDisplay.from_predictions(y_test_c, predictions["classification", name], ax=ax, cmap="Blues")
+        ax.set_title(f"Confusion Matrix - {name}")
+        fig.tight_layout()
+        fig.savefig(os.path.join(plot_dir, f"confusion_{name.replace(' ', '_')}.png"))
+        plt.close(fig)
+
+
+def streaming_preprocess(data_path, iqr_factor=IQR_FACTOR):
+    # Out-of-core alternative to preprocess(): boundaries come from sketches
+    # and only the encoded, filtered rows are loaded
+    from streaming_preprocess import StreamingPreprocessor, load_prepared
+
+    preprocessor = StreamingPreprocessor(iqr_factor=iqr_factor).fit(data_path)
+    fd, prepared_path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        preprocessor.write(data_path, prepared_path)
+        df = load_prepared(prepared_path)
+    finally:
+        os.remove(prepared_path)
+    return df, preprocessor.encoders
+
+
+def run_training(data_path=DATA_FILE, output_dir=".", jobs=None, cv=5, plot_dir=None, streaming=False,
+                 use_cache=True, tune_budget=None):
+    start = time.perf_counter()
+    if use_cache:
+        from data_cache import open_dataset
+
+        dataset = open_dataset(data_path, streaming=streaming)
+        data = split_data(dataset.X_scaled, dataset.salary, dataset.salary_class)
+        scaler, encoders, rows = dataset.scaler, dataset.encoders, dataset.rows
+        cuts = dataset.level_cuts
+    else:
+        if streaming:
+            df, encoders = streaming_preprocess(data_path)
+        else:
+            df, encoders = preprocess(pd.read_csv(data_path))
+        data, scaler = prepare_data(df)
+        rows = len(df)
+        cuts = level_cuts(df[TARGET_COLUMN])
+    regressors, classifiers, tuning_df = REGRESSORS, CLASSIFIERS, None
+    if tune_budget:
+        # Every family competes with its best params from the search
+        from tuning import tune
+
+        # On the training split only, so the test split stays unseen until
+        # the tuned models are scored on it
+        tuning_df, tuned = tune({task: (data[task][0], data[task][2]) for task in ("regression", "classification")},
+                                budget=tune_budget, n_folds=cv or 5, jobs=jobs)
+        regressors, classifiers = tuned["regression"], tuned["classification"]
+        tuning_path = os.path.join(output_dir, TUNING_FILE)
+        tuning_df.to_csv(tuning_path + ".tmp", index=False)
+        os.replace(tuning_path + ".tmp", tuning_path)
+    regression_df, classification_df, models, predictions = train_all(data, regressors, classifiers, jobs=jobs, cv=cv)
+
+    best_reg_name = regression_df.iloc[0]["Model"]
+    best_cls_name = classification_df.iloc[0]["Model"]
+    save_artifacts(output_dir, models["regression", best_reg_name], models["classification", best_cls_name],
+                   scaler, encoders, cuts)
+    save_drift_baseline(output_dir, data, encoders, dataset.columns if use_cache else df)
+
+    results = pd.concat([regression_df, classification_df], ignore_index=True)
+    results_path = os.path.join(output_dir, RESULTS_FILE)
+    results.to_csv(results_path + ".tmp", index=False)
+    os.replace(results_path + ".tmp", results_path)
+
+    if plot_dir:
+        save_plots(plot_dir, data, regression_df, classification_df, predictions)
+    return {
+        "regression": regression_df,
+        "classification": classification_df,
+        "best_regressor": best_reg_name,
+        "best_classifier": best_cls_name,
+        "tuning": tuning_df,
+        "rows": rows,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train, compare and save the salary models headlessly.")
+    parser.add_argument("--data", default=DATA_FILE, help=f"Training CSV (default: {DATA_FILE})")
+    parser.add_argument("--output-dir", default=".", help="Where to write the .pkl artifacts and results table")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--cv", type=int, default=5, help="Cross-validation folds, 0 to skip (default: 5)")
+    parser.add_argument("--plots", metavar="DIR", help="Also save the notebook's plots as PNGs in DIR")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Preprocess out of core with streaming sketches (for CSVs larger than memory)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse the CSV instead of using the data cache")
+    parser.add_argument("--tune", type=float, metavar="SECONDS",
+                        help="First tune every model family with successive halving for this long")
+    args = parser.parse_args(argv)
+
+    summary = run_training(args.data, args.output_dir, args.jobs, args.cv, args.plots, args.streaming,
+                           use_cache=not args.no_cache, tune_budget=args.tune)
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print("\n🔷 Regression Results")
+        print(summary["regression"].drop(columns="Task").to_string(index=False))
+        print("\n🔷 Classification Results")
+        print(summary["classification"].drop(columns="Task").to_string(index=False))
+    if summary["tuning"] is not None:
+        tuned = summary["tuning"]
+        print(f"\nTuned {len(tuned)} families in {tuned.attrs['seconds']:.1f}s "
+              f"({int(tuned['Full Data'].sum())} reached the full data), see {TUNING_FILE}")
+    print(f"\n✅ Best Regressor Saved: {summary['best_regressor']}")
+    print(f"✅ Best Classifier Saved: {summary['best_classifier']}")
+    print(f"Trained on {summary['rows']:,} rows in {summary['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import json
+import math
+import os
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from scipy.stats import loguniform, randint
+from sklearn.model_selection import ParameterSampler
+
+from evaluation import (CACHE_DIR, CV_SCORING, DEFAULT_FOLDS, _cache_path, _init_worker, _load_cached, _save_cached,
+                        load_folds, model_fingerprint, predict_fold, save_folds, summarize)
+from training import CLASSIFIERS, DATA_FILE, REGRESSORS, split_data
+
+DEFAULT_BUDGET = 120.0
+DEFAULT_CANDIDATES = 27
+# Each rung keeps the best 1/ETA of its candidates and gives them ETA times
+# the training rows
+ETA = 3
+# Smallest training subset a candidate is scored on
+MIN_ROWS = 30
+
+# Hyperparameters sampled per candidate family, on top of the family's
+# params in training.py (whose defaults are always one of the candidates)
+_FOREST = {"n_estimators": [50, 100, 200, 400], "max_depth": [None, 4, 8, 16],
+           "min_samples_leaf": [1, 2, 4, 8], "max_features": [1.0, 0.6, "sqrt"]}
+_BOOSTING = {"n_estimators": [50, 100, 200, 400], "learning_rate": loguniform(0.01, 0.5),
+             "max_depth": [2, 3, 4, 5], "subsample": [1.0, 0.8, 0.6]}
+_TREE = {"max_depth": [None, 3, 5, 8, 12], "min_samples_leaf": [1, 2, 4, 8, 16]}
+_NEIGHBOURS = {"n_neighbors": randint(1, 31), "weights": ["uniform", "distance"], "p": [1, 2]}
+SEARCH_SPACES = {
+    "Linear Regression": {"fit_intercept": [True, False], "positive": [False, True]},
+    "Random Forest Regressor": _FOREST,
+    "Gradient Boosting Regressor": _BOOSTING,
+    # Salaries are in the tens of thousands, far from SVR's default scale
+    "SVR": {"C": loguniform(1e2, 1e7), "epsilon": loguniform(1e1, 1e4), "gamma": ["scale", 0.03, 0.1, 0.3, 1.0]},
+    "Decision Tree Regressor": _TREE,
+    "KNN Regressor": _NEIGHBOURS,
+    "Logistic Regression": {"C": loguniform(1e-3, 1e3)},
+    "Random Forest": _FOREST,
+    "Gradient Boosting": _BOOSTING,
+    "SVC": {"C": loguniform(1e-1, 1e3), "gamma": ["scale", 0.03, 0.1, 0.3, 1.0]},
+    "Decision Tree": _TREE,
+    "KNN": _NEIGHBOURS,
+    "Naive Bayes": {"var_smoothing": loguniform(1e-12, 1e-3)},
+}
+
+
+def sample_candidates(params, space, n_candidates, seed=0):
+    # The family's own params first, then up to n_candidates - 1 distinct
+    # samples from its search space
+    candidates = [dict(params)]
+    if space:
+        with warnings.catch_warnings():
+            # Small grids are returned whole instead of sampled
+            warnings.simplefilter("ignore", UserWarning)
+            for sampled in ParameterSampler(space, n_iter=max(n_candidates - 1, 0), random_state=seed):
+                candidate = {**params, **{k: v.item() if isinstance(v, np.generic) else v for k, v in sampled.items()}}
+                if candidate not in candidates:
+                    candidates.append(candidate)
+    return candidates[:n_candidates]
+
+
+def rung_rows(train_rows, n_candidates, eta=ETA, min_rows=MIN_ROWS):
+    # Training rows per rung, the last one being the full training folds
+    # (None). Sized so the candidates are whittled down to about eta by the
+    # time they reach the full data.
+    n_rungs = max(1, int(math.log(max(n_candidates, 1), eta) + 1e-9))
+    rows = max(min_rows, train_rows // eta ** (n_rungs - 1))
+    rungs = []
+    while len(rungs) < n_rungs - 1 and rows < train_rows:
+        rungs.append(rows)
+        rows *= eta
+    return rungs + [None]
+
+
+class _Family:
+    # Successive-halving state of one candidate family: the configurations
+    # still in the race, the rung they're on, their (candidate, fold) fits
+    # waiting for a worker and the out-of-fold predictions collected so far
+
+    def __init__(self, task, name, estimator_class, candidates, rungs, eta):
+        self.task, self.name, self.estimator_class = task, name, estimator_class
+        self.candidates = candidates
+        self.rungs, self.eta = rungs, eta
+        self.rung = 0
+        # Bumped whenever a rung starts, so fits from an earlier one are told apart
+        self.round = 0
+        self.queue = []
+        self.pending = {}
+        self.scores = {}
+        self.best = None
+        self.tried = len(candidates)
+        self.fits = 0
+        self.seconds = 0.0
+        self.done = False
+
+    @property
+    def train_rows(self):
+        return self.rungs[self.rung]
+
+    def drop(self, index):
+        # Forget a candidate's queued fits (its rung is lost)
+        self.queue = [(i, fold) for i, fold in self.queue if i != index]
+        self.pending.pop(index, None)
+        self.scores[index] = -np.inf
+
+    def finish_rung(self):
+        # Keep the best 1/eta; moves to the next rung or finishes the family
+        ranked = sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+        index, score = ranked[0]
+        self.best = (self.candidates[index], score, self.train_rows)
+        if self.train_rows is None or not np.isfinite(score):
+            self.done = True
+            return
+        keep = max(1, math.ceil(len(ranked) / self.eta))
+        self.candidates = [self.candidates[i] for i, s in ranked[:keep] if np.isfinite(s)]
+        # With one candidate left, go straight to the full data
+        self.rung = len(self.rungs) - 1 if len(self.candidates) == 1 else self.rung + 1
+        self.scores = {}
+
+
+def tune(data, regressors=REGRESSORS, classifiers=CLASSIFIERS, spaces=SEARCH_SPACES, budget=DEFAULT_BUDGET,
+         n_candidates=DEFAULT_CANDIDATES, eta=ETA, min_rows=MIN_ROWS, n_folds=DEFAULT_FOLDS, jobs=None,
+         cache_dir=CACHE_DIR, seed=0):
+    # Successive halving over every candidate family at once. Each family
+    # samples n_candidates configurations, scores them by cross-validation
+    # on a small subset of each training fold, keeps the best 1/eta and
+    # repeats with eta times the rows until the survivors are scored on the
+    # full folds. Families race independently in one process pool that
+    # memory-maps the folds from the cache: a family's next rung is queued
+    # as soon as its last one finishes, and the next free worker goes to the
+    # family that has used the least fit time, so cheap families finish
+    # early and the rest share what's left. Every rung's out-of-fold
+    # predictions are cached like evaluate()'s (full-data ones under the
+    # same key, so evaluate() and training reuse them). No new fits start
+    # after `budget` seconds; a family that didn't reach the full data
+    # reports its best on the largest subset it finished. Returns the
+    # results table and, per task, the candidates dict for train_all(), with
+    # the best params of each family that reached the full data.
+    start = time.perf_counter()
+    deadline = start + budget
+    families, fold_dirs, labels = [], {}, {}
+    for task, candidates in (("regression", regressors), ("classification", classifiers)):
+        if task not in data:
+            continue
+        X, y = np.ascontiguousarray(data[task][0]), np.ascontiguousarray(data[task][1])
+        fold_dirs[task], data_key = save_folds(cache_dir, task, X, y, n_folds)
+        folds = np.asarray(load_folds(fold_dirs[task])[2])
+        labels[task] = (y, folds, data_key)
+        train_rows = int(min((folds != fold).sum() for fold in range(n_folds)))
+        for name, (cls, params) in candidates.items():
+            sampled = sample_candidates(params, spaces.get(name), n_candidates, seed)
+            families.append(_Family(task, name, cls, sampled, rung_rows(train_rows, len(sampled), eta, min_rows), eta))
+
+    def cache_path(family, candidate):
+        data_key = labels[family.task][2]
+        rows = family.train_rows
+        key = data_key if rows is None else f"{data_key}:rows={rows}"
+        return _cache_path(cache_dir, model_fingerprint(family.estimator_class, candidate), key, n_folds)
+
+    def score(family, result):
+        y = labels[family.task][0]
+        return summarize(family.task, y, result, n_resamples=0)[f"CV {CV_SCORING[family.task][0]} Mean"]
+
+    def start_rung(family):
+        # Cached candidates are scored right away; the rest are queued
+        while not family.done:
+            family.round += 1
+            y, folds, _ = labels[family.task]
+            for index, candidate in enumerate(family.candidates):
+                cached = _load_cached(cache_path(family, candidate))
+                if cached is not None:
+                    family.scores[index] = score(family, cached)
+                    continue
+                family.pending[index] = {"prediction": np.full(len(y), np.nan), "fold": folds,
+                                         "confidence": np.full(len(y), np.nan), "fit_seconds": np.zeros(n_folds)}
+                family.queue += [(index, fold) for fold in range(n_folds)]
+            if family.queue:
+                return
+            family.finish_rung()
+
+    def collect(family, round, index, fold, future):
+        # Adds one finished fit; returns True when it completed the rung
+        try:
+            rows, predicted, confidence, seconds = future.result()
+        except Exception:
+            if round != family.round or index not in family.pending:
+                return False
+            # Invalid combinations (and failed fits) are out of the race
+            family.drop(index)
+            return not family.pending
+        family.seconds += seconds
+        result = family.pending.get(index) if round == family.round else None
+        if result is None:
+            return False
+        result["prediction"][rows] = predicted
+        if confidence is not None:
+            result["confidence"][rows] = confidence
+        result["fit_seconds"][fold] = seconds
+        if np.isnan(result["prediction"]).any():
+            return False
+        del family.pending[index]
+        _save_cached(cache_path(family, family.candidates[index]), result)
+        family.scores[index] = score(family, result)
+        return not family.pending
+
+    workers = jobs or os.cpu_count() or 1
+    running = {}
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(fold_dirs,))
+    try:
+        for family in families:
+            start_rung(family)
+        while time.perf_counter() < deadline:
+            # Keep each worker busy with one fit and one queued behind it
+            while len(running) < 2 * workers:
+                waiting = [family for family in families if family.queue]
+                if not waiting:
+                    break
+                family = min(waiting, key=lambda f: f.seconds)
+                index, fold = family.queue.pop(0)
+                future = pool.submit(predict_fold, family.task, family.estimator_class, family.candidates[index],
+                                     fold, family.train_rows)
+                running[future] = (family, family.round, index, fold)
+                family.fits += 1
+            if not running:
+                break
+            finished, _ = wait(running, timeout=deadline - time.perf_counter(), return_when=FIRST_COMPLETED)
+            for future in finished:
+                family, round, index, fold = running.pop(future)
+                if collect(family, round, index, fold, future):
+                    family.finish_rung()
+                    start_rung(family)
+    finally:
+        # Over budget: queued fits are dropped and the running ones waited
+        # for, so no worker outlives the search
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    rows, tuned = [], {"regression": dict(regressors), "classification": dict(classifiers)}
+    for family in families:
+        if family.best is None and family.scores:
+            # The budget ran out part-way through the first rung
+            index, best_score = max(family.scores.items(), key=lambda item: item[1])
+            family.best = (family.candidates[index], best_score, family.train_rows)
+        params, best_score, train_rows = family.best if family.best else (None, np.nan, None)
+        scoring = CV_SCORING[family.task][0]
+        rows.append({
+            "Task": family.task, "Model": family.name, f"CV {scoring} Mean": best_score,
+            "Full Data": family.best is not None and train_rows is None,
+            "Train Rows": "all" if train_rows is None else train_rows,
+            "Candidates": family.tried, "Fits": family.fits, "Fit Seconds": family.seconds,
+            "Params": json.dumps(params, sort_keys=True) if params is not None else "",
+        })
+        # A winner on a subset can lose to the defaults on the full data, so
+        # only full-data winners replace them
+        if params is not None and train_rows is None and np.isfinite(best_score):
+            tuned[family.task][family.name] = (family.estimator_class, params)
+    table = pd.DataFrame(rows)
+    table.attrs["seconds"] = time.perf_counter() - start
+    return table, tuned
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune every candidate model family with successive halving "
+                                                 "within a wall-clock budget.")
+    parser.add_argument("--data", default=DATA_FILE)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Wall-clock seconds for the search")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES, help="Configurations per family")
+    parser.add_argument("--eta", type=int, default=ETA, help="Survivors per rung are 1/eta of the candidates")
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS, help="Training rows per fold on the first rung")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--task", choices=["regression", "classification", "both"], default="both")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the best params per family to this JSON file")
+    args = parser.parse_args(argv)
+
+    from data_cache import open_dataset
+
+    # The training split, as training.py --tune searches it
+    dataset = open_dataset(args.data)
+    splits = split_data(dataset.X_scaled, dataset.salary, dataset.salary_class)
+    data = {task: (split[0], split[2]) for task, split in splits.items()}
+    if args.task != "both":
+        data = {args.task: data[args.task]}
+    table, _ = tune(data, budget=args.budget, n_candidates=args.candidates, eta=args.eta, min_rows=args.min_rows,
+                    n_folds=args.folds, jobs=args.jobs, cache_dir=args.cache_dir, seed=args.seed)
+
+    with pd.option_context("display.width", 250, "display.max_columns", 20, "display.max_colwidth", 120,
+                           "display.float_format", "{:,.4f}".format):
+        for task, group in table.groupby("Task", sort=False):
+            print(f"\n🔷 {task.title()}")
+            score = f"CV {CV_SCORING[task][0]} Mean"
+            columns = ["Model", score] + [c for c in group.columns if c not in ("Task", "Model") and not c.startswith("CV ")]
+            print(group[columns].to_string(index=False))
+    if args.output:
+        best = {row["Model"]: json.loads(row["Params"]) for _, row in table.iterrows() if row["Params"]}
+        with open(args.output + ".tmp", "w") as f:
+            json.dump(best, f, indent=2)
+        os.replace(args.output + ".tmp", args.output)
+    print(f"\n✅ Tuned {len(table)} families ({int(table['Fits'].sum())} fits) in {table.attrs['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()